@@ -11,7 +11,8 @@ from typing import Dict, Any, List
 sys.path.append(str(Path(__file__).parent / "backend"))
 
 from backend.config import NEO4J_URI, NEO4J_USER, NEO4J_PASS
-from neo4j import GraphDatabase
+from backend.config import GRAPH_OVERVIEW_TTL
+from models.graph_overview import graph_overview, ingestion_epoch, DEFAULT_PER_LABEL
 
 # Page configuration
 st.set_page_config(
@@ -121,6 +122,9 @@ def process_pdf(pdf_file, doc_id: str) -> Dict[str, Any]:
         "--doc_id", doc_id
     ], capture_output=True, text=True)
     
+    # New graph content: drop cached overviews now rather than at TTL expiry
+    _cached_graph_overview.clear()
+
     return {
         "success": True,
         "doc_id": doc_id,
@@ -128,74 +132,14 @@ def process_pdf(pdf_file, doc_id: str) -> Dict[str, Any]:
         "enriched_json": str(enriched_json)
     }
 
-def get_graph_data(doc_id: str = None) -> Dict[str, Any]:
-    """Fetch graph data from Neo4j"""
-    from neo4j.graph import Node as Neo4jNode, Relationship as Neo4jRelationship
-    
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
-    
-    with driver.session() as session:
-        if doc_id:
-            query = """
-            MATCH (d:Document {doc_id: $doc_id})-[r]-(n)
-            RETURN d, r, n
-            LIMIT 100
-            """
-            result = session.run(query, doc_id=doc_id)
-        else:
-            query = """
-            MATCH (n)-[r]-(m)
-            RETURN n, r, m
-            LIMIT 100
-            """
-            result = session.run(query)
-        
-        nodes = []
-        edges = []
-        node_ids = set()
-        
-        for record in result:
-            # Process each value in the record
-            for key in record.keys():
-                value = record[key]
-                
-                # Check if it's a Node
-                if isinstance(value, Neo4jNode):
-                    if value.id not in node_ids:
-                        nodes.append({
-                            "id": str(value.id),
-                            "label": list(value.labels)[0] if value.labels else "Node",
-                            "properties": dict(value)
-                        })
-                        node_ids.add(value.id)
-                
-                # Check if it's a Relationship
-                elif isinstance(value, Neo4jRelationship):
-                    edges.append({
-                        "source": str(value.start_node.id),
-                        "target": str(value.end_node.id),
-                        "label": value.type
-                    })
-                    
-                    # Also add the start and end nodes if not already added
-                    if value.start_node.id not in node_ids:
-                        nodes.append({
-                            "id": str(value.start_node.id),
-                            "label": list(value.start_node.labels)[0] if value.start_node.labels else "Node",
-                            "properties": dict(value.start_node)
-                        })
-                        node_ids.add(value.start_node.id)
-                    
-                    if value.end_node.id not in node_ids:
-                        nodes.append({
-                            "id": str(value.end_node.id),
-                            "label": list(value.end_node.labels)[0] if value.end_node.labels else "Node",
-                            "properties": dict(value.end_node)
-                        })
-                        node_ids.add(value.end_node.id)
-    
-    driver.close()
-    return {"nodes": nodes, "edges": edges}
+@st.cache_data(ttl=GRAPH_OVERVIEW_TTL, show_spinner=False)
+def _cached_graph_overview(doc_id: str, per_label: int, epoch: str) -> Dict[str, Any]:
+    # `epoch` is only part of the cache key: a new ingestion means a new entry
+    return graph_overview(doc_id, per_label=per_label)
+
+def get_graph_data(doc_id: str = None, per_label: int = DEFAULT_PER_LABEL) -> Dict[str, Any]:
+    """Label/relationship aggregates plus a stratified node sample from Neo4j"""
+    return _cached_graph_overview(doc_id, per_label, ingestion_epoch())
 
 def chat_with_docs(question: str, doc_id: str = None) -> Dict[str, Any]:
     """Query the RAG system"""
@@ -294,15 +238,26 @@ elif page == "🕸️ Knowledge Graph":
     
     selected_doc = None if doc_filter == "All Documents" else doc_filter
     
+    per_label = st.slider("Sample nodes per label", 5, 100, DEFAULT_PER_LABEL, step=5)
+
     if st.button("🔄 Refresh Graph"):
         with st.spinner("Loading graph data..."):
-            graph_data = get_graph_data(selected_doc)
+            graph_data = get_graph_data(selected_doc, per_label)
             
             st.subheader("Graph Statistics")
             col1, col2, col3 = st.columns(3)
-            col1.metric("Nodes", len(graph_data["nodes"]))
-            col2.metric("Edges", len(graph_data["edges"]))
+            col1.metric("Nodes", sum(l["count"] for l in graph_data["labels"]))
+            col2.metric("Edges", sum(r["count"] for r in graph_data["relationships"]))
             col3.metric("Documents", len(st.session_state.processed_docs))
+
+            col1, col2 = st.columns(2)
+            col1.dataframe(graph_data["labels"], use_container_width=True)
+            col2.dataframe(graph_data["relationships"], use_container_width=True)
+
+            st.caption(
+                f"Showing a sample of {len(graph_data['nodes'])} nodes "
+                f"(up to {per_label} per label) and the edges between them."
+            )
             
             # Simple visualization using streamlit-agraph
             try:
@@ -311,7 +266,8 @@ elif page == "🕸️ Knowledge Graph":
                 nodes = [
                     Node(
                         id=n["id"],
-                        label=n["properties"].get("doc_id", n["label"]),
+                        label=n["name"],
+                        title=n["label"],
                         size=25,
                         color="#FF6B6B" if n["label"] == "Document" else "#4ECDC4"
                     )
@@ -322,7 +278,7 @@ elif page == "🕸️ Knowledge Graph":
                     Edge(
                         source=e["source"],
                         target=e["target"],
-                        label=e["label"]
+                        label=e["type"]
                     )
                     for e in graph_data["edges"]
                 ]
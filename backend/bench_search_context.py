@@ -0,0 +1,73 @@
+"""
+Compare the old OPTIONAL MATCH context query with search_context_for_question.
+
+Usage:
+    python bench_search_context.py --runs 5
+    python bench_search_context.py --doc_ids 7m ISL81401_ISL81401A
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from statistics import median
+
+sys.path.append(str(Path(__file__).parent))
+from models.neo4j_client import get_driver, search_context_for_question
+from config import GRAPH_CONTEXT_PAGE_LIMIT
+
+LEGACY_QUERY = """
+MATCH (d:Document)-[:HAS_PAGE]->(p:Page)
+{where_clause}
+OPTIONAL MATCH (p)-[:HAS_TEXT_BLOCK]->(t:TextBlock)
+OPTIONAL MATCH (p)-[:HAS_FIGURE]->(f:Figure)
+OPTIONAL MATCH (p)-[:HAS_TABLE]->(tbl:Table)
+RETURN d.doc_id AS doc_id, p.page_number AS page,
+       COALESCE(p.natural_language_context, p.text) AS page_text,
+       t.id AS tb_id, t.summary AS tb_text,
+       f.figure_id AS fig_id, f.title AS fig_title, f.path AS fig_path,
+       tbl.table_id AS tbl_id, tbl.data AS tbl_data, tbl.title AS tbl_title
+"""
+
+def run_legacy(doc_ids):
+    where_clause = "WHERE d.doc_id IN $doc_ids" if doc_ids else ""
+    params = {"doc_ids": doc_ids} if doc_ids else {}
+    with get_driver().session() as session:
+        rows = list(session.run(LEGACY_QUERY.format(where_clause=where_clause), **params))
+    # The old code emitted one FullPage chunk per row plus one per non-null child column
+    chunks = sum(
+        bool(r["page_text"]) + bool(r["tb_id"]) + bool(r["fig_id"]) + bool(r["tbl_id"])
+        for r in rows
+    )
+    return len(rows), chunks
+
+def run_current(doc_ids, limit):
+    chunks = search_context_for_question("", doc_ids=doc_ids, limit=limit)
+    pages = {(c["doc_id"], c["page"]) for c in chunks}
+    return len(pages), len(chunks)
+
+def bench(name, fn, runs):
+    timings = []
+    rows = chunks = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows, chunks = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"{name:<10} rows={rows:<6} chunks={chunks:<6} "
+          f"median={median(timings):8.1f} ms  min={min(timings):8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--doc_ids", nargs="*", default=None)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=GRAPH_CONTEXT_PAGE_LIMIT)
+    args = parser.parse_args()
+
+    doc_ids = args.doc_ids or None
+    # warm up connection pool and page cache
+    run_current(doc_ids, args.limit)
+
+    bench("legacy", lambda: run_legacy(doc_ids), args.runs)
+    bench("current", lambda: run_current(doc_ids, args.limit), args.runs)
+
+if __name__ == "__main__":
+    main()
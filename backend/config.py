@@ -17,6 +17,46 @@ STATIC_DIR.mkdir(exist_ok=True, parents=True)
 NEO4J_URI = os.getenv("NEO4J_URI", "test")
 NEO4J_USER = os.getenv("NEO4J_USER", "test")
 NEO4J_PASS = os.getenv("NEO4J_PASS", "test")
+NEO4J_MAX_POOL_SIZE        = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_ACQUISITION_TIMEOUT  = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "30"))
+NEO4J_CONNECTION_TIMEOUT   = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "15"))
+NEO4J_MAX_CONN_LIFETIME    = float(os.getenv("NEO4J_MAX_CONN_LIFETIME", "3600"))
+NEO4J_BULK_BATCH_SIZE      = int(os.getenv("NEO4J_BULK_BATCH_SIZE", "5000"))
+NEO4J_PURGE_BATCH_SIZE     = int(os.getenv("NEO4J_PURGE_BATCH_SIZE", "1000"))
+GRAPH_CONTEXT_PAGE_LIMIT   = int(os.getenv("GRAPH_CONTEXT_PAGE_LIMIT", "40"))
+FULLTEXT_HIT_LIMIT         = int(os.getenv("FULLTEXT_HIT_LIMIT", "200"))
+
+# /graph views: pages per response, children per expand call, cached views
+GRAPH_PAGE_SIZE    = int(os.getenv("GRAPH_PAGE_SIZE", "50"))
+GRAPH_EXPAND_LIMIT = int(os.getenv("GRAPH_EXPAND_LIMIT", "200"))
+GRAPH_CACHE_SIZE   = int(os.getenv("GRAPH_CACHE_SIZE", "256"))
+# Streamlit graph overview cache TTL (seconds); ingestion invalidates it sooner
+GRAPH_OVERVIEW_TTL = int(os.getenv("GRAPH_OVERVIEW_TTL", "600"))
+
+# Graph-neighbourhood expansion of vector hits: seeds expanded per question,
+# per-relationship fan-out caps, and the score decay applied to neighbours
+GRAPH_EXPAND_SEEDS = int(os.getenv("GRAPH_EXPAND_SEEDS", "8"))
+GRAPH_EXPAND_FANOUT = {
+    "sibling":    int(os.getenv("GRAPH_EXPAND_FANOUT_SIBLING", "3")),
+    "source":     int(os.getenv("GRAPH_EXPAND_FANOUT_SOURCE", "3")),
+    "qa":         int(os.getenv("GRAPH_EXPAND_FANOUT_QA", "3")),
+    "constraint": int(os.getenv("GRAPH_EXPAND_FANOUT_CONSTRAINT", "5")),
+    "spec_item":  int(os.getenv("GRAPH_EXPAND_FANOUT_SPEC_ITEM", "5")),
+}
+GRAPH_EXPAND_DECAY = float(os.getenv("GRAPH_EXPAND_DECAY", "0.8"))
+
+# In-process CSR snapshot of the document graph (models/graph_snapshot.py);
+# refreshed after ingestion and at most every GRAPH_SNAPSHOT_REFRESH seconds
+GRAPH_SNAPSHOT_ENABLED = os.getenv("GRAPH_SNAPSHOT_ENABLED", "true").lower() in ("1", "true", "yes")
+GRAPH_SNAPSHOT_REFRESH = float(os.getenv("GRAPH_SNAPSHOT_REFRESH", "60"))
+
+# Per-branch retrieval timeouts in rag_answer (seconds); a branch that runs
+# over contributes no context instead of holding up the answer
+RAG_EMBED_TIMEOUT  = float(os.getenv("RAG_EMBED_TIMEOUT", "10"))
+RAG_GRAPH_TIMEOUT  = float(os.getenv("RAG_GRAPH_TIMEOUT", "10"))
+RAG_VECTOR_TIMEOUT = float(os.getenv("RAG_VECTOR_TIMEOUT", "15"))
+# Restrict the vector search to the documents the full-text hits point at
+RAG_VECTOR_DOC_FILTER = os.getenv("RAG_VECTOR_DOC_FILTER", "true").lower() in ("1", "true", "yes")
 
 # Postgres / pgvector
 PG_HOST = os.getenv("PG_HOST", "localhost")
@@ -24,6 +64,29 @@ PG_PORT = int(os.getenv("PG_PORT", "5433"))
 PG_DB   = os.getenv("PG_DB", "postgres")
 PG_USER = os.getenv("PG_USER", "postgres")
 PG_PASS = os.getenv("PG_PASS", "522771708@Sbi")
+# Async psycopg 3 pool for the FastAPI request path
+PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", "1"))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", "10"))
+# Blocking psycopg2 pool (ingestion, purge, threadpool search), separate from the async pool
+PG_SYNC_POOL_MIN_SIZE = int(os.getenv("PG_SYNC_POOL_MIN_SIZE", "1"))
+PG_SYNC_POOL_MAX_SIZE = int(os.getenv("PG_SYNC_POOL_MAX_SIZE", "10"))
+# Seconds a blocking caller waits for a free pooled connection before failing
+PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "30"))
+# Pooled connections idle longer than this (seconds) get a SELECT 1 before reuse
+PG_POOL_HEALTHCHECK_IDLE = float(os.getenv("PG_POOL_HEALTHCHECK_IDLE", "30"))
+# ANN index on rag_chunks.embedding (models/pg_schema.py): "ivfflat" or "hnsw",
+# built after loads; ivfflat lists are derived from the row count
+PG_VECTOR_INDEX         = os.getenv("PG_VECTOR_INDEX", "ivfflat")
+PG_HNSW_M               = int(os.getenv("PG_HNSW_M", "16"))
+PG_HNSW_EF_CONSTRUCTION = int(os.getenv("PG_HNSW_EF_CONSTRUCTION", "64"))
+PG_MAINTENANCE_WORK_MEM = os.getenv("PG_MAINTENANCE_WORK_MEM", "512MB")
+PG_MAINTENANCE_WORKERS  = int(os.getenv("PG_MAINTENANCE_WORKERS", "4"))
+# Default vector search quality for /ask: fast | balanced | accurate | exact,
+# empty = the server's ivfflat.probes / hnsw.ef_search
+VECTOR_SEARCH_QUALITY   = os.getenv("VECTOR_SEARCH_QUALITY", "") or None
+# Filtered vector search: rank exactly when the doc/pin filter leaves at most
+# this many rows (models/vector_search.py)
+PG_EXACT_SEARCH_MAX_ROWS = int(os.getenv("PG_EXACT_SEARCH_MAX_ROWS", "20000"))
 
 # LLM endpoints (Euron)
 # LLM endpoints (Euron)
@@ -37,7 +100,38 @@ VISION_URL      = os.getenv("VISION_URL", "http://localhost:11434/api/generate")
 VISION_MODEL    = os.getenv("VISION_MODEL", "llama3.1")
 VECTOR_DIM      = int(os.getenv("VECTOR_DIM", "1024"))
 
+# Optional comma-separated endpoint pools per role (default: the single URL above)
+def _url_list(name: str, default: str):
+    return [u.strip() for u in os.getenv(name, default).split(",") if u.strip()]
+
+ANSWER_URLS    = _url_list("ANSWER_URLS", ANSWER_URL)
+EMBEDDING_URLS = _url_list("EMBEDDING_URLS", EMBEDDING_URL)
+VISION_URLS    = _url_list("VISION_URLS", VISION_URL)
+LLM_BALANCE_STRATEGY = os.getenv("LLM_BALANCE_STRATEGY", "least_outstanding")  # or "ewma"
+LLM_HEALTH_PATH      = os.getenv("LLM_HEALTH_PATH", "/api/tags")
+LLM_HEALTH_INTERVAL  = float(os.getenv("LLM_HEALTH_INTERVAL", "10"))
+LLM_EJECT_FAILURES   = int(os.getenv("LLM_EJECT_FAILURES", "3"))
+LLM_EJECT_SECONDS    = float(os.getenv("LLM_EJECT_SECONDS", "30"))
+
+# Model-call resilience (deadlines in seconds, per role)
+LLM_DEADLINE_ANSWER    = float(os.getenv("LLM_DEADLINE_ANSWER", "120"))
+LLM_DEADLINE_EMBEDDING = float(os.getenv("LLM_DEADLINE_EMBEDDING", "30"))
+LLM_DEADLINE_VISION    = float(os.getenv("LLM_DEADLINE_VISION", "180"))
+LLM_MAX_RETRIES   = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE  = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX   = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_FAILURES  = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET     = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
 MAX_TOKENS = int(os.getenv("MAX_TOKENS", "1000"))
 TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
 
+# Prompt context packing
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+CONTEXT_TOKENIZER    = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")
+CONTEXT_MAX_CHUNK_CHARS = int(os.getenv("CONTEXT_MAX_CHUNK_CHARS", "1000"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+
 
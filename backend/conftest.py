@@ -0,0 +1,3 @@
+# test_ingest.py, test_rager.py and test_evaluate_api.py are manual scripts
+# against a running server / database; keep them out of the pytest run.
+collect_ignore = ["test_ingest.py", "test_rager.py", "test_evaluate_api.py"]
@@ -1,10 +1,10 @@
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
-from models.neo4j_client import _driver
+from models.neo4j_client import get_driver
 
 def debug_neo4j_docs():
-    driver = _driver()
+    driver = get_driver()
     with driver.session() as session:
         # 1. List all Doc IDs
         print("--- All Documents ---")
@@ -29,7 +29,6 @@ def debug_neo4j_docs():
         if not found:
             print("No pages found for doc_id='7m'")
             
-    driver.close()
 
 if __name__ == "__main__":
     debug_neo4j_docs()
@@ -12,6 +12,8 @@ def drop_table():
         )
         cur = conn.cursor()
         cur.execute("DROP TABLE IF EXISTS rag_chunks;")
+        # so models.pg_schema recreates it on the next run
+        cur.execute("DROP TABLE IF EXISTS kb_schema_version;")
         conn.commit()
         cur.close()
         conn.close()
@@ -2,12 +2,12 @@ import os
 import glob
 import json
 import re
-import requests
 from pathlib import Path
 from bs4 import BeautifulSoup
 from config import (
-    ANSWER_URL, ANSWER_MODEL, EURON_API_KEY, MAX_TOKENS, TEMPERATURE
+    ANSWER_MODEL, EURON_API_KEY, MAX_TOKENS, TEMPERATURE
 )
+from llm.resilience import post_json
 
 # Configuration
 INPUT_ROOT = "datasheets_extracted" # Folder containing product subfolders
@@ -43,9 +43,7 @@ def llm_section_text(text: str) -> str:
     }
 
     try:
-        resp = requests.post(ANSWER_URL, json=payload, headers=headers, timeout=120)
-        resp.raise_for_status()
-        data = resp.json()
+        data = post_json("answer", payload, headers=headers, deadline=120)
         # Handle different response formats depending on provider (Euron/OpenAI compatible)
         if "choices" in data:
             return data["choices"][0]["message"]["content"].strip()
@@ -1,13 +1,13 @@
 import sys
 import os
 from typing import Dict, Any
-import requests
 
 # Add parent directory to sys.path to allow importing 'pipeline'
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from pipeline.main import llm_infer
-from config import ANSWER_URL, ANSWER_MODEL, EURON_API_KEY, MAX_TOKENS, TEMPERATURE
+from pipeline.main import llm_infer, llm_infer_async
+from llm.resilience import post_json
+from config import ANSWER_MODEL, EURON_API_KEY, MAX_TOKENS, TEMPERATURE
 
 def answer_llm(prompt: str) -> str:
     """
@@ -16,6 +16,10 @@ def answer_llm(prompt: str) -> str:
     """
     return llm_infer(prompt)
 
+async def answer_llm_async(prompt: str) -> str:
+    """Async answer_llm; does not block the event loop while the model runs."""
+    return await llm_infer_async(prompt)
+
 
 
 def call_llm_for_ontology(doc_id: str, text_snippet: str) -> Dict[str, Any]:
@@ -91,9 +95,7 @@ Read it carefully and output ONLY the JSON object described above.
         "temperature": TEMPERATURE
     }
 
-    resp = requests.post(ANSWER_URL, json=payload, headers=headers, timeout=120)
-    resp.raise_for_status()
-    data = resp.json()
+    data = post_json("answer", payload, headers=headers, deadline=120)
     # Adjust path according to actual API schema
     content = data["choices"][0]["message"]["content"]
     return content
@@ -0,0 +1,213 @@
+import re
+import hashlib
+import math
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+
+from config import (
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_TOKENIZER,
+    CONTEXT_MAX_CHUNK_CHARS,
+    CONTEXT_DEDUP_THRESHOLD,
+)
+
+# Optional: tiktoken gives exact token counts for the budget
+try:
+    import tiktoken  # type: ignore
+    HAS_TIKTOKEN = True
+except ImportError:
+    HAS_TIKTOKEN = False
+
+
+# Relative trust in each chunk source when scores are otherwise equal.
+SOURCE_WEIGHTS = {
+    "TextBlock": 1.0,
+    "FullPage": 0.9,
+    "Table": 0.85,
+    "Figure": 0.8,
+    "Constraint": 1.0,
+    "SpecItem": 0.9,
+    "QA_Triple": 0.85,
+}
+
+# Tokens spent on the "[i] [DOC ..] [source page ..] node_id=.." header line.
+HEADER_TOKEN_ESTIMATE = 24
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+_STOPWORDS = {
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "is", "are",
+    "what", "which", "how", "do", "does", "i", "it", "be", "with", "by", "at",
+    "this", "that", "from", "as", "can", "me", "my", "about", "there",
+}
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if not HAS_TIKTOKEN:
+        print("[WARN] tiktoken not installed; context budget uses an approximate token count.")
+        return None
+    try:
+        return tiktoken.get_encoding(CONTEXT_TOKENIZER)
+    except Exception:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Token count of `text` with the configured tokenizer (approximate without tiktoken)."""
+    if not text:
+        return 0
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    # ~1.3 tokens per word/punctuation run is close to BPE tokenizers for English text
+    return int(len(re.findall(r"\w+|[^\w\s]", text)) * 1.3) + 1
+
+
+def _terms(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall((text or "").lower()) if w not in _STOPWORDS]
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _shingles(text: str, n: int = 3) -> set:
+    words = _normalize(text).split()
+    if len(words) < n:
+        return set()
+    return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _is_media_chunk(c: Dict[str, Any]) -> bool:
+    # Figures and tables carry payload beyond their (often generic) caption,
+    # so they are never collapsed on text alone.
+    return bool(c.get("image_path") or c.get("table_data"))
+
+
+def score_chunks(question: str, chunks: List[Dict[str, Any]]) -> List[float]:
+    """
+    Relevance score per chunk:
+      - IDF-weighted overlap between question terms and chunk text (IDF over the candidate set)
+      - plus vector similarity (1 - cosine distance) when the chunk came from pgvector
+      - scaled by a per-source weight
+    """
+    q_terms = set(_terms(question))
+    chunk_terms = [set(_terms(c.get("text") or "")) for c in chunks]
+
+    n = max(len(chunks), 1)
+    idf = {}
+    for t in q_terms:
+        df = sum(1 for terms in chunk_terms if t in terms)
+        idf[t] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+    idf_total = sum(idf.values()) or 1.0
+
+    scores = []
+    for c, terms in zip(chunks, chunk_terms):
+        lexical = sum(w for t, w in idf.items() if t in terms) / idf_total
+        vector = 0.0
+        if c.get("distance") is not None:
+            vector = max(0.0, 1.0 - float(c["distance"]))
+        weight = SOURCE_WEIGHTS.get(c.get("source"), 0.8)
+        scores.append(weight * (lexical + vector))
+    return scores
+
+
+def pack_context_chunks(
+    question: str,
+    chunks: List[Dict[str, Any]],
+    token_budget: Optional[int] = None,
+    max_chunk_chars: int = CONTEXT_MAX_CHUNK_CHARS,
+    dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """
+    Select the chunks that go into the prompt:
+      1) score and order chunks by relevance to the question
+      2) drop exact duplicates and near-duplicates (e.g. a TextBlock that is
+         the first part of its FullPage). The longer copy wins and takes the
+         better rank, so the model sees the superset; the shorter one is kept
+         as a fallback in case the longer one does not fit the budget
+      3) greedily fill `token_budget` tokens of rendered context
+
+    Returned chunks are in descending score order.
+    """
+    if token_budget is None:
+        token_budget = CONTEXT_TOKEN_BUDGET
+    if not chunks:
+        return []
+
+    scores = score_chunks(question, chunks)
+    order = sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)
+
+    # entry: [chunk index, shingles, fallback chunk indexes (shorter near-duplicates)]
+    entries: List[List[Any]] = []
+    seen_hashes = set()
+
+    for i in order:
+        c = chunks[i]
+        text = (c.get("text") or "").strip()
+
+        if _is_media_chunk(c):
+            key: Tuple = (c.get("source"), c.get("node_id"), c.get("image_path"))
+            digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+            shingles = set()
+        else:
+            if not text:
+                continue
+            digest = hashlib.sha1(_normalize(text).encode("utf-8")).hexdigest()
+            shingles = _shingles(text)
+
+        if digest in seen_hashes:
+            continue
+        seen_hashes.add(digest)
+
+        if not shingles:
+            entries.append([i, shingles, []])
+            continue
+
+        covered, dropped = [], False
+        for pos, (_, other, _) in enumerate(entries):
+            if not other:
+                continue
+            overlap = len(shingles & other) / min(len(shingles), len(other))
+            if overlap < dedup_threshold:
+                continue
+            if len(shingles) > len(other):
+                covered.append(pos)  # this chunk is the longer copy of a kept one
+            else:
+                dropped = True
+                break
+        if dropped:
+            continue
+        if not covered:
+            entries.append([i, shingles, []])
+            continue
+
+        # replace the first covered entry in place (its rank), fold the rest into it
+        first = covered[0]
+        fallbacks = []
+        for pos in covered:
+            fallbacks.append(entries[pos][0])
+            fallbacks.extend(entries[pos][2])
+        entries[first] = [i, shingles, fallbacks]
+        for pos in reversed(covered[1:]):
+            del entries[pos]
+
+    packed: List[Dict[str, Any]] = []
+    used = 0
+    for i, _, fallbacks in entries:
+        for j in [i] + fallbacks:
+            c = chunks[j]
+            text = (c.get("text") or "").strip()
+            rendered = text if len(text) <= max_chunk_chars else text[:max_chunk_chars]
+            cost = HEADER_TOKEN_ESTIMATE + count_tokens(rendered)
+            if c.get("image_path"):
+                cost += count_tokens(str(c["image_path"]))
+            if used + cost > token_budget:
+                continue
+            used += cost
+            packed.append(dict(c, score=round(max(scores[k] for k in [i] + fallbacks), 4)))
+            break
+
+    print(f"[INFO] Context packing: {len(chunks)} candidates -> {len(packed)} chunks, "
+          f"{used}/{token_budget} tokens")
+    return packed
@@ -6,7 +6,13 @@ import os
 # Add parent directory to sys.path to allow importing 'pipeline'
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from pipeline.main import embed_text as _embed_text
+from pipeline.main import embed_text as _embed_text, embed_text_async as _embed_text_async
+
+def _single(result: Any) -> Any:
+    # If result is already a numpy array with single embedding, extract it
+    if isinstance(result, np.ndarray) and len(result.shape) == 2 and result.shape[0] == 1:
+        return result[0]
+    return result
 
 def embed_text(text: str) -> Any:
     """
@@ -14,8 +20,8 @@ def embed_text(text: str) -> Any:
     Returns a numpy array of the embedding.
     Uses the embed_text function from pipeline.main.
     """
-    result = _embed_text(text)
-    # If result is already a numpy array with single embedding, extract it
-    if isinstance(result, np.ndarray) and len(result.shape) == 2 and result.shape[0] == 1:
-        return result[0]
-    return result
+    return _single(_embed_text(text))
+
+async def embed_text_async(text: str) -> Any:
+    """Async embed_text for the FastAPI request path."""
+    return _single(await _embed_text_async(text))
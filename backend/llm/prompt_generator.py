@@ -3,6 +3,8 @@ from typing import List, Dict, Any, Optional
 import textwrap
 import json
 from llm.answer_llm import answer_llm as call_prompt_llm
+from llm.context_packer import pack_context_chunks
+from config import CONTEXT_MAX_CHUNK_CHARS
 
 PROMPT_GENERATOR_SYSTEM = textwrap.dedent("""
 You are a Prompt-Generator AI whose job is to build the BEST possible prompt
@@ -56,8 +58,8 @@ def _format_context_chunks(context_chunks: List[Dict[str, Any]]) -> str:
         if img:
             lines.append(f"Image path: {img}")
 
-        if len(text) > 1000:
-            text = text[:1000] + " ...[TRUNCATED]..."
+        if len(text) > CONTEXT_MAX_CHUNK_CHARS:
+            text = text[:CONTEXT_MAX_CHUNK_CHARS] + " ...[TRUNCATED]..."
         lines.append(text)
         lines.append("")
     return "\n".join(lines) if lines else "(no context chunks)"
@@ -93,7 +95,13 @@ def build_prompt(
     constraints: List[Dict[str, Any]],
     ontology_hints: Optional[Dict[str, Any]] = None,
     answer_length_hint: str = "medium",
+    token_budget: Optional[int] = None,
 ) -> str:
+    # When a budget is given, dedupe/rank/trim the chunks here; callers that
+    # already packed (rag_answer) leave it as None.
+    if token_budget is not None:
+        context_chunks = pack_context_chunks(user_question, context_chunks, token_budget)
+
     context_str = _format_context_chunks(context_chunks)
     constraints_str = _format_constraints(constraints)
     # ontology_str = _format_ontology_hints(ontology_hints) # Optional, keeping it simple for now
@@ -0,0 +1,408 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import requests
+
+try:
+    import httpx  # async client for the FastAPI request path
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+from config import (
+    LLM_DEADLINE_ANSWER,
+    LLM_DEADLINE_EMBEDDING,
+    LLM_DEADLINE_VISION,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET,
+)
+from llm.router import get_router
+
+ROLE_DEADLINES = {
+    "answer": LLM_DEADLINE_ANSWER,
+    "embedding": LLM_DEADLINE_EMBEDDING,
+    "vision": LLM_DEADLINE_VISION,
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without touching the network while a role's breaker is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a model call (including retries/hedges) runs past its deadline."""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker:
+      closed    -> calls go through; `failure_threshold` consecutive failures open it
+      open      -> calls fail fast until `reset_timeout` has passed
+      half_open -> one trial call; success closes, failure re-opens
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """Give back a half-open trial slot taken by allow() without making a call."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f"[WARN] Circuit '{self.name}' opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies, used to pick the hedge delay."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < LLM_HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[idx]
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, asyncio.TimeoutError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    if HAS_HTTPX:
+        if isinstance(exc, httpx.TransportError):
+            return True
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
+class ResilientCaller:
+    """
+    Wraps a blocking model call `fn(timeout) -> result` with:
+      - an overall per-call deadline (each attempt gets the remaining time as its timeout)
+      - exponential backoff with full jitter between retryable failures
+      - an optional hedged duplicate once the attempt runs past the observed p95
+      - a circuit breaker that fails fast while the backend is down
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-call")
+
+    def __init__(
+        self,
+        role: str,
+        deadline: float,
+        max_retries: int = LLM_MAX_RETRIES,
+        hedge: bool = LLM_HEDGE_ENABLED,
+    ):
+        self.role = role
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.breaker = CircuitBreaker(role, LLM_BREAKER_FAILURES, LLM_BREAKER_RESET)
+        self.latency = LatencyTracker()
+
+    def call(self, fn: Callable[[float], Any], deadline: Optional[float] = None) -> Any:
+        budget = deadline if deadline is not None else self.deadline
+        expires = time.monotonic() + budget
+        last_exc: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.role} backend unavailable (circuit open)")
+
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                self.breaker.release()
+                break
+            try:
+                started = time.monotonic()
+                result = self._attempt(fn, remaining)
+                self.latency.add(time.monotonic() - started)
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                last_exc = e
+                if not _is_retryable(e):
+                    # A bad request says nothing about backend health: neither
+                    # reset the failure streak nor count it
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+            except BaseException:
+                # cancelled by the caller (e.g. a branch timeout in rag_answer_async) or
+                # interrupted: not the backend's fault, just free a half-open trial slot
+                self.breaker.release()
+                raise
+
+            if attempt < self.max_retries:
+                backoff = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+                if time.monotonic() + backoff >= expires:
+                    break
+                time.sleep(backoff)
+
+        raise DeadlineExceeded(
+            f"{self.role} call failed within {budget:.1f}s deadline: {last_exc}"
+        ) from last_exc
+
+    def _attempt(self, fn: Callable[[float], Any], timeout: float) -> Any:
+        hedge_after = self.latency.percentile(0.95) if self.hedge else None
+        if hedge_after is None or hedge_after >= timeout:
+            return fn(timeout)
+
+        started = time.monotonic()
+        futures = {self._executor.submit(fn, timeout)}
+        done, _ = wait(futures, timeout=hedge_after)
+        if not done:
+            left = timeout - (time.monotonic() - started)
+            if left > 0:
+                futures.add(self._executor.submit(fn, left))
+
+        errors = []
+        pending = set(futures)
+        while pending:
+            left = timeout - (time.monotonic() - started)
+            done, pending = wait(pending, timeout=max(left, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for f in done:
+                if f.exception() is None:
+                    return f.result()
+                errors.append(f.exception())
+        if errors:
+            raise errors[0]
+        raise requests.Timeout(f"{self.role} call timed out after {timeout:.1f}s")
+
+    async def call_async(self, fn: Callable[[float], Awaitable[Any]], deadline: Optional[float] = None) -> Any:
+        """Same policy as call() for a coroutine `fn(timeout)`; shares breaker and latency stats."""
+        budget = deadline if deadline is not None else self.deadline
+        expires = time.monotonic() + budget
+        last_exc: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.role} backend unavailable (circuit open)")
+
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                self.breaker.release()
+                break
+            try:
+                started = time.monotonic()
+                result = await self._attempt_async(fn, remaining)
+                self.latency.add(time.monotonic() - started)
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                last_exc = e
+                if not _is_retryable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+            except BaseException:
+                # cancelled by the caller (e.g. a branch timeout in rag_answer_async) or
+                # interrupted: not the backend's fault, just free a half-open trial slot
+                self.breaker.release()
+                raise
+
+            if attempt < self.max_retries:
+                backoff = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+                if time.monotonic() + backoff >= expires:
+                    break
+                await asyncio.sleep(backoff)
+
+        raise DeadlineExceeded(
+            f"{self.role} call failed within {budget:.1f}s deadline: {last_exc}"
+        ) from last_exc
+
+    async def _attempt_async(self, fn: Callable[[float], Awaitable[Any]], timeout: float) -> Any:
+        hedge_after = self.latency.percentile(0.95) if self.hedge else None
+        if hedge_after is None or hedge_after >= timeout:
+            return await asyncio.wait_for(fn(timeout), timeout)
+
+        started = time.monotonic()
+        tasks = {asyncio.ensure_future(fn(timeout))}
+        errors = []
+        pending = set(tasks)
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                left = timeout - (time.monotonic() - started)
+                if left > 0:
+                    tasks.add(asyncio.ensure_future(fn(left)))
+                    pending = set(tasks)
+
+            while pending:
+                left = timeout - (time.monotonic() - started)
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(left, 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for t in done:
+                    if t.exception() is None:
+                        return t.result()
+                    errors.append(t.exception())
+        finally:
+            # the losing hedge, a timed-out attempt, or every attempt when the caller
+            # itself is cancelled (a rag_answer_async branch timeout) must not keep a
+            # connection busy
+            for t in tasks:
+                if not t.done():
+                    t.cancel()
+        if errors:
+            raise errors[0]
+        raise asyncio.TimeoutError(f"{self.role} call timed out after {timeout:.1f}s")
+
+
+_callers: Dict[str, ResilientCaller] = {}
+_callers_lock = threading.Lock()
+
+
+def get_caller(role: str) -> ResilientCaller:
+    with _callers_lock:
+        if role not in _callers:
+            _callers[role] = ResilientCaller(role, ROLE_DEADLINES.get(role, LLM_DEADLINE_ANSWER))
+        return _callers[role]
+
+
+def post_json(
+    role: str,
+    payload: Dict[str, Any],
+    headers: Optional[Dict[str, str]] = None,
+    deadline: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    POST `payload` to a model endpoint for `role` ("answer"|"embedding"|"vision")
+    and return the JSON body. Every attempt (retry or hedge) asks the role's
+    router for an endpoint, so retries and hedges land on the least-loaded server.
+    """
+    router = get_router(role)
+
+    def _do(timeout: float) -> Dict[str, Any]:
+        ep = router.pick()
+        started = time.monotonic()
+        try:
+            resp = requests.post(ep.url, json=payload, headers=headers, timeout=timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        except Exception as e:
+            router.release(ep, None, ok=not _is_retryable(e))
+            raise
+        router.release(ep, time.monotonic() - started, ok=True)
+        return data
+
+    return get_caller(role).call(_do, deadline=deadline)
+
+
+_async_client = None
+
+
+def get_async_client():
+    """Shared httpx.AsyncClient (connection pooling / keep-alive) for the request path."""
+    global _async_client
+    if not HAS_HTTPX:
+        raise RuntimeError("httpx is required for async model calls (pip install httpx)")
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    client, _async_client = _async_client, None
+    if client is not None:
+        await client.aclose()
+
+
+async def post_json_async(
+    role: str,
+    payload: Dict[str, Any],
+    headers: Optional[Dict[str, str]] = None,
+    deadline: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Async post_json: same router, breaker, retries and hedging, but the
+    request is awaited on the event loop instead of blocking a thread.
+    """
+    router = get_router(role)
+    client = get_async_client()
+
+    async def _do(timeout: float) -> Dict[str, Any]:
+        ep = router.pick()
+        started = time.monotonic()
+        try:
+            resp = await client.post(ep.url, json=payload, headers=headers, timeout=timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        except asyncio.CancelledError:
+            router.release(ep, None, ok=True)
+            raise
+        except Exception as e:
+            router.release(ep, None, ok=not _is_retryable(e))
+            raise
+        router.release(ep, time.monotonic() - started, ok=True)
+        return data
+
+    return await get_caller(role).call_async(_do, deadline=deadline)
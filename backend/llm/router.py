@@ -0,0 +1,152 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from config import (
+    ANSWER_URLS,
+    EMBEDDING_URLS,
+    VISION_URLS,
+    LLM_BALANCE_STRATEGY,
+    LLM_HEALTH_PATH,
+    LLM_HEALTH_INTERVAL,
+    LLM_EJECT_FAILURES,
+    LLM_EJECT_SECONDS,
+)
+
+ROLE_URLS = {
+    "answer": ANSWER_URLS,
+    "embedding": EMBEDDING_URLS,
+    "vision": VISION_URLS,
+}
+
+EWMA_ALPHA = 0.3
+
+
+class Endpoint:
+    """One model server for a role, with the load/health stats the router balances on."""
+
+    def __init__(self, url: str):
+        self.url = url
+        parts = urlsplit(url)
+        self.health_url = f"{parts.scheme}://{parts.netloc}{LLM_HEALTH_PATH}"
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "ewma_latency": self.ewma_latency,
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+class EndpointRouter:
+    """
+    Picks an endpoint per request for one role:
+      - "least_outstanding": fewest in-flight requests (ties -> lower EWMA latency)
+      - "ewma": lowest latency EWMA weighted by in-flight requests
+    Endpoints that fail `LLM_EJECT_FAILURES` times in a row (or fail a health
+    check) are ejected for `LLM_EJECT_SECONDS`; the health checker re-admits them.
+    """
+
+    def __init__(self, role: str, urls: Iterable[str], strategy: str = LLM_BALANCE_STRATEGY):
+        self.role = role
+        self.strategy = strategy
+        self.endpoints: List[Endpoint] = [Endpoint(u) for u in urls]
+        if not self.endpoints:
+            raise ValueError(f"No endpoints configured for role '{role}'")
+        self._lock = threading.Lock()
+
+    def _cost(self, ep: Endpoint) -> tuple:
+        latency = ep.ewma_latency if ep.ewma_latency is not None else 0.0
+        if self.strategy == "ewma":
+            return (latency * (ep.outstanding + 1), ep.outstanding)
+        return (ep.outstanding, latency)
+
+    def pick(self) -> Endpoint:
+        with self._lock:
+            candidates = [ep for ep in self.endpoints if ep.healthy]
+            if not candidates:
+                # Everything is ejected: try the one due back soonest rather than failing here;
+                # the role's circuit breaker decides when to stop trying altogether.
+                candidates = [min(self.endpoints, key=lambda ep: ep.ejected_until)]
+            ep = min(candidates, key=self._cost)
+            ep.outstanding += 1
+            return ep
+
+    def release(self, ep: Endpoint, latency: Optional[float], ok: bool) -> None:
+        with self._lock:
+            ep.outstanding = max(0, ep.outstanding - 1)
+            if ok:
+                ep.consecutive_failures = 0
+                if latency is not None:
+                    if ep.ewma_latency is None:
+                        ep.ewma_latency = latency
+                    else:
+                        ep.ewma_latency = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * ep.ewma_latency
+            else:
+                ep.consecutive_failures += 1
+                if ep.consecutive_failures >= LLM_EJECT_FAILURES:
+                    self._eject(ep)
+
+    def _eject(self, ep: Endpoint) -> None:
+        if ep.healthy:
+            print(f"[WARN] Ejecting {self.role} endpoint {ep.url} for {LLM_EJECT_SECONDS:.0f}s")
+        ep.ejected_until = time.monotonic() + LLM_EJECT_SECONDS
+
+    def check_health(self, timeout: float = 3.0) -> None:
+        for ep in self.endpoints:
+            try:
+                resp = requests.get(ep.health_url, timeout=timeout)
+                alive = resp.status_code < 500
+            except requests.RequestException:
+                alive = False
+            with self._lock:
+                if alive:
+                    if not ep.healthy:
+                        print(f"[INFO] Re-admitting {self.role} endpoint {ep.url}")
+                    ep.ejected_until = 0.0
+                    ep.consecutive_failures = 0
+                else:
+                    self._eject(ep)
+
+
+_routers: Dict[str, EndpointRouter] = {}
+_routers_lock = threading.Lock()
+_health_thread: Optional[threading.Thread] = None
+
+
+def _health_loop() -> None:
+    while True:
+        time.sleep(LLM_HEALTH_INTERVAL)
+        for router in list(_routers.values()):
+            if len(router.endpoints) > 1:
+                router.check_health()
+
+
+def get_router(role: str) -> EndpointRouter:
+    global _health_thread
+    with _routers_lock:
+        if role not in _routers:
+            _routers[role] = EndpointRouter(role, ROLE_URLS[role])
+        if _health_thread is None and LLM_HEALTH_INTERVAL > 0:
+            _health_thread = threading.Thread(target=_health_loop, name="llm-health", daemon=True)
+            _health_thread.start()
+        return _routers[role]
+
+
+def router_status() -> Dict[str, List[Dict[str, object]]]:
+    """Per-role endpoint stats (for debugging / a status endpoint)."""
+    with _routers_lock:
+        return {role: [ep.snapshot() for ep in r.endpoints] for role, r in _routers.items()}
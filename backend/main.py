@@ -3,16 +3,33 @@ from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
+from typing import Optional
 import shutil
 import uuid
 
-from config import UPLOAD_DIR, STATIC_DIR
+from config import UPLOAD_DIR, STATIC_DIR, GRAPH_PAGE_SIZE, GRAPH_EXPAND_LIMIT, VECTOR_SEARCH_QUALITY
 from pipeline.pdf_ingest import extract_pdf_to_raw
 from pipeline.rag_graph_builder import ingest_raw_into_graph
 from pipeline.pgvector_index import index_doc_in_pgvector
-from pipeline.query_rag import rag_answer
-from models.neo4j_client import list_all_docs, get_graph_for_doc
+from pipeline.query_rag import rag_answer_async
+from pipeline.purge_document import purge_document
+from models.neo4j_client import (
+    list_all_docs_async,
+    init_driver,
+    close_driver,
+    init_async_driver,
+    close_async_driver,
+)
+from models.pg_client import open_pg_pool, close_pg_pool, open_sync_pg_pool, close_sync_pg_pools
+from models.pg_schema import ensure_pg_schema
+from models.vector_quality import load_calibration, QUALITY_LEVELS
+from models.graph_export import get_graph_view, expand_node, parse_page_cursor, LEVELS
+from models.graph_snapshot import refresh_snapshot
+from models.neo4j_schema import ensure_schema
+from llm.router import router_status
+from llm.resilience import close_async_client
 
 app = FastAPI(title="Enterprise KB App")
 
@@ -23,10 +40,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup():
+    # One pooled Neo4j driver for the whole process (ingestion runs in the threadpool)
+    init_driver()
+    try:
+        ensure_schema()
+    except Exception as e:
+        print(f"[WARN] Neo4j schema bootstrap failed: {e}")
+    # Async drivers/pools for the request path, bound to this event loop
+    await init_async_driver()
+    await open_pg_pool()
+    # rag_chunks migrations run here once, not on every upload
+    try:
+        # blocking pool for ingestion, purge and the threadpool search path
+        await run_in_threadpool(open_sync_pg_pool)
+        await run_in_threadpool(ensure_pg_schema)
+        # vector index kind + calibrated probes/ef_search per quality level
+        await run_in_threadpool(load_calibration)
+    except Exception as e:
+        print(f"[WARN] Postgres schema migration failed: {e}")
+    # In-memory graph snapshot for neighbourhood expansion and pin lookups
+    try:
+        await run_in_threadpool(refresh_snapshot)
+    except Exception as e:
+        print(f"[WARN] Graph snapshot load failed: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_async_client()
+    await close_pg_pool()
+    close_sync_pg_pools()
+    await close_async_driver()
+    close_driver()
+
+
 # Serve static files (images/tables)
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 
+def _ingest_pdf(pdf_path: Path, doc_id: str) -> dict:
+    # Blocking extraction + Neo4j/pgvector writes; run in the threadpool
+    raw_json = extract_pdf_to_raw(str(pdf_path), str(STATIC_DIR / doc_id))
+
+    # Save raw JSON to file for inspection
+    json_path = UPLOAD_DIR / f"{doc_id}.json"
+    import json
+    with json_path.open("w", encoding="utf-8") as f:
+        json.dump(raw_json, f, indent=2)
+
+    ingest_raw_into_graph(raw_json)
+    index_doc_in_pgvector(raw_json["doc_id"])
+    try:
+        refresh_snapshot([raw_json["doc_id"]])
+    except Exception as e:
+        print(f"[WARN] Graph snapshot refresh failed for {raw_json['doc_id']}: {e}")
+    return raw_json
+
+
 @app.post("/upload_pdf")
 async def upload_pdf(file: UploadFile = File(...)):
     """
@@ -41,16 +113,7 @@ async def upload_pdf(file: UploadFile = File(...)):
         with pdf_path.open("wb") as f:
             shutil.copyfileobj(file.file, f)
 
-        raw_json = extract_pdf_to_raw(str(pdf_path), str(STATIC_DIR / doc_id))
-        
-        # Save raw JSON to file for inspection
-        json_path = UPLOAD_DIR / f"{doc_id}.json"
-        import json
-        with json_path.open("w", encoding="utf-8") as f:
-            json.dump(raw_json, f, indent=2)
-            
-        ingest_raw_into_graph(raw_json)
-        index_doc_in_pgvector(raw_json["doc_id"])
+        raw_json = await run_in_threadpool(_ingest_pdf, pdf_path, doc_id)
 
         return {"status": "ok", "doc_id": raw_json["doc_id"], "filename": file.filename}
     except Exception as e:
@@ -60,31 +123,76 @@ async def upload_pdf(file: UploadFile = File(...)):
 @app.get("/documents")
 async def documents():
     """List documents currently in Neo4j."""
-    return list_all_docs()
+    return await list_all_docs_async()
+
+
+@app.delete("/documents/{doc_id}")
+def delete_document(doc_id: str):
+    """Remove a document from Neo4j, pgvector and static assets; returns per-stage counts."""
+    try:
+        deleted = purge_document(doc_id)
+        refresh_snapshot([doc_id])
+        return {"status": "ok", "doc_id": doc_id, "deleted": deleted}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/graph/{doc_id}")
-async def graph(doc_id: str):
-    """Return a lightweight graph {nodes, links} for a given doc."""
-    return get_graph_for_doc(doc_id)
+async def graph(doc_id: str, level: str = "summary", cursor: Optional[str] = None,
+                limit: int = GRAPH_PAGE_SIZE):
+    """
+    Return a lightweight graph {nodes, links, next_cursor} for a given doc.
+    level=summary collapses each page's children into counts; level=full
+    includes them. Pass next_cursor back as `cursor` for the next pages.
+    """
+    if level not in LEVELS:
+        raise HTTPException(status_code=400, detail=f"level must be one of {', '.join(LEVELS)}")
+    try:
+        parse_page_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await get_graph_view(doc_id, level=level, cursor=cursor, limit=max(1, min(limit, 500)))
+
+
+@app.get("/graph/{doc_id}/expand")
+async def graph_expand(doc_id: str, node_id: str, cursor: Optional[str] = None,
+                       limit: int = GRAPH_EXPAND_LIMIT):
+    """Children of one node from a previous /graph response, paginated by cursor."""
+    return await expand_node(doc_id, node_id, cursor=cursor, limit=max(1, min(limit, 1000)))
+
+
+@app.get("/llm/endpoints")
+async def llm_endpoints():
+    """Per-role model endpoint health / load as seen by the router."""
+    return router_status()
 
 
 @app.post("/ask")
 async def ask(payload: dict):
     """
-    RAG entrypoint. Expects: { "question": "..." }
+    RAG entrypoint. Expects:
+      { "question": "...", "quality": "fast|balanced|accurate|exact" (optional),
+        "doc_ids": ["..."] (optional: restrict vector search to these documents) }
     Returns:
       {
         "answer_text": str,
         "figures": [ { doc_id, node_id, page, image_url, caption } ],
-        "documents": [doc_id, ...]
+        "documents": [doc_id, ...],
+        "debug": { "timings_ms": {embedding, graph, vector, retrieval, pack, answer, total}, "errors": {...}, ... }
       }
     """
     question = payload.get("question")
     if not question:
         raise HTTPException(status_code=400, detail="Missing 'question'")
+    quality = payload.get("quality")
+    if quality is not None and quality not in QUALITY_LEVELS:
+        raise HTTPException(status_code=400, detail=f"quality must be one of {', '.join(QUALITY_LEVELS)}")
+
+    doc_ids = payload.get("doc_ids")
+    if doc_ids is not None and not (isinstance(doc_ids, list) and all(isinstance(d, str) for d in doc_ids)):
+        raise HTTPException(status_code=400, detail="'doc_ids' must be a list of strings")
 
-    result = rag_answer(question)
+    result = await rag_answer_async(question, quality or VECTOR_SEARCH_QUALITY, doc_ids or None)
     return JSONResponse(result)
 
 
@@ -104,13 +212,14 @@ async def evaluate_rag(payload: dict):
         raise HTTPException(status_code=400, detail="Missing 'question'")
         
     # 1. Get RAG answer
-    rag_result = rag_answer(question)
+    rag_result = await rag_answer_async(question)
     answer = rag_result["answer_text"]
     contexts = rag_result.get("contexts", [])
     
     # 2. Run Evaluation
     try:
-        eval_results = evaluate_response(question, answer, contexts, ground_truth)
+        # Ragas is blocking; keep it off the event loop
+        eval_results = await run_in_threadpool(evaluate_response, question, answer, contexts, ground_truth)
         
         # Convert Ragas EvaluationResult to dict (it doesn't have .items() directly in some versions)
         # using dict() wrapper usually works for the Result object
@@ -0,0 +1,216 @@
+"""
+Level-of-detail graph export for the /graph endpoints.
+
+  - summary: Document + one node per Page, children collapsed into counts
+    per label (Page 3: {TextBlock: 4, Figure: 2})
+  - full:    Pages with their direct children
+  - expand:  the children of one node, fetched when the user clicks it
+
+Every view is cursor-paginated (pages by page_number, expanded children by
+element id) and cached in-process keyed by the document's revision: its
+version, which ingestion bumps (neo4j_client.mark_document_ingested), plus
+the Document node's element id and ingested_at, because a purge deletes the
+node and a re-ingest starts again at version 1. Re-viewing a graph costs
+one indexed version lookup.
+"""
+
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import GRAPH_PAGE_SIZE, GRAPH_EXPAND_LIMIT, GRAPH_CACHE_SIZE
+from models.neo4j_client import get_async_driver
+
+LEVELS = ("summary", "full")
+
+_CACHE: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+
+# Display label for any node: its natural key, falling back to the label name
+_DISPLAY = "coalesce(c.figure_id, c.table_id, c.id, c.name, labels(c)[0])"
+
+_VERSION_QUERY = """
+MATCH (d:Document {doc_id: $doc_id})
+RETURN elementId(d) AS doc_eid, coalesce(d.version, 0) AS version,
+       toString(d.ingested_at) AS ingested_at
+"""
+
+_PAGES_HEAD = """
+MATCH (d:Document {doc_id: $doc_id})-[:HAS_PAGE]->(p:Page)
+WHERE $after IS NULL OR p.page_number > $after
+WITH p
+ORDER BY p.page_number
+LIMIT $limit
+"""
+
+_SUMMARY_QUERY = _PAGES_HEAD + """
+RETURN elementId(p) AS id, p.page_number AS page,
+       COLLECT { MATCH (p)-->(c) RETURN labels(c)[0] } AS child_labels
+"""
+
+_FULL_QUERY = _PAGES_HEAD + f"""
+RETURN elementId(p) AS id, p.page_number AS page,
+       COLLECT {{
+           MATCH (p)-[r]->(c)
+           RETURN {{id: elementId(c), label: {_DISPLAY}, group: labels(c)[0], type: type(r),
+                   degree: COUNT {{ (c)-->() }}}}
+       }} AS children
+"""
+
+# The node must belong to the document: it carries the doc_id (Document, Page,
+# ontology nodes) or hangs off one of its pages (content, QA triples)
+_EXPAND_QUERY = f"""
+MATCH (n) WHERE elementId(n) = $node_id
+  AND (n.doc_id = $doc_id
+       OR EXISTS {{ MATCH (:Page {{doc_id: $doc_id}})-->(n) }}
+       OR EXISTS {{ MATCH (:Page {{doc_id: $doc_id}})-->()-[:HAS_QA]->(n) }})
+MATCH (n)-[r]->(c)
+WITH r, c, elementId(c) AS id
+WHERE $after IS NULL OR id > $after
+RETURN id, {_DISPLAY} AS label, labels(c)[0] AS group, type(r) AS type,
+       COUNT {{ (c)-->() }} AS degree
+ORDER BY id
+LIMIT $limit
+"""
+
+
+def _cache_get(key: Tuple) -> Optional[Dict[str, Any]]:
+    value = _CACHE.get(key)
+    if value is not None:
+        _CACHE.move_to_end(key)
+    return value
+
+
+def _cache_put(key: Tuple, value: Dict[str, Any]) -> None:
+    _CACHE[key] = value
+    _CACHE.move_to_end(key)
+    while len(_CACHE) > GRAPH_CACHE_SIZE:
+        _CACHE.popitem(last=False)
+
+
+def parse_page_cursor(cursor: Optional[str]) -> Optional[int]:
+    """The page number a /graph cursor points after; ValueError if it isn't one."""
+    if not cursor:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise ValueError(f"invalid cursor {cursor!r}: expected a page number") from None
+
+
+def cache_info() -> Dict[str, int]:
+    return {"entries": len(_CACHE), "max_entries": GRAPH_CACHE_SIZE}
+
+
+async def _document_version(session, doc_id: str) -> Optional[Dict[str, Any]]:
+    result = await session.run(_VERSION_QUERY, doc_id=doc_id)
+    record = await result.single()
+    return record.data() if record else None
+
+
+def _revision(doc: Dict[str, Any]) -> Tuple:
+    return (doc["doc_eid"], doc["version"], doc["ingested_at"])
+
+
+def _page_node(record) -> Dict[str, Any]:
+    return {"id": record["id"], "label": f"Page {record['page']}", "group": "Page"}
+
+
+async def get_graph_view(
+    doc_id: str,
+    level: str = "summary",
+    cursor: Optional[str] = None,
+    limit: int = GRAPH_PAGE_SIZE,
+) -> Dict[str, Any]:
+    """
+    One page-window of a document graph:
+      { doc_id, version, level, nodes: [{id, label, group, ...}],
+        links: [{source, target, type}], next_cursor }
+    Pass `next_cursor` back as `cursor` to get the following pages.
+    """
+    if level not in LEVELS:
+        raise ValueError(f"level must be one of {LEVELS}")
+    after = parse_page_cursor(cursor)
+
+    async with get_async_driver().session() as session:
+        doc = await _document_version(session, doc_id)
+        if doc is None:
+            return {"doc_id": doc_id, "version": None, "level": level,
+                    "nodes": [], "links": [], "next_cursor": None}
+
+        key = ("view", doc_id, _revision(doc), level, after, limit)
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+
+        query = _SUMMARY_QUERY if level == "summary" else _FULL_QUERY
+        result = await session.run(query, doc_id=doc_id, after=after, limit=limit + 1)
+        records = [r async for r in result]
+
+    has_more = len(records) > limit
+    records = records[:limit]
+
+    nodes = [{"id": doc["doc_eid"], "label": doc_id, "group": "Document"}]
+    links = []
+    for r in records:
+        page = _page_node(r)
+        links.append({"source": doc["doc_eid"], "target": page["id"], "type": "HAS_PAGE"})
+        if level == "summary":
+            page["counts"] = dict(Counter(r["child_labels"]))
+            page["expandable"] = bool(r["child_labels"])
+            nodes.append(page)
+            continue
+        nodes.append(page)
+        for c in r["children"]:
+            nodes.append({"id": c["id"], "label": c["label"], "group": c["group"],
+                          "expandable": c["degree"] > 0})
+            links.append({"source": page["id"], "target": c["id"], "type": c["type"]})
+
+    view = {
+        "doc_id": doc_id,
+        "version": doc["version"],
+        "level": level,
+        "nodes": nodes,
+        "links": links,
+        "next_cursor": str(records[-1]["page"]) if has_more else None,
+    }
+    _cache_put(key, view)
+    return view
+
+
+async def expand_node(
+    doc_id: str,
+    node_id: str,
+    cursor: Optional[str] = None,
+    limit: int = GRAPH_EXPAND_LIMIT,
+) -> Dict[str, Any]:
+    """
+    Direct children of `node_id` (an element id from a previous view):
+      { node_id, version, nodes, links, next_cursor }
+    """
+    async with get_async_driver().session() as session:
+        doc = await _document_version(session, doc_id)
+        version = doc["version"] if doc else None
+
+        key = ("expand", doc_id, _revision(doc) if doc else None, node_id, cursor, limit)
+        cached = _cache_get(key) if doc else None
+        if cached is not None:
+            return cached
+
+        result = await session.run(_EXPAND_QUERY, doc_id=doc_id, node_id=node_id, after=cursor, limit=limit + 1)
+        records: List[Any] = [r async for r in result]
+
+    has_more = len(records) > limit
+    records = records[:limit]
+
+    view = {
+        "node_id": node_id,
+        "version": version,
+        "nodes": [
+            {"id": r["id"], "label": r["label"], "group": r["group"], "expandable": r["degree"] > 0}
+            for r in records
+        ],
+        "links": [{"source": node_id, "target": r["id"], "type": r["type"]} for r in records],
+        "next_cursor": records[-1]["id"] if has_more else None,
+    }
+    if doc:
+        _cache_put(key, view)
+    return view
@@ -0,0 +1,160 @@
+"""
+Graph overview for the Streamlit knowledge-graph page.
+
+Instead of the first N arbitrary (n)-[r]-(m) rows with full property maps,
+an overview is:
+  - per-label node counts and per-relationship-type counts
+  - a stratified sample: up to `per_label` random nodes of every label
+  - the relationships among the sampled nodes
+Nodes are projected to display properties only (id, label, name, doc_id,
+page_number), so page text never crosses the wire.
+
+ingestion_epoch() changes whenever a document is ingested or purged and is
+meant to be part of any cache key for these results.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from models.neo4j_client import get_driver
+
+DEFAULT_PER_LABEL = 15
+
+# Display projection shared by every sampling query
+_PROJECTION = """{
+    id: elementId(n),
+    label: labels(n)[0],
+    name: CASE WHEN n:Page THEN 'Page ' + toString(n.page_number)
+               ELSE coalesce(n.name, n.figure_id, n.table_id, n.id, n.doc_id, labels(n)[0]) END,
+    doc_id: n.doc_id,
+    page_number: n.page_number
+}"""
+
+# Every node that belongs to one document, via bounded, typed hops
+# (also the node set graph_snapshot loads)
+DOC_NODES_MATCH = """
+MATCH (d:Document {doc_id: $doc_id})
+CALL {
+    WITH d RETURN d AS n
+    UNION
+    WITH d MATCH (d)-[:HAS_PAGE]->(n:Page) RETURN n
+    UNION
+    WITH d MATCH (d)-[:HAS_PAGE]->(:Page)-[:HAS_TEXT_BLOCK|HAS_FIGURE|HAS_TABLE]->(n) RETURN n
+    UNION
+    WITH d MATCH (d)-[:HAS_PAGE]->(:Page)-[:HAS_FIGURE|HAS_TABLE]->()-[:HAS_QA|HAS_SPEC_ITEM]->(n) RETURN n
+    UNION
+    WITH d MATCH (d)-[:HAS_IC]->(n:IC) RETURN n
+    UNION
+    WITH d MATCH (d)-[:HAS_IC]->(:IC)-[:HAS_PIN]->(n:Pin) RETURN n
+    UNION
+    WITH d MATCH (d)-[:HAS_IC]->(:IC)-[:HAS_PIN]->(:Pin)-[:HAS_CONSTRAINT]->(n:Constraint) RETURN n
+}
+WITH DISTINCT n
+"""
+
+_DOC_LABEL_SAMPLE = DOC_NODES_MATCH + f"""
+WITH labels(n)[0] AS label, collect(n) AS nodes
+WITH label, nodes, size(nodes) AS count
+WITH label, count, [x IN nodes WHERE rand() < toFloat($per_label) * 1.5 / count][..$per_label] AS picked
+RETURN label, count, [n IN picked | {_PROJECTION}] AS sample
+"""
+
+_DOC_REL_COUNTS = DOC_NODES_MATCH + """
+MATCH (n)-[r]->()
+RETURN type(r) AS type, count(r) AS count
+"""
+
+_SAMPLE_EDGES = """
+UNWIND $ids AS id
+MATCH (a) WHERE elementId(a) = id
+MATCH (a)-[r]->(b)
+WHERE elementId(b) IN $ids
+RETURN elementId(a) AS source, elementId(b) AS target, type(r) AS type
+"""
+
+_EPOCH_QUERY = """
+MATCH (d:Document)
+RETURN count(d) AS documents,
+       sum(coalesce(d.version, 0)) AS versions,
+       toString(max(d.ingested_at)) AS last_ingested
+"""
+
+
+def _quote(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def ingestion_epoch() -> str:
+    """A token that changes on every ingestion (version bump) or document purge."""
+    with get_driver().session() as session:
+        r = session.run(_EPOCH_QUERY).single()
+    return f"{r['documents']}:{r['versions']}:{r['last_ingested']}"
+
+
+def _global_overview(session, per_label: int) -> Dict[str, Any]:
+    labels: List[Dict[str, Any]] = []
+    nodes: List[Dict[str, Any]] = []
+    for record in session.run("CALL db.labels() YIELD label RETURN label ORDER BY label"):
+        label = record["label"]
+        if label.startswith("_"):
+            continue  # bookkeeping labels such as _SchemaVersion
+        # single-label counts are answered from the count store
+        count = session.run(f"MATCH (n:{_quote(label)}) RETURN count(n) AS c").single()["c"]
+        if not count:
+            continue
+        labels.append({"label": label, "count": count})
+        sample = session.run(
+            f"""
+            MATCH (n:{_quote(label)})
+            WHERE rand() < toFloat($per_label) * 1.5 / $count
+            RETURN {_PROJECTION} AS node
+            LIMIT $per_label
+            """,
+            per_label=per_label,
+            count=count,
+        )
+        nodes.extend(r["node"] for r in sample)
+
+    relationships = []
+    for record in session.run("CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType AS type ORDER BY type"):
+        rel_type = record["type"]
+        count = session.run(f"MATCH ()-[r:{_quote(rel_type)}]->() RETURN count(r) AS c").single()["c"]
+        if count:
+            relationships.append({"type": rel_type, "count": count})
+    return {"labels": labels, "relationships": relationships, "nodes": nodes}
+
+
+def _doc_overview(session, doc_id: str, per_label: int) -> Dict[str, Any]:
+    labels: List[Dict[str, Any]] = []
+    nodes: List[Dict[str, Any]] = []
+    for r in session.run(_DOC_LABEL_SAMPLE, doc_id=doc_id, per_label=per_label):
+        labels.append({"label": r["label"], "count": r["count"]})
+        nodes.extend(r["sample"])
+    labels.sort(key=lambda x: x["label"])
+
+    relationships = [
+        {"type": r["type"], "count": r["count"]}
+        for r in session.run(_DOC_REL_COUNTS, doc_id=doc_id)
+    ]
+    relationships.sort(key=lambda x: x["type"])
+    return {"labels": labels, "relationships": relationships, "nodes": nodes}
+
+
+def graph_overview(doc_id: Optional[str] = None, per_label: int = DEFAULT_PER_LABEL) -> Dict[str, Any]:
+    """
+    Aggregates plus a stratified sample for the whole graph or one document:
+      {
+        "labels":        [{label, count}],
+        "relationships": [{type, count}],
+        "nodes":         [{id, label, name, doc_id, page_number}],   # sample
+        "edges":         [{source, target, type}],                   # among sampled nodes
+      }
+    """
+    with get_driver().session() as session:
+        if doc_id:
+            overview = _doc_overview(session, doc_id, per_label)
+        else:
+            overview = _global_overview(session, per_label)
+
+        ids = [n["id"] for n in overview["nodes"]]
+        overview["edges"] = [r.data() for r in session.run(_SAMPLE_EDGES, ids=ids)] if ids else []
+    return overview
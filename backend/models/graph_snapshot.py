@@ -0,0 +1,363 @@
+"""
+In-process snapshot of the document graph for retrieval.
+
+Each document's subgraph (Document -> Page -> TextBlock/Figure/Table -> QA_Triple/SpecItem,
+Document -> IC -> Pin -> Constraint, plus MENTIONED_IN / DERIVED_FROM / APPLIES_TO_PIN)
+is held as:
+  - integer node ids (0..n-1 within the document)
+  - one CSR adjacency (indptr, indices) per relationship type, outgoing and incoming
+  - string properties as int32 offsets into one per-document string table,
+    so repeated values (pin names, labels, paths) are stored once
+
+A document is only (re)loaded when its revision changes: the version that
+neo4j_client.mark_document_ingested bumps, plus the Document node's element id and
+ingested_at, since a purge deletes the node and a re-ingest starts again at version 1.
+refresh_snapshot() after an ingestion costs one version query plus the changed document. Neighbourhood expansion and pin lookups then run without a Neo4j
+round trip; callers fall back to Cypher for documents that are not in the snapshot.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    GRAPH_SNAPSHOT_ENABLED,
+    GRAPH_SNAPSHOT_REFRESH,
+    GRAPH_EXPAND_SEEDS,
+    GRAPH_EXPAND_FANOUT,
+)
+from models.neo4j_client import get_driver, expansion_seeds, expansion_to_chunks
+from models.graph_overview import DOC_NODES_MATCH
+
+_PROPS = ("key", "name", "text", "title", "path", "data", "question", "answer")
+
+_NODES_QUERY = DOC_NODES_MATCH + """
+RETURN elementId(n) AS eid,
+       labels(n)[0] AS label,
+       coalesce(n.id, n.figure_id, n.table_id, n.name, toString(n.page_number), n.doc_id) AS key,
+       n.page_number AS page_number,
+       n.name AS name,
+       coalesce(n.summary, n.natural_language_context, n.description, n.raw_text, n.title) AS text,
+       n.title AS title,
+       n.path AS path,
+       n.data AS data,
+       n.question AS question,
+       n.answer AS answer
+"""
+
+_EDGES_QUERY = """
+UNWIND $eids AS eid
+MATCH (a) WHERE elementId(a) = eid
+MATCH (a)-[r]->(b)
+RETURN eid AS source, type(r) AS type, elementId(b) AS target
+"""
+
+_VERSIONS_QUERY = """
+MATCH (d:Document)
+WHERE $doc_ids IS NULL OR d.doc_id IN $doc_ids
+RETURN d.doc_id AS doc_id, elementId(d) AS doc_eid, coalesce(d.version, 0) AS version,
+       toString(d.ingested_at) AS ingested_at
+"""
+
+_CHILD_RELS = ("HAS_TEXT_BLOCK", "HAS_FIGURE", "HAS_TABLE")
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+def _csr(n: int, src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    indptr[1:] = np.cumsum(np.bincount(src, minlength=n))
+    return indptr, dst[order].astype(np.int32)
+
+
+class DocGraph:
+    """Immutable CSR view of one document's subgraph."""
+
+    def __init__(self, doc_id: str, version: int, nodes: List[Dict[str, Any]],
+                 edges: List[Tuple[str, str, str]], revision: Tuple = ()):
+        self.doc_id = doc_id
+        self.version = version
+        self.revision = revision
+        self.size = len(nodes)
+
+        self.labels: Tuple[str, ...] = tuple(sorted({n["label"] for n in nodes}))
+        label_code = {label: i for i, label in enumerate(self.labels)}
+        self.label = np.array([label_code[n["label"]] for n in nodes], dtype=np.int16)
+        self.page_number = np.array(
+            [n["page_number"] if n["page_number"] is not None else -1 for n in nodes], dtype=np.int32
+        )
+
+        # string table: every distinct property value stored once, referenced by offset
+        self.strings: List[str] = []
+        offsets: Dict[str, int] = {}
+
+        def intern(value: Any) -> int:
+            if value is None:
+                return -1
+            value = value if isinstance(value, str) else str(value)
+            if value not in offsets:
+                offsets[value] = len(self.strings)
+                self.strings.append(value)
+            return offsets[value]
+
+        self.props = {p: np.array([intern(n[p]) for n in nodes], dtype=np.int32) for p in _PROPS}
+
+        self.index: Dict[Tuple[str, str], int] = {}
+        self.pins_by_name: Dict[str, List[int]] = {}
+        eid_to_id = {}
+        for i, n in enumerate(nodes):
+            eid_to_id[n["eid"]] = i
+            if n["key"] is not None:
+                self.index.setdefault((n["label"], str(n["key"])), i)
+            if n["label"] == "Pin" and n["name"]:
+                self.pins_by_name.setdefault(n["name"], []).append(i)
+
+        by_type: Dict[str, List[Tuple[int, int]]] = {}
+        for source, rel_type, target in edges:
+            a, b = eid_to_id.get(source), eid_to_id.get(target)
+            if a is not None and b is not None:
+                by_type.setdefault(rel_type, []).append((a, b))
+
+        self.out: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.inc: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for rel_type, pairs in by_type.items():
+            arr = np.array(pairs, dtype=np.int32)
+            self.out[rel_type] = _csr(self.size, arr[:, 0], arr[:, 1])
+            self.inc[rel_type] = _csr(self.size, arr[:, 1], arr[:, 0])
+        self.edge_count = len(edges)
+
+    # ---------- primitive lookups ----------
+
+    def node(self, label: str, key: str) -> Optional[int]:
+        return self.index.get((label, str(key)))
+
+    def label_of(self, i: int) -> str:
+        return self.labels[self.label[i]]
+
+    def prop(self, i: int, name: str) -> Optional[str]:
+        offset = self.props[name][i]
+        return self.strings[offset] if offset >= 0 else None
+
+    def neighbours(self, i: int, rel_types: Iterable[str], incoming: bool = False) -> np.ndarray:
+        adjacency = self.inc if incoming else self.out
+        parts = []
+        for rel_type in rel_types:
+            csr = adjacency.get(rel_type)
+            if csr is not None:
+                indptr, indices = csr
+                parts.append(indices[indptr[i]:indptr[i + 1]])
+        if not parts:
+            return _EMPTY
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _with_label(self, ids: np.ndarray, label: str) -> np.ndarray:
+        if label not in self.labels or not len(ids):
+            return _EMPTY
+        return ids[self.label[ids] == self.labels.index(label)]
+
+    def _page_of(self, i: int) -> Optional[int]:
+        pages = self._with_label(self.neighbours(i, _CHILD_RELS, incoming=True), "Page")
+        return int(pages[0]) if len(pages) else None
+
+    def _first_pin_name(self, i: int) -> Optional[str]:
+        pins = self.neighbours(i, ("HAS_CONSTRAINT",), incoming=True)
+        return self.prop(int(pins[0]), "name") if len(pins) else None
+
+    def _neighbour(self, i: int, **extra: Any) -> Dict[str, Any]:
+        # same shape as neo4j_client._neighbour, so expansion_to_chunks can consume both
+        return {
+            "label": self.label_of(i),
+            "id": self.prop(i, "key"),
+            "text": self.prop(i, "text"),
+            "title": self.prop(i, "title"),
+            "path": self.prop(i, "path"),
+            "data": self.prop(i, "data"),
+            **extra,
+        }
+
+    @staticmethod
+    def _distinct(ids: Iterable[int], exclude: int, cap: int) -> List[int]:
+        picked: List[int] = []
+        for j in ids:
+            j = int(j)
+            if j != exclude and j not in picked:
+                picked.append(j)
+                if len(picked) >= cap:
+                    break
+        return picked
+
+    # ---------- retrieval ----------
+
+    def expansion_record(self, seed: Dict[str, Any], fanout: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """The row neo4j_client._EXPAND_QUERY returns for one seed, built from the snapshot."""
+        n = self.node(seed["source"], seed["node_id"])
+        if n is None:
+            return None
+        pg = self._page_of(n)
+
+        siblings = []
+        if pg is not None:
+            siblings = [self._neighbour(s) for s in
+                        self._distinct(self.neighbours(pg, _CHILD_RELS), n, fanout["sibling"])]
+
+        sources = []
+        for s in self._distinct(self.neighbours(n, ("DERIVED_FROM",)), n, fanout["source"]):
+            sp = self._page_of(s)
+            sources.append(self._neighbour(s, page=int(self.page_number[sp]) if sp is not None else None))
+
+        qa = [
+            {"id": self.prop(q, "key"), "question": self.prop(q, "question"), "answer": self.prop(q, "answer")}
+            for q in self._distinct(self._with_label(self.neighbours(n, ("HAS_QA",)), "QA_Triple"), n, fanout["qa"])
+        ]
+
+        pins = self._with_label(self.neighbours(n, ("MENTIONED_IN", "HAS_CONSTRAINT"), incoming=True), "Pin")
+
+        derived = self._with_label(self.neighbours(n, ("DERIVED_FROM",), incoming=True), "Constraint")
+        constraints = [self._neighbour(c, pin=self._first_pin_name(c))
+                       for c in self._distinct(derived, n, fanout["constraint"])]
+        pin_constraints = [(c, p) for p in pins for c in self.neighbours(int(p), ("HAS_CONSTRAINT",))]
+        for c in self._distinct((c for c, _ in pin_constraints), n, fanout["constraint"]):
+            p = next(int(p) for c2, p in pin_constraints if int(c2) == c)
+            constraints.append(self._neighbour(c, pin=self.prop(p, "name")))
+
+        spec_items = [self._neighbour(s) for s in
+                      self._distinct(self.neighbours(n, ("HAS_SPEC_ITEM",)), n, fanout["spec_item"])]
+        pin_specs = [(s, p) for p in pins for s in self.neighbours(int(p), ("APPLIES_TO_PIN",), incoming=True)]
+        for s in self._distinct((s for s, _ in pin_specs), n, fanout["spec_item"]):
+            p = next(int(p) for s2, p in pin_specs if int(s2) == s)
+            spec_items.append(self._neighbour(s, pin=self.prop(p, "name")))
+
+        return {
+            "seed_id": seed["node_id"],
+            "seed_source": seed["source"],
+            "seed_doc_id": seed["doc_id"],
+            "page": int(self.page_number[pg]) if pg is not None else None,
+            "siblings": siblings,
+            "sources": sources,
+            "qa": qa,
+            "constraints": constraints,
+            "spec_items": spec_items,
+        }
+
+    def pin_context(self, pin_name: str) -> Dict[str, List[str]]:
+        """Same result as Neo4jRAGRetriever.get_context_for_pin."""
+        found = {"TextBlock": [], "Figure": [], "Table": [], "Constraint": []}
+        for p in self.pins_by_name.get(pin_name, []):
+            for i in self.neighbours(p, ("MENTIONED_IN", "HAS_CONSTRAINT")):
+                label = self.label_of(int(i))
+                text = self.prop(int(i), "text")
+                if label in found and text and text not in found[label]:
+                    found[label].append(text)
+        return {
+            "text_blocks": found["TextBlock"],
+            "figure_contexts": found["Figure"],
+            "table_contexts": found["Table"],
+            "constraints": found["Constraint"],
+        }
+
+
+_SNAPSHOT: Dict[str, DocGraph] = {}
+_REFRESH_LOCK = threading.Lock()
+_last_refresh = 0.0
+
+
+def _load_doc(session, doc_id: str, version: int, revision: Tuple) -> DocGraph:
+    nodes = [r.data() for r in session.run(_NODES_QUERY, doc_id=doc_id)]
+    eids = [n["eid"] for n in nodes]
+    edges = [(r["source"], r["type"], r["target"]) for r in session.run(_EDGES_QUERY, eids=eids)] if eids else []
+    return DocGraph(doc_id, version, nodes, edges, revision)
+
+
+def refresh_snapshot(doc_ids: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """
+    Bring the snapshot up to date with Neo4j. Only documents whose revision
+    changed are reloaded; purged documents are dropped. Pass `doc_ids` to
+    check just those documents (e.g. right after ingesting one).
+    """
+    global _SNAPSHOT, _last_refresh
+    changes: Dict[str, List[str]] = {"loaded": [], "dropped": []}
+    if not GRAPH_SNAPSHOT_ENABLED:
+        return changes
+
+    with _REFRESH_LOCK:
+        snapshot = dict(_SNAPSHOT)
+        with get_driver().session() as session:
+            versions = {
+                r["doc_id"]: (r["doc_eid"], r["version"], r["ingested_at"])
+                for r in session.run(_VERSIONS_QUERY, doc_ids=doc_ids)
+            }
+            for doc_id, revision in versions.items():
+                current = snapshot.get(doc_id)
+                if current is None or current.revision != revision:
+                    version = revision[1]
+                    started = time.perf_counter()
+                    snapshot[doc_id] = _load_doc(session, doc_id, version, revision)
+                    changes["loaded"].append(doc_id)
+                    print(f"[INFO] graph snapshot: loaded {doc_id} v{version} "
+                          f"({snapshot[doc_id].size} nodes, {snapshot[doc_id].edge_count} edges) "
+                          f"in {time.perf_counter() - started:.2f}s")
+        for doc_id in list(snapshot):
+            if (doc_ids is None or doc_id in doc_ids) and doc_id not in versions:
+                del snapshot[doc_id]
+                changes["dropped"].append(doc_id)
+        # readers keep using the old dict until this single assignment
+        _SNAPSHOT = snapshot
+        if doc_ids is None:
+            _last_refresh = time.monotonic()
+    return changes
+
+
+def maybe_refresh_snapshot() -> None:
+    """Refresh in the background when the last full check is older than GRAPH_SNAPSHOT_REFRESH."""
+    if not GRAPH_SNAPSHOT_ENABLED or time.monotonic() - _last_refresh < GRAPH_SNAPSHOT_REFRESH:
+        return
+    if _REFRESH_LOCK.locked():
+        return
+
+    def run():
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            print(f"[WARN] graph snapshot refresh failed: {e}")
+
+    threading.Thread(target=run, name="graph-snapshot-refresh", daemon=True).start()
+
+
+def get_doc_graph(doc_id: str) -> Optional[DocGraph]:
+    return _SNAPSHOT.get(doc_id)
+
+
+def snapshot_info() -> Dict[str, Any]:
+    return {
+        "enabled": GRAPH_SNAPSHOT_ENABLED,
+        "documents": {
+            doc_id: {"version": g.version, "nodes": g.size, "edges": g.edge_count}
+            for doc_id, g in _SNAPSHOT.items()
+        },
+    }
+
+
+def expand_graph_neighbourhood(
+    hits: List[Dict[str, Any]],
+    max_seeds: int = GRAPH_EXPAND_SEEDS,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Snapshot version of neo4j_client.expand_graph_neighbourhood. Returns None
+    when any seed's document is not in the snapshot, so the caller can fall
+    back to the Cypher query.
+    """
+    seeds = expansion_seeds(hits, max_seeds)
+    if not seeds:
+        return []
+    snapshot = _SNAPSHOT
+    records = []
+    for seed in seeds:
+        graph = snapshot.get(seed["doc_id"])
+        if graph is None:
+            return None
+        record = graph.expansion_record(seed, GRAPH_EXPAND_FANOUT)
+        if record is not None:
+            records.append(record)
+    return expansion_to_chunks(records, hits)
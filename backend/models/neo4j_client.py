@@ -1,58 +1,176 @@
 
-from typing import List, Dict, Any
-from neo4j import GraphDatabase
-from config import NEO4J_URI, NEO4J_USER, NEO4J_PASS
+import atexit
+import json
+import re
+import threading
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from neo4j import GraphDatabase, Driver, AsyncGraphDatabase, AsyncDriver
+from config import (
+    NEO4J_URI,
+    NEO4J_USER,
+    NEO4J_PASS,
+    NEO4J_MAX_POOL_SIZE,
+    NEO4J_ACQUISITION_TIMEOUT,
+    NEO4J_CONNECTION_TIMEOUT,
+    NEO4J_MAX_CONN_LIFETIME,
+    GRAPH_CONTEXT_PAGE_LIMIT,
+    FULLTEXT_HIT_LIMIT,
+    GRAPH_EXPAND_SEEDS,
+    GRAPH_EXPAND_FANOUT,
+    GRAPH_EXPAND_DECAY,
+)
 
-def _driver():
-    return GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+# Full-text (Lucene) index over Page/TextBlock/Figure/Table/QA_Triple text; created by models.neo4j_schema
+CONTENT_FULLTEXT_INDEX = "kb_content_text"
+
+# Process-wide drivers (one per uri/user). A driver owns a connection pool and
+# is thread-safe; sessions are cheap and must not be shared across threads.
+_DRIVERS: Dict[Tuple[str, str], Driver] = {}
+_DRIVERS_LOCK = threading.Lock()
+
+# Async driver for the FastAPI request path; lives on the server's event loop.
+_ASYNC_DRIVER: Optional[AsyncDriver] = None
+
+def _driver_settings() -> Dict[str, Any]:
+    return dict(
+        max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+        connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+        connection_timeout=NEO4J_CONNECTION_TIMEOUT,
+        max_connection_lifetime=NEO4J_MAX_CONN_LIFETIME,
+    )
+
+def get_driver(uri: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None) -> Driver:
+    """
+    Return the shared driver for (uri, user), creating it on first use.
+    Defaults to the configured NEO4J_* connection.
+    """
+    uri = uri or NEO4J_URI
+    user = user or NEO4J_USER
+    password = password or NEO4J_PASS
+    key = (uri, user)
+    with _DRIVERS_LOCK:
+        driver = _DRIVERS.get(key)
+        if driver is None:
+            driver = GraphDatabase.driver(uri, auth=(user, password), **_driver_settings())
+            _DRIVERS[key] = driver
+        return driver
+
+def init_driver() -> Driver:
+    """Create the default driver eagerly and check connectivity (FastAPI startup)."""
+    driver = get_driver()
+    try:
+        driver.verify_connectivity()
+    except Exception as e:
+        print(f"[WARN] Neo4j not reachable at startup: {e}")
+    return driver
+
+def close_driver() -> None:
+    """Close every shared driver (FastAPI shutdown / process exit)."""
+    with _DRIVERS_LOCK:
+        drivers = list(_DRIVERS.values())
+        _DRIVERS.clear()
+    for driver in drivers:
+        driver.close()
+
+atexit.register(close_driver)
+
+def get_async_driver() -> AsyncDriver:
+    """Return the shared async driver for the configured NEO4J_* connection."""
+    global _ASYNC_DRIVER
+    if _ASYNC_DRIVER is None:
+        _ASYNC_DRIVER = AsyncGraphDatabase.driver(
+            NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS), **_driver_settings()
+        )
+    return _ASYNC_DRIVER
+
+async def init_async_driver() -> AsyncDriver:
+    """Create the async driver on the running loop and check connectivity."""
+    driver = get_async_driver()
+    try:
+        await driver.verify_connectivity()
+    except Exception as e:
+        print(f"[WARN] Neo4j (async) not reachable at startup: {e}")
+    return driver
+
+async def close_async_driver() -> None:
+    global _ASYNC_DRIVER
+    driver, _ASYNC_DRIVER = _ASYNC_DRIVER, None
+    if driver is not None:
+        await driver.close()
+
+# Run at the end of every ingestion into a document. Caches of per-document
+# views (models.graph_export) key on d.version, so a bump invalidates them.
+_MARK_INGESTED_QUERY = """
+MATCH (d:Document {doc_id: $doc_id})
+SET d.version = coalesce(d.version, 0) + 1,
+    d.ingested_at = datetime()
+RETURN d.version AS version
+"""
+
+def mark_document_ingested(doc_id: str, runner=None) -> Optional[int]:
+    """Bump the document's version; `runner` may be an open session or transaction."""
+    if runner is None:
+        with get_driver().session() as session:
+            return mark_document_ingested(doc_id, session)
+    record = runner.run(_MARK_INGESTED_QUERY, doc_id=doc_id).single()
+    return record["version"] if record else None
+
+_LIST_DOCS_QUERY = "MATCH (d:Document) RETURN d.doc_id AS doc_id ORDER BY d.doc_id"
 
 def list_all_docs() -> List[str]:
-    driver = _driver()
+    driver = get_driver()
     with driver.session() as session:
-        result = session.run("MATCH (d:Document) RETURN d.doc_id AS doc_id ORDER BY d.doc_id")
+        result = session.run(_LIST_DOCS_QUERY)
         docs = [r["doc_id"] for r in result]
-    driver.close()
     return docs
 
+async def list_all_docs_async() -> List[str]:
+    async with get_async_driver().session() as session:
+        result = await session.run(_LIST_DOCS_QUERY)
+        return [r["doc_id"] async for r in result]
+
+_GRAPH_FOR_DOC_QUERY = """
+MATCH (d:Document {doc_id:$doc_id})-[:HAS_PAGE]->(p:Page)
+OPTIONAL MATCH (p)-[rp]->(c)
+RETURN d, p, rp, c
+"""
+
+def _add_graph_record(nodes: Dict[Any, Dict[str, Any]], links: List[Dict[str, Any]], r) -> None:
+    d = r["d"]
+    p = r["p"]
+    rel = r["rp"]
+    c = r["c"]
+
+    doc_key = d.id
+    if doc_key not in nodes:
+        nodes[doc_key] = {"id": doc_key, "label": d["doc_id"], "group": "Document"}
+
+    page_key = p.id
+    if page_key not in nodes:
+        nodes[page_key] = {"id": page_key, "label": f"Page {p['page_number']}", "group": "Page"}
+
+    links.append({"source": doc_key, "target": page_key, "type": "HAS_PAGE"})
+
+    if c is not None and rel is not None:
+        child_key = c.id
+        label = c.get("figure_id") or c.get("id") or "node"
+        group = list(c.labels)[0] if c.labels else "Node"
+        if child_key not in nodes:
+            nodes[child_key] = {"id": child_key, "label": label, "group": group}
+        links.append({"source": page_key, "target": child_key, "type": rel.type})
+
 def get_graph_for_doc(doc_id: str) -> Dict[str, Any]:
     """
     Return a lightweight graph suitable for force-directed visualisation:
       { "nodes": [{id, label, group}], "links": [{source, target, type}] }
     """
-    driver = _driver()
+    driver = get_driver()
     nodes = {}
     links = []
     with driver.session() as session:
-        q = """
-        MATCH (d:Document {doc_id:$doc_id})-[:HAS_PAGE]->(p:Page)
-        OPTIONAL MATCH (p)-[rp]->(c)
-        RETURN d, p, rp, c
-        """
-        for r in session.run(q, doc_id=doc_id):
-            d = r["d"]
-            p = r["p"]
-            rel = r["rp"]
-            c = r["c"]
-
-            doc_key = d.id
-            if doc_key not in nodes:
-                nodes[doc_key] = {"id": doc_key, "label": d["doc_id"], "group": "Document"}
-
-            page_key = p.id
-            if page_key not in nodes:
-                nodes[page_key] = {"id": page_key, "label": f"Page {p['page_number']}", "group": "Page"}
-
-            links.append({"source": doc_key, "target": page_key, "type": "HAS_PAGE"})
-
-            if c is not None and rel is not None:
-                child_key = c.id
-                label = c.get("figure_id") or c.get("id") or "node"
-                group = list(c.labels)[0] if c.labels else "Node"
-                if child_key not in nodes:
-                    nodes[child_key] = {"id": child_key, "label": label, "group": group}
-                links.append({"source": page_key, "target": child_key, "type": rel.type})
-
-    driver.close()
+        for r in session.run(_GRAPH_FOR_DOC_QUERY, doc_id=doc_id):
+            _add_graph_record(nodes, links, r)
+
     return {"nodes": list(nodes.values()), "links": links}
 
 def get_chunks_for_doc(doc_id: str) -> List[Dict[str, Any]]:
@@ -60,7 +178,7 @@ def get_chunks_for_doc(doc_id: str) -> List[Dict[str, Any]]:
     Return chunks for pgvector indexing.
     Each chunk: {doc_id, source, page_number, node_id, text, pin}
     """
-    driver = _driver()
+    driver = get_driver()
     chunks: List[Dict[str, Any]] = []
     with driver.session() as session:
         # TextBlocks
@@ -97,101 +215,397 @@ def get_chunks_for_doc(doc_id: str) -> List[Dict[str, Any]]:
                     "image_path": r["path"],
                 }
             )
-    driver.close()
     return chunks
 
-def search_context_for_question(question: str, doc_ids: List[str] = None) -> List[Dict[str, Any]]:
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/&|])')
+
+# Pages reachable from a full-text hit: the page itself, its text blocks /
+# figures / tables, or a QA triple hanging off a figure or table.
+_FULLTEXT_PAGES_QUERY = """
+CALL db.index.fulltext.queryNodes($index, $query, {{limit: $hit_limit}}) YIELD node, score
+MATCH (p:Page)-[:HAS_TEXT_BLOCK|HAS_FIGURE|HAS_TABLE|HAS_QA*0..2]->(node)
+WITH p, sum(score) AS score
+MATCH (d:Document)-[:HAS_PAGE]->(p)
+{where_clause}
+RETURN d.doc_id AS doc_id, p.page_number AS page, score
+ORDER BY score DESC
+LIMIT $limit
+"""
+
+def _fulltext_query(question: str, doc_ids: Optional[List[str]], limit: int) -> Tuple[Optional[str], Dict[str, Any]]:
+    query = _LUCENE_SPECIAL.sub(r"\\\1", question.lower()).strip()
+    if not query:
+        return None, {}
+    where_clause = "WHERE d.doc_id IN $doc_ids" if doc_ids else ""
+    params: Dict[str, Any] = {
+        "index": CONTENT_FULLTEXT_INDEX,
+        "query": query,
+        "hit_limit": FULLTEXT_HIT_LIMIT,
+        "limit": limit,
+    }
+    if doc_ids:
+        params["doc_ids"] = doc_ids
+    return _FULLTEXT_PAGES_QUERY.format(where_clause=where_clause), params
+
+def fulltext_candidate_pages(
+    question: str,
+    doc_ids: Optional[List[str]] = None,
+    limit: int = GRAPH_CONTEXT_PAGE_LIMIT,
+) -> List[Dict[str, Any]]:
     """
-    Fetch context from Neo4j.
-    If `doc_ids` is provided, filters to only those documents.
-    Otherwise fetches broadly (beware of scale).
+    BM25-ranked candidate pages for a question: [{doc_id, page, score}], best first.
+    The question is lowercased (so AND/OR/NOT are not operators) and Lucene
+    special characters are escaped; terms are OR-ed by the default parser.
     """
-    driver = _driver()
-    chunks: List[Dict[str, Any]] = []
-    
-    # Build query dynamically based on whether we filtering by doc_id
-    where_clause = ""
-    if doc_ids:
-        where_clause = "WHERE d.doc_id IN $doc_ids"
-        
-    with driver.session() as session:
-        q = f"""
-        MATCH (d:Document)-[:HAS_PAGE]->(p:Page)
-        {where_clause}
-        OPTIONAL MATCH (p)-[:HAS_TEXT_BLOCK]->(t:TextBlock)
-        OPTIONAL MATCH (p)-[:HAS_FIGURE]->(f:Figure)
-        OPTIONAL MATCH (p)-[:HAS_TABLE]->(tbl:Table)
-        RETURN d.doc_id AS doc_id, p.page_number AS page, 
-               COALESCE(p.natural_language_context, p.text) AS page_text,
-               t.id AS tb_id, t.summary AS tb_text,
-               f.figure_id AS fig_id, f.title AS fig_title, f.path AS fig_path,
-               tbl.table_id AS tbl_id, tbl.data AS tbl_data, tbl.title AS tbl_title
-        """
-        # Pass doc_ids as parameter (safe handling by driver)
-        params = {"doc_ids": doc_ids} if doc_ids else {}
-        
+    q, params = _fulltext_query(question, doc_ids, limit)
+    if q is None:
+        return []
+    with get_driver().session() as session:
+        result = session.run(q, **params)
+        return [{"doc_id": r["doc_id"], "page": r["page"], "score": r["score"]} for r in result]
+
+async def fulltext_candidate_pages_async(
+    question: str,
+    doc_ids: Optional[List[str]] = None,
+    limit: int = GRAPH_CONTEXT_PAGE_LIMIT,
+) -> List[Dict[str, Any]]:
+    q, params = _fulltext_query(question, doc_ids, limit)
+    if q is None:
+        return []
+    async with get_async_driver().session() as session:
+        result = await session.run(q, **params)
+        return [{"doc_id": r["doc_id"], "page": r["page"], "score": r["score"]} async for r in result]
+
+# Context query heads: either a document scan or an explicit candidate-page list.
+_CONTEXT_BY_DOCS = """
+MATCH (d:Document)-[:HAS_PAGE]->(p:Page)
+{where_clause}
+WITH d, p
+ORDER BY d.doc_id, p.page_number
+LIMIT $limit
+"""
+
+_CONTEXT_BY_PAGES = """
+UNWIND range(0, size($pages) - 1) AS rank
+WITH rank, $pages[rank] AS key
+MATCH (d:Document {doc_id: key.doc_id})-[:HAS_PAGE]->(p:Page {doc_id: key.doc_id, page_number: key.page})
+WITH d, p, rank
+ORDER BY rank
+LIMIT $limit
+"""
+
+# One row per page; children are gathered by COLLECT subqueries so a page with
+# 3 text blocks, 5 figures and 2 tables is still a single row.
+_CONTEXT_QUERY = """
+RETURN d.doc_id AS doc_id, p.page_number AS page,
+       COALESCE(p.natural_language_context, p.text) AS page_text,
+       COLLECT {
+           MATCH (p)-[:HAS_TEXT_BLOCK]->(t:TextBlock)
+           WHERE t.summary IS NOT NULL
+           RETURN DISTINCT {id: t.id, text: t.summary}
+       } AS text_blocks,
+       COLLECT {
+           MATCH (p)-[:HAS_FIGURE]->(f:Figure)
+           WHERE f.title IS NOT NULL OR f.path IS NOT NULL
+           RETURN DISTINCT {id: f.figure_id, title: f.title, path: f.path}
+       } AS figures,
+       COLLECT {
+           MATCH (p)-[:HAS_TABLE]->(tbl:Table)
+           WHERE tbl.data IS NOT NULL
+           RETURN DISTINCT {id: tbl.table_id, title: tbl.title, data: tbl.data}
+       } AS tables
+"""
+
+def _parse_table_data(table_data: Any) -> Any:
+    # Table data may be stored as a JSON string
+    if isinstance(table_data, str):
+        try:
+            return json.loads(table_data)
+        except ValueError:
+            return []
+    return table_data
+
+def _context_query(
+    doc_ids: Optional[List[str]],
+    limit: int,
+    pages: Optional[List[Dict[str, Any]]],
+) -> Tuple[str, Dict[str, Any]]:
+    params: Dict[str, Any] = {"limit": limit}
+    if pages is not None:
+        head = _CONTEXT_BY_PAGES
+        params["pages"] = [{"doc_id": p["doc_id"], "page": p["page"]} for p in pages]
+    else:
+        where_clause = "WHERE d.doc_id IN $doc_ids" if doc_ids else ""
+        head = _CONTEXT_BY_DOCS.format(where_clause=where_clause)
+        if doc_ids:
+            params["doc_ids"] = doc_ids
+    return head + _CONTEXT_QUERY, params
+
+def _record_to_chunks(r) -> Iterator[Dict[str, Any]]:
+    """Expand one page row of _CONTEXT_QUERY into FullPage/TextBlock/Figure/Table chunks."""
+    doc_id = r["doc_id"]
+    page = r["page"]
+
+    # 0. Full detailed page text (Best for tables/lists)
+    if r["page_text"]:
+        yield {
+            "doc_id": doc_id,
+            "source": "FullPage",
+            "page": page,
+            "pin": None,
+            "node_id": f"page_{page}",
+            "text": r["page_text"],
+            "image_path": None,
+        }
+
+    for tb in r["text_blocks"]:
+        if tb["id"] and tb["text"]:
+            yield {
+                "doc_id": doc_id,
+                "source": "TextBlock",
+                "page": page,
+                "pin": None,
+                "node_id": tb["id"],
+                "text": tb["text"],
+                "image_path": None,
+            }
+
+    for fig in r["figures"]:
+        if fig["id"]:
+            yield {
+                "doc_id": doc_id,
+                "source": "Figure",
+                "page": page,
+                "pin": None,
+                "node_id": fig["id"],
+                "text": fig["title"] or "",
+                "image_path": fig["path"],
+            }
+
+    for tbl in r["tables"]:
+        if tbl["id"]:
+            yield {
+                "doc_id": doc_id,
+                "source": "Table",
+                "page": page,
+                "pin": None,
+                "node_id": tbl["id"],
+                "text": tbl["title"] or "",
+                "table_data": _parse_table_data(tbl["data"]),
+            }
+
+def iter_context_for_question(
+    question: str,
+    doc_ids: Optional[List[str]] = None,
+    limit: int = GRAPH_CONTEXT_PAGE_LIMIT,
+    pages: Optional[List[Dict[str, Any]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream context chunks from Neo4j, one page record at a time.
+    If `pages` ([{doc_id, page}], e.g. from fulltext_candidate_pages) is given,
+    only those pages are read, in that order. Otherwise, if `doc_ids` is
+    provided, filters to only those documents.
+    At most `limit` pages are read, whatever the filter.
+    """
+    q, params = _context_query(doc_ids, limit, pages)
+    with get_driver().session() as session:
         for r in session.run(q, **params):
-            doc_id = r["doc_id"]
-            page = r["page"]
-            
-            # 0. Full detailed page text (Best for tables/lists)
-            if r["page_text"]:
-                 chunks.append(
-                    {
-                        "doc_id": doc_id,
-                        "source": "FullPage",
-                        "page": page,
-                        "pin": None,
-                        "node_id": f"page_{page}",
-                        "text": r["page_text"],
-                        "image_path": None,
-                    }
-                )
-
-            if r["tb_id"] and r["tb_text"]:
-                chunks.append(
-                    {
-                        "doc_id": doc_id,
-                        "source": "TextBlock",
-                        "page": page,
-                        "pin": None,
-                        "node_id": r["tb_id"],
-                        "text": r["tb_text"],
-                        "image_path": None,
-                    }
-                )
-            if r["fig_id"] and (r["fig_title"] or r["fig_path"]):
-                chunks.append(
-                    {
-                        "doc_id": doc_id,
-                        "source": "Figure",
-                        "page": page,
-                        "pin": None,
-                        "node_id": r["fig_id"],
-                        "text": r["fig_title"] or "",
-                        "image_path": r["fig_path"],
-                    }
-                )
-            if r["tbl_id"] and r["tbl_data"]:
-                # Parse table data if it's stored as JSON string
-                import json
-                table_data = r["tbl_data"]
-                if isinstance(table_data, str):
-                    try:
-                        table_data = json.loads(table_data)
-                    except:
-                        table_data = []
-                
-                chunks.append(
-                    {
-                        "doc_id": doc_id,
-                        "source": "Table",
-                        "page": page,
-                        "pin": None,
-                        "node_id": r["tbl_id"],
-                        "text": r["tbl_title"] or "",
-                        "table_data": table_data,
-                    }
-                )
-    driver.close()
+            yield from _record_to_chunks(r)
+
+def search_context_for_question(
+    question: str,
+    doc_ids: Optional[List[str]] = None,
+    limit: int = GRAPH_CONTEXT_PAGE_LIMIT,
+    pages: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch context from Neo4j (see iter_context_for_question).
+    """
+    return list(iter_context_for_question(question, doc_ids=doc_ids, limit=limit, pages=pages))
+
+async def search_context_for_question_async(
+    question: str,
+    doc_ids: Optional[List[str]] = None,
+    limit: int = GRAPH_CONTEXT_PAGE_LIMIT,
+    pages: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """Async variant of search_context_for_question for the FastAPI request path."""
+    q, params = _context_query(doc_ids, limit, pages)
+    chunks: List[Dict[str, Any]] = []
+    async with get_async_driver().session() as session:
+        result = await session.run(q, **params)
+        async for r in result:
+            chunks.extend(_record_to_chunks(r))
+    return chunks
+
+# ---------- Graph-neighbourhood expansion of vector hits ----------
+
+# Seed node lookup by the (source, node_id) that pgvector chunks carry
+_SEED_KEYS = {
+    "TextBlock": "MATCH (n:TextBlock {id: seed.node_id})",
+    "Figure": "MATCH (n:Figure {figure_id: seed.node_id})",
+    "Table": "MATCH (n:Table {table_id: seed.node_id})",
+    "Constraint": "MATCH (n:Constraint {id: seed.node_id, doc_id: seed.doc_id})",
+}
+
+def _neighbour(**extra: str) -> str:
+    """Map projection of an expanded node `s`, plus extra computed fields."""
+    fields = {
+        "label": "labels(s)[0]",
+        "id": "coalesce(s.id, s.figure_id, s.table_id)",
+        "text": "coalesce(s.summary, s.natural_language_context, s.description, s.raw_text, s.title)",
+        "title": "s.title",
+        "path": "s.path",
+        "data": "s.data",
+        **extra,
+    }
+    return "{" + ", ".join(f"{k}: {v}" for k, v in fields.items()) + "}"
+
+# One row per seed; every neighbour list is a COLLECT subquery with its own
+# LIMIT, so a hub node (a page with 40 figures, a pin with 30 constraints)
+# cannot blow up the result.
+_EXPAND_QUERY = """
+UNWIND $seeds AS seed
+CALL {
+    WITH seed
+    """ + "\n    UNION\n    WITH seed\n    ".join(
+        f"{match} WHERE seed.source = '{label}' RETURN n" for label, match in _SEED_KEYS.items()
+    ) + f"""
+}}
+OPTIONAL MATCH (pg:Page {{doc_id: seed.doc_id}})-[:HAS_TEXT_BLOCK|HAS_FIGURE|HAS_TABLE]->(n)
+WITH seed, n, head(collect(pg)) AS pg
+RETURN seed.node_id AS seed_id, seed.source AS seed_source, seed.doc_id AS seed_doc_id,
+       pg.page_number AS page,
+       COLLECT {{
+           MATCH (pg)-[:HAS_TEXT_BLOCK|HAS_FIGURE|HAS_TABLE]->(s)
+           WHERE s <> n
+           RETURN {_neighbour()} AS x
+           LIMIT $fanout.sibling
+       }} AS siblings,
+       COLLECT {{
+           MATCH (n)-[:DERIVED_FROM]->(s)
+           OPTIONAL MATCH (sp:Page)-[:HAS_TEXT_BLOCK|HAS_FIGURE|HAS_TABLE]->(s)
+           RETURN {_neighbour(page='sp.page_number')} AS x
+           LIMIT $fanout.source
+       }} AS sources,
+       COLLECT {{
+           MATCH (n)-[:HAS_QA]->(q:QA_Triple)
+           RETURN {{id: q.id, question: q.question, answer: q.answer}} AS x
+           LIMIT $fanout.qa
+       }} AS qa,
+       COLLECT {{
+           MATCH (s:Constraint)-[:DERIVED_FROM]->(n)
+           OPTIONAL MATCH (pin:Pin)-[:HAS_CONSTRAINT]->(s)
+           RETURN {_neighbour(pin='pin.name')} AS x
+           LIMIT $fanout.constraint
+       }} + COLLECT {{
+           MATCH (n)<-[:MENTIONED_IN|HAS_CONSTRAINT]-(pin:Pin)-[:HAS_CONSTRAINT]->(s:Constraint)
+           WHERE s <> n
+           RETURN DISTINCT {_neighbour(pin='pin.name')} AS x
+           LIMIT $fanout.constraint
+       }} AS constraints,
+       COLLECT {{
+           MATCH (n)-[:HAS_SPEC_ITEM]->(s:SpecItem)
+           RETURN {_neighbour()} AS x
+           LIMIT $fanout.spec_item
+       }} + COLLECT {{
+           MATCH (n)<-[:MENTIONED_IN|HAS_CONSTRAINT]-(pin:Pin)<-[:APPLIES_TO_PIN]-(s:SpecItem)
+           RETURN DISTINCT {_neighbour(pin='pin.name')} AS x
+           LIMIT $fanout.spec_item
+       }} AS spec_items
+"""
+
+def expansion_seeds(hits: List[Dict[str, Any]], max_seeds: int) -> List[Dict[str, Any]]:
+    """Best vector hits (lowest distance) whose node type can be looked up in the graph."""
+    seedable = [h for h in hits if h.get("source") in _SEED_KEYS and h.get("node_id")]
+    seedable.sort(key=lambda h: h.get("distance") if h.get("distance") is not None else 1.0)
+    seeds, seen = [], set()
+    for h in seedable:
+        key = (h["source"], h["node_id"], h.get("doc_id"))
+        if key not in seen:
+            seen.add(key)
+            seeds.append({"source": h["source"], "node_id": h["node_id"], "doc_id": h.get("doc_id")})
+        if len(seeds) >= max_seeds:
+            break
+    return seeds
+
+def expansion_to_chunks(records, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Context chunks from _EXPAND_QUERY rows (or graph_snapshot's equivalent), scored off their seed hit."""
+    # node ids are only unique within a document, so every key carries the doc_id
+    by_seed = {(h.get("doc_id"), h.get("source"), h.get("node_id")): h for h in hits}
+    chunks: List[Dict[str, Any]] = []
+    seen = set()
+
+    def add(seed_hit, source, node_id, text, page, pin=None, image_path=None, table_data=None):
+        key = (seed_hit.get("doc_id"), source, node_id)
+        if not node_id or not text or key in seen:
+            return
+        seen.add(key)
+        seed_distance = seed_hit.get("distance")
+        chunk = {
+            "doc_id": seed_hit.get("doc_id"),
+            "source": source,
+            "page": page,
+            "pin": pin,
+            "node_id": node_id,
+            "text": text,
+            "image_path": image_path,
+            "expanded_from": seed_hit.get("node_id"),
+        }
+        if seed_distance is not None:
+            # neighbours inherit a decayed share of the seed's similarity
+            chunk["distance"] = 1.0 - (1.0 - float(seed_distance)) * GRAPH_EXPAND_DECAY
+        if table_data is not None:
+            chunk["table_data"] = table_data
+        chunks.append(chunk)
+
+    def add_node(seed_hit, x, page):
+        label = x["label"]
+        add(
+            seed_hit, label, x["id"], x["text"], x.get("page") or page, pin=x.get("pin"),
+            image_path=x.get("path") if label == "Figure" else None,
+            table_data=_parse_table_data(x["data"]) if label == "Table" and x.get("data") else None,
+        )
+
+    for r in records:
+        seed_hit = by_seed.get((r["seed_doc_id"], r["seed_source"], r["seed_id"]))
+        if seed_hit is None:
+            continue
+        page = r["page"] if r["page"] is not None else seed_hit.get("page")
+        for x in r["siblings"] + r["sources"] + r["constraints"] + r["spec_items"]:
+            add_node(seed_hit, x, page)
+        for q in r["qa"]:
+            if q["question"] and q["answer"]:
+                add(seed_hit, "QA_Triple", q["id"], f"Q: {q['question']}\nA: {q['answer']}", page)
     return chunks
+
+def expand_graph_neighbourhood(
+    hits: List[Dict[str, Any]],
+    max_seeds: int = GRAPH_EXPAND_SEEDS,
+) -> List[Dict[str, Any]]:
+    """
+    Bounded neighbourhood expansion of vector hits, in one Cypher call.
+    From the best `max_seeds` TextBlock/Figure/Table/Constraint hits, pull
+    same-page siblings, DERIVED_FROM sources, QA triples, related
+    Constraints and SpecItems (via pins), each capped by GRAPH_EXPAND_FANOUT.
+    Returns context chunks tagged with `expanded_from`.
+    """
+    seeds = expansion_seeds(hits, max_seeds)
+    if not seeds:
+        return []
+    with get_driver().session() as session:
+        records = list(session.run(_EXPAND_QUERY, seeds=seeds, fanout=GRAPH_EXPAND_FANOUT))
+    return expansion_to_chunks(records, hits)
+
+async def expand_graph_neighbourhood_async(
+    hits: List[Dict[str, Any]],
+    max_seeds: int = GRAPH_EXPAND_SEEDS,
+) -> List[Dict[str, Any]]:
+    """Async variant of expand_graph_neighbourhood."""
+    seeds = expansion_seeds(hits, max_seeds)
+    if not seeds:
+        return []
+    async with get_async_driver().session() as session:
+        result = await session.run(_EXPAND_QUERY, seeds=seeds, fanout=GRAPH_EXPAND_FANOUT)
+        records = [r async for r in result]
+    return expansion_to_chunks(records, hits)
@@ -0,0 +1,127 @@
+"""
+Versioned Neo4j schema bootstrap.
+
+Every MERGE/MATCH key used by the ingestion pipelines and the query helpers
+gets a uniqueness constraint (which also creates the backing index) or a
+range index, so lookups are index seeks instead of label scans.
+
+Run standalone to apply and print a report:
+    python -m models.neo4j_schema
+"""
+
+import threading
+from typing import Dict, Any, List, Tuple, Optional
+
+from neo4j import Driver
+
+from models.neo4j_client import get_driver, CONTENT_FULLTEXT_INDEX
+
+SCHEMA_VERSION = 2
+
+# (name, statement) -- names are what SHOW CONSTRAINTS / SHOW INDEXES report.
+CONSTRAINTS: List[Tuple[str, str]] = [
+    ("document_doc_id",
+     "CREATE CONSTRAINT document_doc_id IF NOT EXISTS FOR (d:Document) REQUIRE d.doc_id IS UNIQUE"),
+    ("page_doc_page",
+     "CREATE CONSTRAINT page_doc_page IF NOT EXISTS FOR (p:Page) REQUIRE (p.doc_id, p.page_number) IS UNIQUE"),
+    # TextBlock ids carry the doc_id (build_rag_graph.text_block_id, rag_graph_builder)
+    ("text_block_id",
+     "CREATE CONSTRAINT text_block_id IF NOT EXISTS FOR (t:TextBlock) REQUIRE t.id IS UNIQUE"),
+    ("figure_figure_id",
+     "CREATE CONSTRAINT figure_figure_id IF NOT EXISTS FOR (f:Figure) REQUIRE f.figure_id IS UNIQUE"),
+    ("table_table_id",
+     "CREATE CONSTRAINT table_table_id IF NOT EXISTS FOR (t:Table) REQUIRE t.table_id IS UNIQUE"),
+    ("qa_triple_id",
+     "CREATE CONSTRAINT qa_triple_id IF NOT EXISTS FOR (q:QA_Triple) REQUIRE q.id IS UNIQUE"),
+    ("ic_name_doc",
+     "CREATE CONSTRAINT ic_name_doc IF NOT EXISTS FOR (ic:IC) REQUIRE (ic.name, ic.doc_id) IS UNIQUE"),
+    ("pin_name_ic_doc",
+     "CREATE CONSTRAINT pin_name_ic_doc IF NOT EXISTS FOR (p:Pin) REQUIRE (p.name, p.ic_name, p.doc_id) IS UNIQUE"),
+    ("constraint_id_doc",
+     "CREATE CONSTRAINT constraint_id_doc IF NOT EXISTS FOR (c:Constraint) REQUIRE (c.id, c.doc_id) IS UNIQUE"),
+    ("spec_item_id_doc",
+     "CREATE CONSTRAINT spec_item_id_doc IF NOT EXISTS FOR (s:SpecItem) REQUIRE (s.id, s.doc_id) IS UNIQUE"),
+]
+
+# Single-property lookups by doc_id that the composite constraints above don't serve.
+INDEXES: List[Tuple[str, str]] = [
+    ("page_doc_id", "CREATE INDEX page_doc_id IF NOT EXISTS FOR (p:Page) ON (p.doc_id)"),
+    ("figure_doc_id", "CREATE INDEX figure_doc_id IF NOT EXISTS FOR (f:Figure) ON (f.doc_id)"),
+    ("table_doc_id", "CREATE INDEX table_doc_id IF NOT EXISTS FOR (t:Table) ON (t.doc_id)"),
+    ("ic_doc_id", "CREATE INDEX ic_doc_id IF NOT EXISTS FOR (ic:IC) ON (ic.doc_id)"),
+    ("pin_doc_id", "CREATE INDEX pin_doc_id IF NOT EXISTS FOR (p:Pin) ON (p.doc_id)"),
+    ("constraint_doc_id", "CREATE INDEX constraint_doc_id IF NOT EXISTS FOR (c:Constraint) ON (c.doc_id)"),
+    ("spec_item_doc_id", "CREATE INDEX spec_item_doc_id IF NOT EXISTS FOR (s:SpecItem) ON (s.doc_id)"),
+    # v2: BM25 full-text search over every text-bearing node, used to pick candidate pages
+    (CONTENT_FULLTEXT_INDEX,
+     f"CREATE FULLTEXT INDEX {CONTENT_FULLTEXT_INDEX} IF NOT EXISTS "
+     "FOR (n:Page|TextBlock|Figure|Table|QA_Triple) "
+     "ON EACH [n.natural_language_context, n.text, n.raw_text, n.summary, n.title, n.question, n.answer]"),
+]
+
+_READY: Dict[int, bool] = {}
+_LOCK = threading.Lock()
+
+
+def _stored_version(session) -> int:
+    record = session.run(
+        "MATCH (v:_SchemaVersion {name: 'kb'}) RETURN v.version AS version"
+    ).single()
+    return record["version"] if record and record["version"] is not None else 0
+
+
+def schema_report(driver: Optional[Driver] = None) -> Dict[str, Any]:
+    """Compare expected constraints/indexes with what the database reports."""
+    driver = driver or get_driver()
+    with driver.session() as session:
+        constraints = {r["name"] for r in session.run("SHOW CONSTRAINTS YIELD name")}
+        indexes = {r["name"]: r["state"] for r in session.run("SHOW INDEXES YIELD name, state")}
+        version = _stored_version(session)
+
+    expected = [name for name, _ in CONSTRAINTS + INDEXES]
+    missing = [name for name, _ in CONSTRAINTS if name not in constraints]
+    missing += [name for name, _ in INDEXES if name not in indexes]
+    not_online = [name for name in expected if name in indexes and indexes[name] != "ONLINE"]
+    return {
+        "version": version,
+        "expected_version": SCHEMA_VERSION,
+        "missing": missing,
+        "not_online": not_online,
+    }
+
+
+def ensure_schema(driver: Optional[Driver] = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Idempotently create all constraints/indexes and record SCHEMA_VERSION.
+    Runs once per driver per process (FastAPI startup, before each ingestion
+    entry point); later calls return immediately unless `force` is set.
+    """
+    driver = driver or get_driver()
+    with _LOCK:
+        if _READY.get(id(driver)) and not force:
+            return {"version": SCHEMA_VERSION, "missing": [], "not_online": [], "cached": True}
+
+        with driver.session() as session:
+            if force or _stored_version(session) < SCHEMA_VERSION:
+                for name, stmt in CONSTRAINTS + INDEXES:
+                    try:
+                        session.run(stmt).consume()
+                    except Exception as e:
+                        print(f"[WARN] Could not create schema item {name}: {e}")
+                session.run(
+                    "MERGE (v:_SchemaVersion {name: 'kb'}) SET v.version = $version",
+                    version=SCHEMA_VERSION,
+                ).consume()
+                print(f"[INFO] Neo4j schema at version {SCHEMA_VERSION}")
+
+        report = schema_report(driver)
+        if report["missing"]:
+            print(f"[WARN] Missing Neo4j constraints/indexes: {', '.join(report['missing'])}")
+        if report["not_online"]:
+            print(f"[WARN] Neo4j indexes not yet online: {', '.join(report['not_online'])}")
+        _READY[id(driver)] = not report["missing"]
+        return report
+
+
+if __name__ == "__main__":
+    print(ensure_schema(force=True))
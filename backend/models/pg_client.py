@@ -0,0 +1,199 @@
+"""
+Pooled Postgres (pgvector) access.
+
+  - async: one psycopg 3 AsyncConnectionPool per process for the FastAPI
+    request path, opened at app startup and closed at shutdown
+  - blocking: psycopg2 ThreadedConnectionPools (one per DSN, sized by
+    PG_SYNC_POOL_*) for the pipeline code and the threadpool paths;
+    pg_connection() waits up to PG_POOL_TIMEOUT for a free connection,
+    health-checks it if it has been idle, and resets it on return
+  - rag_chunks readiness is cached after the first successful check, so
+    searches don't ask the catalog on every question
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import psycopg2
+from psycopg2 import extensions as pg_ext
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+from config import (
+    PG_HOST, PG_PORT, PG_DB, PG_USER, PG_PASS, PG_POOL_MIN_SIZE, PG_POOL_MAX_SIZE,
+    PG_SYNC_POOL_MIN_SIZE, PG_SYNC_POOL_MAX_SIZE, PG_POOL_TIMEOUT, PG_POOL_HEALTHCHECK_IDLE,
+)
+
+try:
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+    HAS_PSYCOPG = True
+except ImportError:
+    dict_row = None
+    HAS_PSYCOPG = False
+
+_POOL: Optional["AsyncConnectionPool"] = None
+
+
+def _conninfo() -> str:
+    return f"host={PG_HOST} port={PG_PORT} dbname={PG_DB} user={PG_USER} password={PG_PASS}"
+
+
+async def open_pg_pool() -> Optional["AsyncConnectionPool"]:
+    """Create and open the shared pool (FastAPI startup)."""
+    global _POOL
+    if not HAS_PSYCOPG:
+        print("[WARN] psycopg / psycopg_pool not installed; async pgvector search disabled.")
+        return None
+    if _POOL is None:
+        _POOL = AsyncConnectionPool(
+            _conninfo(),
+            min_size=PG_POOL_MIN_SIZE,
+            max_size=PG_POOL_MAX_SIZE,
+            open=False,
+        )
+        # don't block startup if Postgres is down; connections are retried in the background
+        await _POOL.open(wait=False)
+    return _POOL
+
+
+async def get_pg_pool() -> Optional["AsyncConnectionPool"]:
+    return _POOL if _POOL is not None else await open_pg_pool()
+
+
+async def close_pg_pool() -> None:
+    global _POOL
+    pool, _POOL = _POOL, None
+    if pool is not None:
+        await pool.close()
+
+
+# ---------- blocking psycopg2 pools ----------
+
+_SYNC_POOLS: Dict[str, ThreadedConnectionPool] = {}
+# ThreadedConnectionPool.getconn() raises PoolError when every connection is
+# in use instead of waiting; a semaphore per pool makes borrowers queue
+_SYNC_SLOTS: Dict[str, threading.BoundedSemaphore] = {}
+_SYNC_LOCK = threading.Lock()
+_LAST_USED: Dict[int, float] = {}
+
+
+def open_sync_pg_pool(dsn: Optional[str] = None) -> ThreadedConnectionPool:
+    """Create (once) the psycopg2 pool for `dsn` (default: the configured database)."""
+    dsn = dsn or _conninfo()
+    with _SYNC_LOCK:
+        pool = _SYNC_POOLS.get(dsn)
+        if pool is None:
+            pool = ThreadedConnectionPool(PG_SYNC_POOL_MIN_SIZE, PG_SYNC_POOL_MAX_SIZE, dsn)
+            _SYNC_POOLS[dsn] = pool
+            _SYNC_SLOTS[dsn] = threading.BoundedSemaphore(PG_SYNC_POOL_MAX_SIZE)
+        return pool
+
+
+def close_sync_pg_pools() -> None:
+    with _SYNC_LOCK:
+        pools = list(_SYNC_POOLS.values())
+        _SYNC_POOLS.clear()
+        _SYNC_SLOTS.clear()
+    for pool in pools:
+        pool.closeall()
+
+
+def _healthy(conn) -> bool:
+    if conn.closed:
+        return False
+    if time.monotonic() - _LAST_USED.get(id(conn), 0.0) < PG_POOL_HEALTHCHECK_IDLE:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def get_pg_conn(dsn: Optional[str] = None, timeout: float = PG_POOL_TIMEOUT):
+    """
+    Check out a healthy connection, waiting up to `timeout` seconds while the
+    pool is exhausted; hand it back with put_pg_conn().
+    """
+    dsn = dsn or _conninfo()
+    pool = open_sync_pg_pool(dsn)
+    slots = _SYNC_SLOTS[dsn]
+    if not slots.acquire(timeout=timeout):
+        raise PoolError(f"no Postgres connection free after {timeout:.1f}s")
+    try:
+        for _ in range(PG_SYNC_POOL_MAX_SIZE + 1):
+            conn = pool.getconn()
+            if _healthy(conn):
+                return conn
+            # broken (server restart, idle timeout): drop it and try another
+            _LAST_USED.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("no healthy Postgres connection available")
+    except BaseException:
+        slots.release()
+        raise
+
+
+def put_pg_conn(conn, dsn: Optional[str] = None) -> None:
+    dsn = dsn or _conninfo()
+    pool = open_sync_pg_pool(dsn)
+    broken = conn.closed
+    if not broken:
+        try:
+            # leave no transaction or session settings behind for the next borrower
+            if conn.get_transaction_status() != pg_ext.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+        except psycopg2.Error:
+            broken = True
+    if broken:
+        _LAST_USED.pop(id(conn), None)
+    else:
+        _LAST_USED[id(conn)] = time.monotonic()
+    try:
+        pool.putconn(conn, close=broken)
+    finally:
+        _SYNC_SLOTS[dsn].release()
+
+
+@contextmanager
+def pg_connection(dsn: Optional[str] = None) -> Iterator["psycopg2.extensions.connection"]:
+    """Borrow a pooled psycopg2 connection; the caller commits what it writes."""
+    conn = get_pg_conn(dsn)
+    try:
+        yield conn
+    finally:
+        put_pg_conn(conn, dsn)
+
+
+# ---------- schema readiness ----------
+
+_RAG_CHUNKS_READY = False
+
+_RAG_CHUNKS_EXISTS = "SELECT to_regclass('rag_chunks') IS NOT NULL"
+
+
+def mark_rag_chunks_ready(ready: bool = True) -> None:
+    """Set after migrations; cleared when a query finds the table missing."""
+    global _RAG_CHUNKS_READY
+    _RAG_CHUNKS_READY = ready
+
+
+def rag_chunks_ready(cur) -> bool:
+    """Whether rag_chunks exists; asks the catalog only until the first yes."""
+    if not _RAG_CHUNKS_READY:
+        cur.execute(_RAG_CHUNKS_EXISTS)
+        mark_rag_chunks_ready(bool(cur.fetchone()[0]))
+    return _RAG_CHUNKS_READY
+
+
+async def rag_chunks_ready_async(conn) -> bool:
+    if not _RAG_CHUNKS_READY:
+        cur = await conn.execute(_RAG_CHUNKS_EXISTS)
+        mark_rag_chunks_ready(bool((await cur.fetchone())[0]))
+    return _RAG_CHUNKS_READY
@@ -0,0 +1,355 @@
+"""
+Versioned Postgres (pgvector) schema and vector-index lifecycle.
+
+Migrations run once per process (FastAPI startup, before each pgvector
+load) and are recorded in kb_schema_version, so uploads no longer re-run
+CREATE INDEX / ANALYZE.
+
+The ANN index on rag_chunks.embedding is managed separately, because an
+index built on an empty table is useless (ivfflat centroids come from the
+rows present at build time):
+  - build_vector_index() is called after bulk loads (uploads go through
+    schedule_vector_index_build(), a background thread); it creates the index
+    once rows exist and rebuilds an ivfflat index when the row count has
+    drifted far enough that `lists` is off by more than 2x
+  - lists = rows / 1000 up to 1M rows, sqrt(rows) above (pgvector guidance)
+  - builds use maintenance_work_mem / parallel maintenance workers and run
+    CONCURRENTLY under a temporary name, then swap, so search keeps working
+
+Run standalone to migrate and (re)build:
+    python -m models.pg_schema
+    python -m models.pg_schema --rebuild --kind hnsw
+"""
+
+import argparse
+import math
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import (
+    PG_HOST, PG_PORT, PG_DB, PG_USER, VECTOR_DIM,
+    PG_VECTOR_INDEX, PG_HNSW_M, PG_HNSW_EF_CONSTRUCTION,
+    PG_MAINTENANCE_WORK_MEM, PG_MAINTENANCE_WORKERS,
+)
+from models.pg_client import get_pg_conn, put_pg_conn, mark_rag_chunks_ready
+
+VECTOR_INDEX = "rag_chunks_embedding_idx"
+INDEX_KINDS = ("hnsw", "ivfflat")
+
+
+def _create_tables(cur) -> None:
+    cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS rag_chunks (
+            id BIGSERIAL PRIMARY KEY,
+            doc_id TEXT NOT NULL,
+            pin TEXT,
+            source TEXT NOT NULL,
+            page_number INT,
+            node_id TEXT,
+            text TEXT NOT NULL,
+            embedding vector({VECTOR_DIM}) NOT NULL
+        );
+        """
+    )
+
+
+def _add_content_hash(cur) -> None:
+    # rows loaded before the column existed are hashed server-side (md5 matches
+    # pgvector_bulk.content_hash) and exact duplicates are removed before the unique key
+    cur.execute("ALTER TABLE rag_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;")
+    cur.execute("UPDATE rag_chunks SET content_hash = md5(text) WHERE content_hash IS NULL;")
+    cur.execute(
+        """
+        DELETE FROM rag_chunks a
+        USING rag_chunks b
+        WHERE a.id > b.id
+          AND a.doc_id = b.doc_id
+          AND a.source = b.source
+          AND a.node_id IS NOT DISTINCT FROM b.node_id
+          AND a.pin IS NOT DISTINCT FROM b.pin
+          AND a.content_hash = b.content_hash;
+        """
+    )
+    cur.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS rag_chunks_content_key
+        ON rag_chunks (doc_id, source, (coalesce(node_id, '')), (coalesce(pin, '')), content_hash);
+        """
+    )
+
+
+def _drop_premature_index(cur) -> None:
+    # the old ivfflat (lists = 100) index was created before any data existed
+    cur.execute("DROP INDEX IF EXISTS rag_chunks_embedding_cosine_idx;")
+
+
+def _add_quality_table(cur) -> None:
+    # calibrated ivfflat.probes / hnsw.ef_search per quality level (models/vector_quality.py)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vector_search_quality (
+            index_kind TEXT NOT NULL,
+            level TEXT NOT NULL,
+            setting TEXT,
+            value INT,
+            recall DOUBLE PRECISION,
+            latency_ms DOUBLE PRECISION,
+            k INT,
+            sample_size INT,
+            calibrated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (index_kind, level)
+        );
+        """
+    )
+
+
+def _add_filter_indexes(cur) -> None:
+    # doc_id filters are served by rag_chunks_content_key (doc_id, source, ...);
+    # PgVectorStore.search also filters on pin
+    cur.execute("CREATE INDEX IF NOT EXISTS rag_chunks_doc_pin_idx ON rag_chunks (doc_id, pin);")
+
+
+def _require_content_hash(cur) -> None:
+    # rows COPYed by `pgvector_bulk.py --jsonl` before it sent hashes have NULL ones;
+    # drop those that duplicate another row first, or hashing them would break the unique key
+    cur.execute(
+        """
+        DELETE FROM rag_chunks a
+        USING rag_chunks b
+        WHERE a.content_hash IS NULL
+          AND a.id <> b.id
+          AND (b.content_hash IS NOT NULL OR a.id > b.id)
+          AND a.doc_id = b.doc_id
+          AND a.source = b.source
+          AND a.node_id IS NOT DISTINCT FROM b.node_id
+          AND a.pin IS NOT DISTINCT FROM b.pin
+          AND md5(a.text) = coalesce(b.content_hash, md5(b.text));
+        """
+    )
+    cur.execute("UPDATE rag_chunks SET content_hash = md5(text) WHERE content_hash IS NULL;")
+    cur.execute("ALTER TABLE rag_chunks ALTER COLUMN content_hash SET NOT NULL;")
+
+
+# (version, name, step) -- applied in order inside one transaction each
+MIGRATIONS: List[Tuple[int, str, Callable[[Any], None]]] = [
+    (1, "rag_chunks table", _create_tables),
+    (2, "content hash key", _add_content_hash),
+    (3, "managed vector index", _drop_premature_index),
+    (4, "search quality calibration", _add_quality_table),
+    (5, "filtered search indexes", _add_filter_indexes),
+    (6, "content hash required", _require_content_hash),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_READY: Dict[Tuple[str, ...], bool] = {}
+_LOCK = threading.Lock()
+_DEFAULT_KEY = (PG_HOST, str(PG_PORT), PG_DB, PG_USER)
+
+
+def _schema_key(conn) -> Tuple[str, ...]:
+    # conn.dsn masks the password, so key by the server/database/user instead
+    if conn is None:
+        return _DEFAULT_KEY
+    params = conn.get_dsn_parameters()
+    return tuple(params.get(k, "") for k in ("host", "port", "dbname", "user"))
+
+
+def _stored_version(cur) -> int:
+    cur.execute("CREATE TABLE IF NOT EXISTS kb_schema_version (name TEXT PRIMARY KEY, version INT NOT NULL);")
+    cur.execute("SELECT version FROM kb_schema_version WHERE name = 'rag'")
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def ensure_pg_schema(conn=None, force: bool = False) -> Dict[str, Any]:
+    """
+    Apply pending migrations and record SCHEMA_VERSION. Runs once per
+    database per process; later calls return immediately unless `force` is set.
+    """
+    key = _schema_key(conn)
+    with _LOCK:
+        if _READY.get(key) and not force:
+            return {"version": SCHEMA_VERSION, "applied": [], "cached": True}
+
+        own = conn is None
+        conn = conn or get_pg_conn()
+        autocommit = conn.autocommit
+        conn.autocommit = False
+        applied = []
+        try:
+            with conn.cursor() as cur:
+                # serialise concurrent migrators (API workers, pipeline scripts)
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext('kb_schema_version'))")
+                version = _stored_version(cur)
+                for target, name, step in MIGRATIONS:
+                    if target > version or force:
+                        step(cur)
+                        applied.append(name)
+                cur.execute(
+                    """
+                    INSERT INTO kb_schema_version (name, version) VALUES ('rag', %s)
+                    ON CONFLICT (name) DO UPDATE SET version = EXCLUDED.version
+                    """,
+                    (SCHEMA_VERSION,),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = autocommit
+            if own:
+                put_pg_conn(conn)
+
+        if applied:
+            print(f"[INFO] Postgres schema at version {SCHEMA_VERSION} (applied: {', '.join(applied)})")
+        _READY[key] = True
+        if key == _DEFAULT_KEY:
+            mark_rag_chunks_ready()
+        return {"version": SCHEMA_VERSION, "applied": applied, "cached": False}
+
+
+# ---------- vector index lifecycle ----------
+
+def ivfflat_lists(rows: int) -> int:
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def vector_index_status(conn) -> Dict[str, Any]:
+    """Current ANN index kind/parameters and the table's row count."""
+    with conn.cursor() as cur:
+        # planner estimate (kept current by autovacuum/ANALYZE) instead of a full count
+        cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = 'rag_chunks'::regclass")
+        rows = cur.fetchone()[0]
+        if rows < 0:  # never analyzed
+            cur.execute("SELECT count(*) FROM rag_chunks")
+            rows = cur.fetchone()[0]
+        cur.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = 'rag_chunks' AND indexname = %s",
+            (VECTOR_INDEX,),
+        )
+        found = cur.fetchone()
+    status: Dict[str, Any] = {"index": VECTOR_INDEX, "rows": rows, "kind": None}
+    if found:
+        definition = found[0]
+        status["definition"] = definition
+        status["kind"] = next((k for k in INDEX_KINDS if f"USING {k}" in definition), None)
+        lists = re.search(r"lists\s*=\s*'?(\d+)", definition)
+        if lists:
+            status["lists"] = int(lists.group(1))
+    return status
+
+
+def _index_statement(name: str, kind: str, rows: int) -> Tuple[str, Dict[str, Any]]:
+    if kind == "hnsw":
+        params = {"m": PG_HNSW_M, "ef_construction": PG_HNSW_EF_CONSTRUCTION}
+    else:
+        params = {"lists": ivfflat_lists(rows)}
+    options = ", ".join(f"{k} = {v}" for k, v in params.items())
+    stmt = (
+        f"CREATE INDEX CONCURRENTLY {name} ON rag_chunks "
+        f"USING {kind} (embedding vector_cosine_ops) WITH ({options})"
+    )
+    return stmt, params
+
+
+def _needs_build(status: Dict[str, Any], kind: str) -> Optional[str]:
+    if status["rows"] == 0:
+        return None
+    if status["kind"] != kind:
+        return "missing" if status["kind"] is None else f"switch {status['kind']} -> {kind}"
+    if kind == "ivfflat" and status.get("lists"):
+        target = ivfflat_lists(status["rows"])
+        if not status["lists"] / 2 <= target <= status["lists"] * 2:
+            return f"lists {status['lists']} -> {target}"
+    return None
+
+
+def build_vector_index(conn=None, kind: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Create or rebuild the ANN index if it is missing, of the wrong kind, or
+    (ivfflat) sized for a very different row count. Call after bulk loads;
+    it is a no-op when the index is already adequate or the table is empty.
+    """
+    kind = kind or PG_VECTOR_INDEX
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"vector index kind must be one of {INDEX_KINDS}")
+
+    own = conn is None
+    conn = conn or get_pg_conn()
+    autocommit = conn.autocommit
+    try:
+        status = vector_index_status(conn)
+        reason = "forced" if force and status["rows"] else _needs_build(status, kind)
+        if reason is None:
+            return {**status, "rebuilt": False}
+
+        conn.commit()
+        conn.autocommit = True  # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        temp_name = f"{VECTOR_INDEX}_new"
+        stmt, params = _index_statement(temp_name, kind, status["rows"])
+        print(f"[INFO] Building {kind} index on rag_chunks ({status['rows']} rows, {params}): {reason}")
+        with conn.cursor() as cur:
+            # session settings: reset even if the build fails, the connection goes back to a pool
+            cur.execute("SET maintenance_work_mem = %s", (PG_MAINTENANCE_WORK_MEM,))
+            cur.execute("SET max_parallel_maintenance_workers = %s", (PG_MAINTENANCE_WORKERS,))
+            try:
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {temp_name}")
+                cur.execute(stmt)
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {VECTOR_INDEX}")
+                cur.execute(f"ALTER INDEX {temp_name} RENAME TO {VECTOR_INDEX}")
+                cur.execute("ANALYZE rag_chunks")
+            finally:
+                if not conn.closed:
+                    cur.execute("RESET maintenance_work_mem")
+                    cur.execute("RESET max_parallel_maintenance_workers")
+        return {**vector_index_status(conn), "rebuilt": True, "reason": reason}
+    finally:
+        conn.autocommit = autocommit
+        if own:
+            put_pg_conn(conn)
+
+
+_BUILD_LOCK = threading.Lock()
+_BUILD_PENDING = threading.Event()
+
+
+def schedule_vector_index_build() -> None:
+    """
+    Run build_vector_index() on a background thread, so a CONCURRENTLY build
+    never holds up an upload. Requests made while a build runs make it check
+    once more when it finishes.
+    """
+    _BUILD_PENDING.set()
+    if _BUILD_LOCK.locked():
+        return
+
+    def run():
+        with _BUILD_LOCK:
+            while _BUILD_PENDING.is_set():
+                _BUILD_PENDING.clear()
+                try:
+                    build_vector_index()
+                except Exception as e:
+                    print(f"[WARN] vector index build failed: {e}")
+
+    threading.Thread(target=run, name="vector-index-build", daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the vector index even if adequate")
+    parser.add_argument("--kind", choices=INDEX_KINDS, default=None)
+    args = parser.parse_args()
+
+    print(ensure_pg_schema(force=False))
+    print(build_vector_index(kind=args.kind, force=args.rebuild))
+
+
+if __name__ == "__main__":
+    main()
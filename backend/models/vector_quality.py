@@ -0,0 +1,251 @@
+"""
+Per-request recall/latency knob for pgvector search.
+
+A search can ask for a quality level; before the query, the transaction gets
+SET LOCAL ivfflat.probes (ivfflat index) or hnsw.ef_search (hnsw index):
+  - fast / balanced / accurate: approximate search, increasing recall and cost
+  - exact:                      index scans disabled, a true top-k
+
+The setting per level comes from vector_search_quality, written by the
+calibration command. Calibration measures recall@k of each candidate
+setting against exact search, using a sample of stored chunk embeddings as
+queries. It then stores the cheapest setting that meets each level's recall
+target, with the latency it measured. Until calibration has run, the
+DEFAULTS below are used. Re-run it after the vector index is rebuilt.
+
+    python -m models.vector_quality --sample 50 --k 10
+"""
+
+import argparse
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from config import PG_VECTOR_INDEX
+from models.pg_client import get_pg_conn, put_pg_conn
+from models.pg_schema import ensure_pg_schema, vector_index_status
+
+QUALITY_LEVELS = ("fast", "balanced", "accurate", "exact")
+
+# recall@k each approximate level must reach during calibration
+RECALL_TARGETS = {"fast": 0.80, "balanced": 0.90, "accurate": 0.98}
+
+# index kind -> (GUC, uncalibrated value per level)
+SETTINGS = {
+    "ivfflat": "ivfflat.probes",
+    "hnsw": "hnsw.ef_search",
+}
+DEFAULTS = {
+    "ivfflat": {"fast": 1, "balanced": 10, "accurate": 40},
+    "hnsw": {"fast": 20, "balanced": 40, "accurate": 200},
+}
+
+_STATE: Dict[str, Any] = {}
+
+# seconds between background retries while the calibration could not be loaded
+_RELOAD_INTERVAL = 60.0
+_last_reload = 0.0
+_RELOAD_LOCK = threading.Lock()
+
+
+def load_calibration(conn=None) -> Dict[str, Any]:
+    """(Re)load the index kind and calibrated settings into the process cache."""
+    global _STATE
+    own = conn is None
+    conn = conn or get_pg_conn()
+    try:
+        ensure_pg_schema(conn)
+        status = vector_index_status(conn)
+        kind = status["kind"]
+        levels = dict(DEFAULTS.get(kind, {}))
+        calibrated = {}
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT level, value, recall, latency_ms, k, calibrated_at
+                FROM vector_search_quality
+                WHERE index_kind = %s
+                """,
+                (kind,),
+            )
+            for level, value, recall, latency_ms, k, calibrated_at in cur.fetchall():
+                if value is not None:
+                    levels[level] = value
+                calibrated[level] = {
+                    "value": value, "recall": recall, "latency_ms": latency_ms,
+                    "k": k, "calibrated_at": str(calibrated_at),
+                }
+        conn.commit()
+    finally:
+        if own:
+            put_pg_conn(conn)
+
+    _STATE = {"kind": kind, "lists": status.get("lists"), "levels": levels, "calibrated": calibrated}
+    return _STATE
+
+
+def _reload_in_background() -> None:
+    global _last_reload
+    if time.monotonic() - _last_reload < _RELOAD_INTERVAL or _RELOAD_LOCK.locked():
+        return
+    _last_reload = time.monotonic()
+
+    def run():
+        with _RELOAD_LOCK:
+            try:
+                load_calibration()
+            except Exception as e:
+                print(f"[WARN] vector search quality calibration load failed: {e}")
+
+    threading.Thread(target=run, name="vector-quality-load", daemon=True).start()
+
+
+def quality_info() -> Dict[str, Any]:
+    """
+    The cached calibration. Never touches the database (apply_quality_async
+    runs on the event loop): until a load succeeds, the DEFAULTS for the
+    configured index kind are used and the load is retried in a background thread.
+    """
+    if _STATE:
+        return _STATE
+    _reload_in_background()
+    return {"kind": PG_VECTOR_INDEX, "lists": None,
+            "levels": dict(DEFAULTS.get(PG_VECTOR_INDEX, {})), "calibrated": {}}
+
+
+def quality_statements(quality: Optional[str]) -> List[str]:
+    """SET LOCAL statements that put the current transaction at `quality`."""
+    if not quality:
+        return []
+    if quality not in QUALITY_LEVELS:
+        raise ValueError(f"quality must be one of {QUALITY_LEVELS}")
+    if quality == "exact":
+        return ["SET LOCAL enable_indexscan = off"]
+    state = quality_info()
+    setting = SETTINGS.get(state["kind"])
+    if setting is None:
+        return []  # no ANN index yet: every search is exact already
+    return [f"SET LOCAL {setting} = {int(state['levels'][quality])}"]
+
+
+def apply_quality(cur, quality: Optional[str]) -> None:
+    """psycopg2 cursor inside a transaction."""
+    for stmt in quality_statements(quality):
+        cur.execute(stmt)
+
+
+async def apply_quality_async(conn, quality: Optional[str]) -> None:
+    """psycopg 3 async connection inside a transaction."""
+    for stmt in quality_statements(quality):
+        await conn.execute(stmt)
+
+
+# ---------- calibration ----------
+
+def _top_ids(conn, statements: Sequence[str], query: str, k: int) -> Any:
+    with conn.cursor() as cur:
+        for stmt in statements:
+            cur.execute(stmt)
+        started = time.perf_counter()
+        cur.execute(
+            "SELECT id FROM rag_chunks ORDER BY embedding <=> %s::vector LIMIT %s",
+            (query, k),
+        )
+        ids = [r[0] for r in cur.fetchall()]
+        elapsed = (time.perf_counter() - started) * 1000
+    conn.commit()
+    return ids, elapsed
+
+
+def _candidates(kind: str, lists: Optional[int], k: int) -> List[int]:
+    if kind == "ivfflat":
+        top = max(1, lists or 1)
+        values = [1]
+        while values[-1] * 2 < top:
+            values.append(values[-1] * 2)
+        return sorted(set(values + [top]))
+    return sorted({max(k, v) for v in (10, 20, 40, 80, 160, 320, 640)})
+
+
+def calibrate(sample_size: int = 50, k: int = 10, conn=None) -> Dict[str, Any]:
+    """
+    Measure recall@k and mean latency of each candidate setting against exact
+    search, store the cheapest setting per level in vector_search_quality,
+    and reload the process cache.
+    """
+    own = conn is None
+    conn = conn or get_pg_conn()
+    try:
+        status = vector_index_status(conn)
+        kind = status["kind"]
+        if kind not in SETTINGS:
+            raise RuntimeError("rag_chunks has no ANN index to calibrate; run models.pg_schema first")
+        setting = SETTINGS[kind]
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT embedding::text FROM rag_chunks ORDER BY random() LIMIT %s", (sample_size,))
+            queries = [r[0] for r in cur.fetchall()]
+        conn.commit()
+        if not queries:
+            raise RuntimeError("rag_chunks is empty")
+
+        exact, exact_ms = [], 0.0
+        for q in queries:
+            ids, ms = _top_ids(conn, ["SET LOCAL enable_indexscan = off"], q, k)
+            exact.append(set(ids))
+            exact_ms += ms
+
+        measured = []
+        for value in _candidates(kind, status.get("lists"), k):
+            hits, total_ms = 0, 0.0
+            for q, truth in zip(queries, exact):
+                ids, ms = _top_ids(conn, [f"SET LOCAL {setting} = {value}"], q, k)
+                hits += len(truth.intersection(ids))
+                total_ms += ms
+            recall = hits / max(1, sum(len(t) for t in exact))
+            measured.append({"value": value, "recall": round(recall, 4),
+                             "latency_ms": round(total_ms / len(queries), 3)})
+            print(f"[INFO] {setting}={value}: recall@{k}={recall:.3f}, {total_ms / len(queries):.2f} ms")
+
+        chosen = {}
+        for level, target in RECALL_TARGETS.items():
+            chosen[level] = next((m for m in measured if m["recall"] >= target), measured[-1])
+        chosen["exact"] = {"value": None, "recall": 1.0, "latency_ms": round(exact_ms / len(queries), 3)}
+
+        with conn.cursor() as cur:
+            for level, m in chosen.items():
+                cur.execute(
+                    """
+                    INSERT INTO vector_search_quality
+                        (index_kind, level, setting, value, recall, latency_ms, k, sample_size, calibrated_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, now())
+                    ON CONFLICT (index_kind, level) DO UPDATE SET
+                        setting = EXCLUDED.setting, value = EXCLUDED.value,
+                        recall = EXCLUDED.recall, latency_ms = EXCLUDED.latency_ms,
+                        k = EXCLUDED.k, sample_size = EXCLUDED.sample_size,
+                        calibrated_at = EXCLUDED.calibrated_at
+                    """,
+                    (kind, level, setting if m["value"] is not None else None, m["value"],
+                     m["recall"], m["latency_ms"], k, len(queries)),
+                )
+        conn.commit()
+        load_calibration(conn)
+    finally:
+        if own:
+            put_pg_conn(conn)
+    return {"index_kind": kind, "setting": setting, "measured": measured, "levels": chosen}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sample", type=int, default=50, help="Stored embeddings used as queries")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    result = calibrate(sample_size=args.sample, k=args.k)
+    for level, m in result["levels"].items():
+        print(f"[OK] {level}: {result['setting']}={m['value']} recall={m['recall']} latency={m['latency_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
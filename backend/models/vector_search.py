@@ -0,0 +1,104 @@
+"""
+Metadata-filtered nearest-neighbour search over rag_chunks.
+
+An ANN index scan applies WHERE doc_id/pin filters after it has picked its
+candidates, so a selective filter can leave fewer than top_k rows. Filtered
+searches therefore pick a plan:
+  - count the filtered rows first, which is cheap through the
+    (doc_id, source, ...) and (doc_id, pin) b-tree indexes
+  - if there are at most PG_EXACT_SEARCH_MAX_ROWS, rank them exactly:
+    a MATERIALIZED CTE restricts the scan to the filtered rows, so the
+    ANN index is not used
+  - otherwise use the ANN index, and fall back to the exact plan if it
+    returns fewer than top_k rows
+Unfiltered searches always use the ANN index.
+
+The SQL uses named %(...)s parameters, which psycopg2 and psycopg 3 both
+accept, so the blocking pipeline code and the async request path share it.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import PG_EXACT_SEARCH_MAX_ROWS
+
+CHUNK_FIELDS = "id, doc_id, pin, source, page_number, node_id, text"
+
+
+def where_clause(doc_ids: Optional[Sequence[str]] = None,
+                 pin: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    clauses, params = [], {}
+    if doc_ids:
+        clauses.append("doc_id = ANY(%(doc_ids)s)")
+        params["doc_ids"] = list(doc_ids)
+    if pin is not None:
+        clauses.append("pin = %(pin)s")
+        params["pin"] = pin
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def count_sql(where_sql: str) -> str:
+    return f"SELECT count(*) AS n FROM rag_chunks {where_sql}"
+
+
+def ann_sql(where_sql: str) -> str:
+    return f"""
+        SELECT {CHUNK_FIELDS}, embedding <=> %(embedding)s::vector AS distance
+        FROM rag_chunks
+        {where_sql}
+        ORDER BY embedding <=> %(embedding)s::vector
+        LIMIT %(top_k)s
+    """
+
+
+def exact_sql(where_sql: str) -> str:
+    return f"""
+        WITH candidates AS MATERIALIZED (
+            SELECT {CHUNK_FIELDS}, embedding FROM rag_chunks {where_sql}
+        )
+        SELECT {CHUNK_FIELDS}, embedding <=> %(embedding)s::vector AS distance
+        FROM candidates
+        ORDER BY distance
+        LIMIT %(top_k)s
+    """
+
+
+def _first_value(row: Any) -> Any:
+    return row["n"] if isinstance(row, dict) else row[0]
+
+
+def search_rows(cur, emb_literal: str, top_k: int,
+                doc_ids: Optional[Sequence[str]] = None, pin: Optional[str] = None,
+                exact_max_rows: int = PG_EXACT_SEARCH_MAX_ROWS) -> Tuple[List[Any], str]:
+    """Run a (filtered) search on a psycopg2 cursor; returns (rows, plan)."""
+    where_sql, params = where_clause(doc_ids, pin)
+    params.update(embedding=emb_literal, top_k=top_k)
+    if where_sql:
+        cur.execute(count_sql(where_sql), params)
+        if _first_value(cur.fetchone()) <= exact_max_rows:
+            cur.execute(exact_sql(where_sql), params)
+            return cur.fetchall(), "exact"
+    cur.execute(ann_sql(where_sql), params)
+    rows = cur.fetchall()
+    if where_sql and len(rows) < top_k:
+        cur.execute(exact_sql(where_sql), params)
+        return cur.fetchall(), "ann+exact"
+    return rows, "ann"
+
+
+async def search_rows_async(cur, emb_literal: str, top_k: int,
+                            doc_ids: Optional[Sequence[str]] = None, pin: Optional[str] = None,
+                            exact_max_rows: int = PG_EXACT_SEARCH_MAX_ROWS) -> Tuple[List[Any], str]:
+    """search_rows on a psycopg 3 async cursor."""
+    where_sql, params = where_clause(doc_ids, pin)
+    params.update(embedding=emb_literal, top_k=top_k)
+    if where_sql:
+        await cur.execute(count_sql(where_sql), params)
+        if _first_value(await cur.fetchone()) <= exact_max_rows:
+            await cur.execute(exact_sql(where_sql), params)
+            return await cur.fetchall(), "exact"
+    await cur.execute(ann_sql(where_sql), params)
+    rows = await cur.fetchall()
+    if where_sql and len(rows) < top_k:
+        await cur.execute(exact_sql(where_sql), params)
+        return await cur.fetchall(), "ann+exact"
+    return rows, "ann"
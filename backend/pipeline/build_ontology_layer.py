@@ -18,15 +18,24 @@ Adds:
 """
 
 import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Dict, Any, List
 
-from neo4j import GraphDatabase
+# Add parent directory to sys.path to allow importing 'models'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.neo4j_client import get_driver, mark_document_ingested
+from models.neo4j_schema import ensure_schema
 
 try:
     from pipeline.ontology_config import ONTOLOGY_CONFIG
+    from pipeline.text_match import AhoCorasick, InvertedIndex
 except ModuleNotFoundError:
     from ontology_config import ONTOLOGY_CONFIG
+    from text_match import AhoCorasick, InvertedIndex
 
 try:
     import pandas as pd  # for SpecItem from CSV
@@ -36,11 +45,17 @@ except ImportError:
 
 
 class OntologyBuilder:
-    def __init__(self, uri: str, user: str, password: str):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri: str = None, user: str = None, password: str = None):
+        # Shared, pooled driver; defaults to the configured NEO4J_* connection
+        self.driver = get_driver(uri, user, password)
+        ensure_schema(self.driver)
+        # doc_id -> TextBlock/Figure/Table content, fetched once per document
+        self._content_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._keyword_index_cache: Dict[str, InvertedIndex] = {}
 
     def close(self):
-        self.driver.close()
+        # The shared driver is closed at app shutdown / process exit.
+        pass
 
     # ---------- IC / Pin / Constraint creation ----------
 
@@ -82,9 +97,14 @@ class OntologyBuilder:
                 for c in ic_cfg.get("constraints", []):
                     self._create_constraint(session, doc_id, ic_name, c)
 
-                # Optional: create Pin↔content MENTIONED_IN links via text search
+                # Try to link constraints to relevant Tables / TextBlocks / Figures
+                self._link_constraints_to_sources(session, doc_id, ic_cfg.get("constraints", []))
+
+                # Optional: create Pin↔content MENTIONED_IN links via local text matching
                 self._link_pins_to_content(session, doc_id, ic_name, ic_cfg.get("pins", []))
 
+            mark_document_ingested(doc_id, session)
+
     def _create_constraint(self, session, doc_id: str, ic_name: str, c: Dict[str, Any]):
         cid = c["id"]
         pin_name = c["pin"]
@@ -92,7 +112,6 @@ class OntologyBuilder:
         ctype = c.get("type")
         value = c.get("value")
         unit = c.get("unit")
-        keywords = c.get("keywords", [])
 
         # Constraint node + Pin->Constraint relation
         session.run(
@@ -115,177 +134,211 @@ class OntologyBuilder:
             description=description,
         )
 
-        # Try to link constraint to relevant Tables / TextBlocks / Figures
-        if keywords:
-            self._link_constraint_to_sources(session, doc_id, cid, keywords)
-
-    def _link_constraint_to_sources(self, session, doc_id: str, cid: str, keywords: List[str]):
+    def _doc_keyword_index(self, session, doc_id: str) -> InvertedIndex:
+        """Inverted term index over the document's TextBlock/Figure/Table text."""
+        if doc_id not in self._keyword_index_cache:
+            index = InvertedIndex()
+            for node in self._fetch_doc_content(session, doc_id):
+                # TextBlocks written by the RAG ingestors only carry a summary
+                index.add(node["node_id"], node["context"] or node["summary"])
+            self._keyword_index_cache[doc_id] = index
+        return self._keyword_index_cache[doc_id]
+
+    def _link_constraints_to_sources(self, session, doc_id: str, constraints: List[Dict[str, Any]]):
         """
         Simple heuristic:
-        - find any TextBlock/Figure/Table whose text contains ALL keywords
+        - find any TextBlock/Figure/Table whose text contains ALL keywords of a constraint
         - connect (Constraint)-[:DERIVED_FROM]->(that node)
-        """
-        kw_l = [k.lower() for k in keywords if k]
-
-        def _where_clause(var: str) -> str:
-            return " AND ".join([f"toLower({var}.natural_language_context) CONTAINS '{k}'" for k in kw_l])
 
-        # Figures
-        if kw_l:
-            session.run(
-                f"""
-                MATCH (c:Constraint {{id: $cid, doc_id: $doc_id}})
-                MATCH (p:Page {{doc_id: $doc_id}})-[:HAS_FIGURE]->(f:Figure)
-                WHERE {_where_clause('f')}
-                MERGE (c)-[:DERIVED_FROM]->(f)
-                """,
-                doc_id=doc_id,
-                cid=cid,
-            )
-            # Tables
-            session.run(
-                f"""
-                MATCH (c:Constraint {{id: $cid, doc_id: $doc_id}})
-                MATCH (p:Page {{doc_id: $doc_id}})-[:HAS_TABLE]->(t:Table)
-                WHERE {_where_clause('t')}
-                MERGE (c)-[:DERIVED_FROM]->(t)
-                """,
-                doc_id=doc_id,
-                cid=cid,
-            )
-            # TextBlocks
+        Keyword sets are resolved locally against the per-document inverted
+        index and every edge is written in one parameterised UNWIND.
+        """
+        index = self._doc_keyword_index(session, doc_id)
+        rows = []
+        for c in constraints:
+            keywords = [k for k in c.get("keywords", []) if k]
+            if not keywords:
+                continue
+            for node_id in index.match_all(keywords):
+                rows.append({"cid": c["id"], "node_id": node_id})
+
+        if rows:
             session.run(
-                f"""
-                MATCH (c:Constraint {{id: $cid, doc_id: $doc_id}})
-                MATCH (p:Page {{doc_id: $doc_id}})-[:HAS_TEXT_BLOCK]->(tb:TextBlock)
-                WHERE {_where_clause('tb')}
-                MERGE (c)-[:DERIVED_FROM]->(tb)
+                """
+                UNWIND $rows AS row
+                MATCH (c:Constraint {id: row.cid, doc_id: $doc_id})
+                MATCH (n) WHERE elementId(n) = row.node_id
+                MERGE (c)-[:DERIVED_FROM]->(n)
                 """,
                 doc_id=doc_id,
-                cid=cid,
-            )
+                rows=rows,
+            ).consume()
+        print(f"[INFO] {len(rows)} DERIVED_FROM links for {len(constraints)} constraints")
 
     # ---------- Pin↔content MENTIONED_IN ----------
 
-    def _link_pins_to_content(self, session, doc_id: str, ic_name: str, pins: List[str]):
+    def _fetch_doc_content(self, session, doc_id: str) -> List[Dict[str, Any]]:
         """
-        For each Pin name, find any TextBlock/Figure/Table containing that token and
-        connect (Pin)-[:MENTIONED_IN]->(node).
+        Read every TextBlock/Figure/Table of a document once; the linking
+        steps below match against this list locally.
         """
-        for pin_name in pins:
-            token = pin_name  # simple; you can add regex if needed
+        if doc_id in self._content_cache:
+            return self._content_cache[doc_id]
 
-            # TextBlocks
-            session.run(
-                """
-                MATCH (p:Pin {name: $pin_name, ic_name: $ic_name, doc_id: $doc_id})
-                MATCH (pg:Page {doc_id: $doc_id})-[:HAS_TEXT_BLOCK]->(tb:TextBlock)
-                WHERE tb.summary CONTAINS $token OR tb.summary CONTAINS $token + ' '
-                MERGE (p)-[:MENTIONED_IN]->(tb)
-                """,
-                doc_id=doc_id,
-                ic_name=ic_name,
-                pin_name=pin_name,
-                token=token,
-            )
+        result = session.run(
+            """
+            MATCH (:Page {doc_id: $doc_id})-[:HAS_TEXT_BLOCK|HAS_FIGURE|HAS_TABLE]->(n)
+            RETURN DISTINCT elementId(n) AS node_id,
+                   labels(n)[0] AS label,
+                   n.summary AS summary,
+                   n.natural_language_context AS context
+            """,
+            doc_id=doc_id,
+        )
+        content = [record.data() for record in result]
+        self._content_cache[doc_id] = content
+        return content
 
-            # Figures
-            session.run(
-                """
-                MATCH (p:Pin {name: $pin_name, ic_name: $ic_name, doc_id: $doc_id})
-                MATCH (pg:Page {doc_id: $doc_id})-[:HAS_FIGURE]->(f:Figure)
-                WHERE f.natural_language_context CONTAINS $token
-                MERGE (p)-[:MENTIONED_IN]->(f)
-                """,
-                doc_id=doc_id,
-                ic_name=ic_name,
-                pin_name=pin_name,
-                token=token,
-            )
+    def _link_pins_to_content(self, session, doc_id: str, ic_name: str, pins: List[str]):
+        """
+        Find every Pin name in the document's TextBlock summaries and
+        Figure/Table contexts with one Aho-Corasick pass per text (whole-word
+        matches only), then write all (Pin)-[:MENTIONED_IN]->(node) edges in
+        one UNWIND.
+        """
+        if not pins:
+            return
 
-            # Tables
+        matcher = AhoCorasick(pins)
+        rows = []
+        for node in self._fetch_doc_content(session, doc_id):
+            text = node["summary"] if node["label"] == "TextBlock" else node["context"]
+            for pin_name in matcher.find_words(text or ""):
+                rows.append({"pin_name": pin_name, "node_id": node["node_id"]})
+
+        if rows:
             session.run(
                 """
-                MATCH (p:Pin {name: $pin_name, ic_name: $ic_name, doc_id: $doc_id})
-                MATCH (pg:Page {doc_id: $doc_id})-[:HAS_TABLE]->(t:Table)
-                WHERE t.natural_language_context CONTAINS $token
-                MERGE (p)-[:MENTIONED_IN]->(t)
+                UNWIND $rows AS row
+                MATCH (p:Pin {name: row.pin_name, ic_name: $ic_name, doc_id: $doc_id})
+                MATCH (n) WHERE elementId(n) = row.node_id
+                MERGE (p)-[:MENTIONED_IN]->(n)
                 """,
                 doc_id=doc_id,
                 ic_name=ic_name,
-                pin_name=pin_name,
-                token=token,
-            )
+                rows=rows,
+            ).consume()
+        print(f"[INFO] {ic_name}: {len(rows)} MENTIONED_IN links for {len(pins)} pins")
 
     # ---------- Optional: SpecItem from table CSV ----------
 
-    def create_spec_items_from_tables(self, doc_id: str):
+    def create_spec_items_from_tables(self, doc_id: str, max_workers: int = 4):
         """
         For each Table node that has path set to a CSV:
           - read the CSV
           - create SpecItem rows
           - link them to Table
           - heuristically link to Pins based on pin names present in the row
+
+        Tables are processed in parallel, each worker with its own session and
+        one write transaction per table.
         """
         if not HAS_PANDAS:
             print("[INFO] pandas not installed; skipping SpecItem creation.")
             return
 
         with self.driver.session() as session:
-            result = session.run(
-                """
-                MATCH (t:Table {doc_id: $doc_id})
-                WHERE t.path IS NOT NULL
-                RETURN t.table_id AS table_id, t.path AS path
-                """,
-                doc_id=doc_id,
-            )
-            for record in result:
-                table_id = record["table_id"]
-                path = record["path"]
-                if not path:
-                    continue
-                self._create_spec_items_for_table(session, doc_id, table_id, path)
-
-    def _create_spec_items_for_table(self, session, doc_id: str, table_id: str, path: str):
+            tables = [
+                (record["table_id"], record["path"])
+                for record in session.run(
+                    """
+                    MATCH (t:Table {doc_id: $doc_id})
+                    WHERE t.path IS NOT NULL
+                    RETURN t.table_id AS table_id, t.path AS path
+                    """,
+                    doc_id=doc_id,
+                )
+                if record["path"]
+            ]
+            pins = [
+                (record["name"], record["ic_name"])
+                for record in session.run(
+                    "MATCH (p:Pin {doc_id: $doc_id}) RETURN p.name AS name, p.ic_name AS ic_name",
+                    doc_id=doc_id,
+                )
+            ]
+
+        # pin name -> every IC that has a pin of that name
+        pin_ics: Dict[str, List[str]] = {}
+        for name, ic_name in pins:
+            pin_ics.setdefault(name, []).append(ic_name)
+        matcher = AhoCorasick(pin_ics)
+
+        if not tables:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tables)))) as pool:
+            futures = {
+                pool.submit(self._create_spec_items_for_table, doc_id, table_id, path, matcher, pin_ics): table_id
+                for table_id, path in tables
+            }
+            for future in as_completed(futures):
+                try:
+                    count = future.result()
+                    print(f"[INFO] Table {futures[future]}: {count} SpecItems")
+                except Exception as e:
+                    print(f"[WARN] SpecItem creation failed for table {futures[future]}: {e}")
+        mark_document_ingested(doc_id)
+
+    def _create_spec_items_for_table(self, doc_id: str, table_id: str, path: str,
+                                     matcher: AhoCorasick, pin_ics: Dict[str, List[str]]) -> int:
         try:
             df = pd.read_csv(path)
         except Exception as e:
             print(f"[WARN] Could not read table CSV {path}: {e}")
-            return
-
-        df = df.fillna("")
+            return 0
+
+        if df.empty:
+            return 0
+        row_texts = df.fillna("").astype(str).agg(" | ".join, axis=1).tolist()
+
+        rows = []
+        for idx, row_text in enumerate(row_texts):
+            # Link SpecItem to Pins whose names appear in the row
+            pins = [
+                {"name": name, "ic_name": ic_name}
+                for name in matcher.find_words(row_text)
+                for ic_name in pin_ics[name]
+            ]
+            rows.append({
+                "spec_id": f"{table_id}_row{idx+1}",
+                "row_index": idx,
+                "row_text": row_text,
+                "pins": pins,
+            })
 
-        for idx, row in df.iterrows():
-            spec_id = f"{table_id}_row{idx+1}"
-            row_text = " | ".join(str(v) for v in row.values)
-
-            session.run(
-                """
-                MATCH (t:Table {table_id: $table_id, doc_id: $doc_id})
-                MERGE (s:SpecItem {id: $spec_id, doc_id: $doc_id})
-                SET s.row_index = $row_index,
-                    s.raw_text = $row_text
-                MERGE (t)-[:HAS_SPEC_ITEM]->(s)
-                """,
-                doc_id=doc_id,
-                table_id=table_id,
-                spec_id=spec_id,
-                row_index=int(idx),
-                row_text=row_text,
-            )
+        with self.driver.session() as session:
+            session.execute_write(self._write_spec_items, doc_id, table_id, rows)
+        return len(rows)
 
-            # Try to link SpecItem to Pins if pin names appear in the row
-            session.run(
-                """
-                MATCH (s:SpecItem {id: $spec_id, doc_id: $doc_id})
-                MATCH (p:Pin {doc_id: $doc_id})
-                WHERE s.raw_text CONTAINS p.name
-                MERGE (s)-[:APPLIES_TO_PIN]->(p)
-                """,
-                doc_id=doc_id,
-                spec_id=spec_id,
-            )
+    @staticmethod
+    def _write_spec_items(tx, doc_id: str, table_id: str, rows: List[Dict[str, Any]]):
+        tx.run(
+            """
+            MATCH (t:Table {table_id: $table_id, doc_id: $doc_id})
+            UNWIND $rows AS row
+            MERGE (s:SpecItem {id: row.spec_id, doc_id: $doc_id})
+            SET s.row_index = row.row_index,
+                s.raw_text = row.row_text
+            MERGE (t)-[:HAS_SPEC_ITEM]->(s)
+            WITH s, row
+            UNWIND row.pins AS pin
+            MATCH (p:Pin {name: pin.name, ic_name: pin.ic_name, doc_id: $doc_id})
+            MERGE (s)-[:APPLIES_TO_PIN]->(p)
+            """,
+            doc_id=doc_id,
+            table_id=table_id,
+            rows=rows,
+        ).consume()
 
 
 def main():
@@ -295,6 +348,7 @@ def main():
     parser.add_argument("--neo4j_password", required=True)
     parser.add_argument("--doc_id", required=True, help="doc_id to build ontology for (e.g. RT6220_DS-12)")
     parser.add_argument("--with_spec_items", action="store_true", help="Also create SpecItem nodes from table CSV")
+    parser.add_argument("--workers", type=int, default=4, help="Tables processed in parallel for SpecItem creation")
 
     args = parser.parse_args()
 
@@ -305,7 +359,7 @@ def main():
 
         if args.with_spec_items:
             print("[OK] Creating SpecItem nodes from tables")
-            builder.create_spec_items_from_tables(args.doc_id)
+            builder.create_spec_items_from_tables(args.doc_id, max_workers=args.workers)
     finally:
         builder.close()
 
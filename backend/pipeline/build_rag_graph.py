@@ -26,6 +26,7 @@ You can omit --clear_graph if you don’t want to wipe the DB first.
 
 import argparse
 import json
+import time
 from pathlib import Path
 from typing import Dict, Any, List
 import re
@@ -39,7 +40,9 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from llm.answer_llm import answer_llm
 from main import vision_infer
 
-from neo4j import GraphDatabase
+from models.neo4j_client import get_driver, mark_document_ingested
+from models.neo4j_schema import ensure_schema
+from config import NEO4J_BULK_BATCH_SIZE, NEO4J_PURGE_BATCH_SIZE
 
 # Optional: use pandas to peek at tables to build better summaries
 try:
@@ -311,7 +314,7 @@ def build_enriched_json(raw_json: Dict[str, Any]) -> Dict[str, Any]:
         # For now: a single text block per page (you can later split by headings)
         page_obj["text_blocks"].append(
             {
-                "id": f"p{page_number}_text_block_1",
+                "id": text_block_id(doc_id, f"p{page_number}_text_block_1"),
                 "type": "text_block",
                 "title": None,
                 "summary": call_llm_summary(raw_text, max_tokens=256)
@@ -398,6 +401,78 @@ def build_enriched_json(raw_json: Dict[str, Any]) -> Dict[str, Any]:
 #  NEO4J INGESTION
 # ==================
 
+def text_block_id(doc_id: str, tb_id: str) -> str:
+    """
+    TextBlock ids are unique across documents (text_block_id constraint), so
+    they carry the doc_id. Enriched JSON written before that has bare
+    p<N>_text_block_<M> ids, which get the prefix at ingestion.
+    """
+    prefix = f"{doc_id}_"
+    return tb_id if tb_id.startswith(prefix) else prefix + tb_id
+
+
+# Bulk-mode statements: one UNWIND per node label, rows sent as a parameter list.
+_BULK_PAGES = """
+UNWIND $rows AS row
+MATCH (d:Document {doc_id: row.doc_id})
+MERGE (p:Page {doc_id: row.doc_id, page_number: row.page_number})
+SET p.natural_language_context = row.nlc
+MERGE (d)-[:HAS_PAGE]->(p)
+"""
+
+_BULK_TEXT_BLOCKS = """
+UNWIND $rows AS row
+MATCH (p:Page {doc_id: row.doc_id, page_number: row.page_number})
+MERGE (t:TextBlock {id: row.id})
+SET t.title = row.title,
+    t.summary = row.summary
+MERGE (p)-[:HAS_TEXT_BLOCK]->(t)
+"""
+
+_BULK_FIGURES = """
+UNWIND $rows AS row
+MATCH (p:Page {doc_id: row.doc_id, page_number: row.page_number})
+MERGE (f:Figure {figure_id: row.figure_id})
+SET f.title = row.title,
+    f.natural_language_context = row.nlc,
+    f.type = row.ftype,
+    f.path = row.path,
+    f.width = row.width,
+    f.height = row.height
+MERGE (p)-[:HAS_FIGURE]->(f)
+"""
+
+_BULK_TABLES = """
+UNWIND $rows AS row
+MATCH (p:Page {doc_id: row.doc_id, page_number: row.page_number})
+MERGE (t:Table {table_id: row.table_id})
+SET t.natural_language_context = row.nlc,
+    t.rows = row.rows,
+    t.cols = row.cols,
+    t.flavor = row.flavor,
+    t.path = row.path
+MERGE (p)-[:HAS_TABLE]->(t)
+"""
+
+_BULK_QA = {
+    "Figure": """
+UNWIND $rows AS row
+MATCH (p:Figure {figure_id: row.parent_id})
+MERGE (q:QA_Triple {id: row.id})
+SET q.question = row.question,
+    q.answer = row.answer
+MERGE (p)-[:HAS_QA]->(q)
+""",
+    "Table": """
+UNWIND $rows AS row
+MATCH (p:Table {table_id: row.parent_id})
+MERGE (q:QA_Triple {id: row.id})
+SET q.question = row.question,
+    q.answer = row.answer
+MERGE (p)-[:HAS_QA]->(q)
+""",
+}
+
 class Neo4jRAGIngestor:
     """
     Neo4j ingestor for:
@@ -418,17 +493,142 @@ class Neo4jRAGIngestor:
       (Table)-[:HAS_QA]->(QA_Triple)
     """
 
-    def __init__(self, uri: str, user: str, password: str):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri: str = None, user: str = None, password: str = None):
+        # Shared, pooled driver; defaults to the configured NEO4J_* connection
+        self.driver = get_driver(uri, user, password)
 
     def close(self):
-        self.driver.close()
+        # The shared driver is closed at app shutdown / process exit.
+        pass
 
-    def clear_graph(self):
+    def clear_graph(self, batch_size: int = NEO4J_PURGE_BATCH_SIZE):
+        # Batched so wiping a large graph never needs one heap-sized transaction.
+        # To replace a single document use pipeline/purge_document.py instead.
         with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
+            session.run(
+                """
+                MATCH (n)
+                CALL {
+                    WITH n
+                    DETACH DELETE n
+                } IN TRANSACTIONS OF $batch_size ROWS
+                """,
+                batch_size=batch_size,
+            ).consume()
+
+    def ingest_enriched_json(self, enriched: Dict[str, Any], bulk: bool = True,
+                             batch_size: int = NEO4J_BULK_BATCH_SIZE) -> int:
+        """
+        Write the enriched document into Neo4j and return the number of nodes written.
 
-    def ingest_enriched_json(self, enriched: Dict[str, Any]):
+        bulk=True groups nodes by label and writes them with UNWIND in managed
+        write transactions of `batch_size` rows; bulk=False keeps the original
+        one-statement-per-node path (useful as a baseline).
+        """
+        ensure_schema(self.driver)
+        start = time.perf_counter()
+        if bulk:
+            n_nodes = self._ingest_bulk(enriched, batch_size)
+        else:
+            n_nodes = self._ingest_per_node(enriched)
+        mark_document_ingested(enriched["doc_id"])
+        elapsed = time.perf_counter() - start
+        rate = n_nodes / elapsed if elapsed > 0 else float("inf")
+        print(f"[INFO] Ingested {n_nodes} nodes in {elapsed:.2f}s "
+              f"({rate:.0f} nodes/sec, mode={'bulk' if bulk else 'per_node'})")
+        return n_nodes
+
+    def _ingest_bulk(self, enriched: Dict[str, Any], batch_size: int) -> int:
+        doc_id = enriched["doc_id"]
+        pages, text_blocks, figures, tables = [], [], [], []
+        qa_rows: Dict[str, List[Dict[str, Any]]] = {"Figure": [], "Table": []}
+
+        for page in enriched.get("pages", []):
+            page_number = page["page_number"]
+            pages.append({
+                "doc_id": doc_id,
+                "page_number": page_number,
+                "nlc": page.get("natural_language_context", ""),
+            })
+            for tb in page.get("text_blocks", []):
+                text_blocks.append({
+                    "doc_id": doc_id,
+                    "page_number": page_number,
+                    "id": text_block_id(doc_id, tb["id"]),
+                    "title": tb.get("title"),
+                    "summary": tb.get("summary"),
+                })
+            for fig in page.get("figures", []):
+                image_meta = fig.get("image_meta", {}) or {}
+                figures.append({
+                    "doc_id": doc_id,
+                    "page_number": page_number,
+                    "figure_id": fig["figure_id"],
+                    "title": fig.get("title"),
+                    "nlc": fig.get("natural_language_context", ""),
+                    "ftype": fig.get("type", "unknown"),
+                    "path": image_meta.get("path"),
+                    "width": image_meta.get("width"),
+                    "height": image_meta.get("height"),
+                })
+                for qa in fig.get("qa_triples", []):
+                    qa_rows["Figure"].append({"parent_id": fig["figure_id"], "id": qa["id"],
+                                              "question": qa["question"], "answer": qa["answer"]})
+            for tab in page.get("tables", []):
+                tables.append({
+                    "doc_id": doc_id,
+                    "page_number": page_number,
+                    "table_id": tab["table_id"],
+                    "nlc": tab.get("natural_language_context", ""),
+                    "rows": tab.get("rows"),
+                    "cols": tab.get("cols"),
+                    "flavor": tab.get("flavor"),
+                    "path": tab.get("path"),
+                })
+                for qa in tab.get("qa_triples", []):
+                    qa_rows["Table"].append({"parent_id": tab["table_id"], "id": qa["id"],
+                                             "question": qa["question"], "answer": qa["answer"]})
+
+        with self.driver.session() as session:
+            session.execute_write(self._write_document, enriched)
+            # Parents before children so every MATCH in the next statement hits.
+            for cypher, rows in [
+                (_BULK_PAGES, pages),
+                (_BULK_TEXT_BLOCKS, text_blocks),
+                (_BULK_FIGURES, figures),
+                (_BULK_TABLES, tables),
+                (_BULK_QA["Figure"], qa_rows["Figure"]),
+                (_BULK_QA["Table"], qa_rows["Table"]),
+            ]:
+                for i in range(0, len(rows), batch_size):
+                    session.execute_write(self._write_rows, cypher, rows[i:i + batch_size])
+
+        return 1 + len(pages) + len(text_blocks) + len(figures) + len(tables) \
+            + len(qa_rows["Figure"]) + len(qa_rows["Table"])
+
+    @staticmethod
+    def _write_document(tx, enriched: Dict[str, Any]):
+        tx.run(
+            """
+            MERGE (d:Document {doc_id: $doc_id})
+            SET d.source_file = $source_file,
+                d.num_pages = $num_pages,
+                d.assets_dir = $assets_dir,
+                d.natural_language_context = $doc_nlc
+            """,
+            doc_id=enriched["doc_id"],
+            source_file=enriched.get("source_file"),
+            num_pages=enriched.get("num_pages"),
+            assets_dir=enriched.get("assets_dir"),
+            doc_nlc=enriched.get("document_natural_language_context", ""),
+        ).consume()
+
+    @staticmethod
+    def _write_rows(tx, cypher: str, rows: List[Dict[str, Any]]):
+        tx.run(cypher, rows=rows).consume()
+
+    def _ingest_per_node(self, enriched: Dict[str, Any]) -> int:
+        n_nodes = 1
         with self.driver.session() as session:
             doc_id = enriched["doc_id"]
             source_file = enriched.get("source_file")
@@ -455,6 +655,10 @@ class Neo4jRAGIngestor:
             # Pages + content
             for page in enriched.get("pages", []):
                 self._create_page(session, doc_id, page)
+                n_nodes += 1 + len(page.get("text_blocks", []))
+                for item in page.get("figures", []) + page.get("tables", []):
+                    n_nodes += 1 + len(item.get("qa_triples", []))
+        return n_nodes
 
     def _create_page(self, session, doc_id: str, page: Dict[str, Any]):
         page_number = page["page_number"]
@@ -486,7 +690,7 @@ class Neo4jRAGIngestor:
             self._create_table(session, doc_id, page_number, tab)
 
     def _create_text_block(self, session, doc_id: str, page_number: int, tb: Dict[str, Any]):
-        tb_id = tb["id"]
+        tb_id = text_block_id(doc_id, tb["id"])
         session.run(
             """
             MATCH (p:Page {doc_id: $doc_id, page_number: $page_number})
@@ -611,6 +815,8 @@ def main():
     parser.add_argument("--neo4j_user", required=True)
     parser.add_argument("--neo4j_password", required=True)
     parser.add_argument("--clear_graph", action="store_true", help="Delete all existing nodes/edges first")
+    parser.add_argument("--ingest_mode", choices=["bulk", "per_node"], default="bulk",
+                        help="bulk: UNWIND batches in managed transactions; per_node: one statement per node")
 
     args = parser.parse_args()
 
@@ -636,7 +842,7 @@ def main():
             print("[WARN] Clearing entire graph...")
             ingestor.clear_graph()
         print("[OK] Ingesting enriched JSON into Neo4j...")
-        ingestor.ingest_enriched_json(enriched)
+        ingestor.ingest_enriched_json(enriched, bulk=args.ingest_mode == "bulk")
         print("[OK] Ingestion complete.")
     finally:
         ingestor.close()
@@ -26,13 +26,12 @@ from bs4 import NavigableString, Tag
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 try:
-    from config import EURON_API_KEY, ANSWER_MODEL, MAX_TOKENS, TEMPERATURE, ANSWER_URL
-    import requests
+    from config import EURON_API_KEY, ANSWER_MODEL, MAX_TOKENS, TEMPERATURE
+    from llm.resilience import post_json
 except ImportError:
     # Fallback if config not found (e.g. running standalone)
     print("[WARN] Could not import config. LLM features may fail.")
     EURON_API_KEY = os.getenv("EURON_API_KEY", "")
-    ANSWER_URL = os.getenv("ANSWER_URL", "")
     ANSWER_MODEL = os.getenv("ANSWER_MODEL", "gpt-4o")
 
 def llm_enrich_text(text: str) -> str:
@@ -71,9 +70,7 @@ def llm_enrich_text(text: str) -> str:
             "max_tokens": 2000,
             "temperature": 0.0
         }
-        resp = requests.post(ANSWER_URL, json=payload, headers=headers, timeout=60)
-        resp.raise_for_status()
-        data = resp.json()
+        data = post_json("answer", payload, headers=headers, deadline=60)
         return data["choices"][0]["message"]["content"]
     except Exception as e:
         print(f"[WARN] LLM enrichment failed: {e}")
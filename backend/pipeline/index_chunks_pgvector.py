@@ -3,9 +3,8 @@
 import argparse
 from typing import List, Dict, Any
 
-from neo4j import GraphDatabase
-
 from pgvector_store import PgVectorStore
+from models.neo4j_client import get_driver
 
 
 def fetch_chunks_from_neo4j(
@@ -18,7 +17,7 @@ def fetch_chunks_from_neo4j(
     Fetch candidate chunks from Neo4j for this document.
     One chunk per TextBlock/Figure/Table/Constraint + Pin links.
     """
-    driver = GraphDatabase.driver(uri, auth=(user, password))
+    driver = get_driver(uri, user, password)
     chunks: List[Dict[str, Any]] = []
 
     with driver.session() as session:
@@ -163,7 +162,6 @@ def fetch_chunks_from_neo4j(
                 }
             )
 
-    driver.close()
     return chunks
 
 
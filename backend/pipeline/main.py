@@ -1,6 +1,6 @@
+import asyncio
 import base64
 import json
-import requests
 import numpy as np
 from pathlib import Path
 import sys
@@ -9,24 +9,42 @@ import os
 # Add parent directory to sys.path to allow importing 'config'
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from config import ANSWER_URL, ANSWER_MODEL, EMBEDDING_URL, EMBEDDING_MODEL, VISION_URL, VISION_MODEL
+from config import ANSWER_MODEL, EMBEDDING_MODEL, VISION_MODEL
+from llm.resilience import post_json, post_json_async
+
+# Blocking ingestion calls to local (Ollama) models keep their original 300s budget;
+# the role deadlines in config are sized for the /ask request path
+LOCAL_MODEL_DEADLINE = 300
 
 def llm_infer(prompt: str, model: str = None) -> str:
     """Text inference using a local LLM."""
     if model is None:
         model = ANSWER_MODEL
     
-    resp = requests.post(
-        ANSWER_URL,
-        json={
+    data = post_json(
+        "answer",
+        {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": False,
+        },
+        deadline=LOCAL_MODEL_DEADLINE,
+    )
+    return data["message"]["content"]
+
+async def llm_infer_async(prompt: str, model: str = None) -> str:
+    """Async llm_infer for the FastAPI request path."""
+    if model is None:
+        model = ANSWER_MODEL
+
+    data = await post_json_async(
+        "answer",
+        {
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
             "stream": False,
         },
-        timeout=300,
     )
-    resp.raise_for_status()
-    data = resp.json()
     return data["message"]["content"]
 
 def embed_text(texts, model: str = None) -> np.ndarray:
@@ -39,17 +57,25 @@ def embed_text(texts, model: str = None) -> np.ndarray:
 
     vectors = []
     for t in texts:
-        resp = requests.post(
-            EMBEDDING_URL,
-            json={"model": model, "prompt": t},
-            timeout=300,
-        )
-        resp.raise_for_status()
-        emb = resp.json()["embedding"]
+        data = post_json("embedding", {"model": model, "prompt": t}, deadline=LOCAL_MODEL_DEADLINE)
+        emb = data["embedding"]
         vectors.append(emb)
 
     return np.array(vectors, dtype="float32")
 
+async def embed_text_async(texts, model: str = None) -> np.ndarray:
+    """Async embed_text; texts are embedded concurrently."""
+    if model is None:
+        model = EMBEDDING_MODEL
+
+    if isinstance(texts, str):
+        texts = [texts]
+
+    results = await asyncio.gather(
+        *(post_json_async("embedding", {"model": model, "prompt": t}) for t in texts)
+    )
+    return np.array([data["embedding"] for data in results], dtype="float32")
+
 def encode_image_to_base64(image_path: str) -> str:
     with open(image_path, "rb") as f:
         return base64.b64encode(f.read()).decode("utf-8")
@@ -64,18 +90,16 @@ def vision_infer(image_path: str,
     img_b64 = encode_image_to_base64(image_path)
 
     # Some Ollama vision models work through /api/generate with a 'images' field
-    resp = requests.post(
-        VISION_URL,
-        json={
+    data = post_json(
+        "vision",
+        {
             "model": model,
             "prompt": prompt,
             "images": [img_b64],
             "stream": False,
         },
-        timeout=300,
+        deadline=LOCAL_MODEL_DEADLINE,
     )
-    resp.raise_for_status()
-    data = resp.json()
     # For non-streaming, Ollama returns full text in 'response'
     return data.get("response", "")
 
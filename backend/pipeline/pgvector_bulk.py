@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+pgvector_bulk.py
+
+Bulk loading into rag_chunks with COPY ... FROM STDIN (FORMAT binary).
+
+Rows are encoded straight to the Postgres binary COPY format and streamed to
+the server as they are produced, so memory stays flat for millions of chunks:
+  - text columns:  UTF-8 bytes
+  - page_number:   int4
+  - embedding:     pgvector's binary form (int16 dim, int16 unused, dim x float4),
+                   written from a NumPy array in one tobytes() call -- no
+                   per-float Python strings
+
+sync_doc_chunks() makes a document's load idempotent: every row carries
+content_hash = md5(text), unique per (doc_id, source, node_id, pin, content_hash).
+Only chunks whose hash is not already stored are embedded and inserted
+(ON CONFLICT upsert); stored chunks that are no longer produced are deleted.
+
+Usage (reload pre-computed embeddings, one JSON object per line with
+doc_id, pin, source, page_number, node_id, text, embedding; a document's
+lines must be contiguous, and each document is synced with sync_doc_chunks):
+    python pgvector_bulk.py --jsonl chunks.jsonl
+"""
+
+import argparse
+import hashlib
+import io
+import itertools
+import json
+import os
+import struct
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Add parent directory to sys.path to allow importing 'config'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import VECTOR_DIM
+from models.pg_client import pg_connection
+from models.pg_schema import ensure_pg_schema, build_vector_index
+
+CHUNK_COLUMNS = ("doc_id", "pin", "source", "page_number", "node_id", "text", "embedding")
+HASHED_COLUMNS = CHUNK_COLUMNS + ("content_hash",)
+
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_TRAILER = struct.pack(">h", -1)
+_NULL = struct.pack(">i", -1)
+
+# progress(rows_so_far)
+ProgressFn = Callable[[int], None]
+
+
+def _encode_text(value: Any) -> bytes:
+    if value is None:
+        return _NULL
+    data = str(value).encode("utf-8")
+    return struct.pack(">i", len(data)) + data
+
+
+def _encode_int4(value: Any) -> bytes:
+    if value is None:
+        return _NULL
+    return struct.pack(">ii", 4, int(value))
+
+
+def _encode_vector(value: Any, dim: int) -> bytes:
+    vec = np.asarray(value, dtype=">f4").reshape(-1)
+    if vec.shape[0] != dim:
+        raise ValueError(f"embedding has {vec.shape[0]} dimensions, expected {dim}")
+    return struct.pack(">ihh", 4 + 4 * dim, dim, 0) + vec.tobytes()
+
+
+# Encoders per rag_chunks column; any other column is sent as text
+_ENCODERS: Dict[str, Callable[[Any, int], bytes]] = {
+    "page_number": lambda v, dim: _encode_int4(v),
+    "embedding": _encode_vector,
+}
+
+
+def encode_rows(rows: Iterable[Dict[str, Any]], columns: Sequence[str] = CHUNK_COLUMNS,
+                dim: int = VECTOR_DIM) -> Iterator[bytes]:
+    """Yield the binary COPY stream (header, one record per row, trailer)."""
+    encoders = [_ENCODERS.get(col, lambda v, dim: _encode_text(v)) for col in columns]
+    field_count = struct.pack(">h", len(columns))
+    yield _COPY_HEADER
+    for row in rows:
+        yield field_count + b"".join(enc(row.get(col), dim) for col, enc in zip(columns, encoders))
+    yield _COPY_TRAILER
+
+
+class _CopyStream(io.RawIOBase):
+    """File-like reader over an iterator of byte strings, for cursor.copy_expert."""
+
+    def __init__(self, parts: Iterator[bytes], on_part: Optional[Callable[[], None]] = None):
+        self._parts = parts
+        # bytearray: appending parts and consuming from the front stay linear
+        self._buffer = bytearray()
+        self._on_part = on_part
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._parts)
+            except StopIteration:
+                break
+            if self._on_part:
+                self._on_part()
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def copy_chunks(
+    conn,
+    rows: Iterable[Dict[str, Any]],
+    table: str = "rag_chunks",
+    columns: Sequence[str] = CHUNK_COLUMNS,
+    dim: int = VECTOR_DIM,
+    progress: Optional[ProgressFn] = None,
+    progress_every: int = 10000,
+) -> Dict[str, float]:
+    """
+    Stream `rows` (dicts keyed by column name, `embedding` as a list or NumPy
+    array) into `table` with one binary COPY. The caller commits.
+    Returns {"rows", "seconds", "rows_per_sec"}.
+    """
+    count = 0
+
+    def on_part():
+        nonlocal count
+        count += 1
+        if progress and count % progress_every == 0:
+            progress(count - 1)  # the header is the first part
+
+    started = time.perf_counter()
+    stream = _CopyStream(encode_rows(rows, columns, dim), on_part)
+    with conn.cursor() as cur:
+        cur.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT binary)",
+            stream,
+            size=1 << 20,
+        )
+    seconds = time.perf_counter() - started
+    loaded = max(0, count - 2)  # header and trailer
+    stats = {
+        "rows": loaded,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(loaded / seconds, 1) if seconds > 0 else float(loaded),
+    }
+    print(f"[INFO] COPY {table}: {loaded} rows in {stats['seconds']}s ({stats['rows_per_sec']} rows/s)")
+    return stats
+
+
+def content_hash(text: str) -> str:
+    # matches md5(text) in Postgres (models/pg_schema.py backfills existing rows with it)
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def _chunk_key(source: Any, node_id: Any, pin: Any, digest: str) -> Tuple[str, str, str, str]:
+    return (source, "" if node_id is None else str(node_id), pin or "", digest)
+
+
+def sync_doc_chunks(
+    conn,
+    doc_id: str,
+    chunks: Iterable[Dict[str, Any]],
+    embed: Callable[[str], Any],
+    dim: int = VECTOR_DIM,
+    reembed: bool = False,
+) -> Dict[str, Any]:
+    """
+    Make rag_chunks hold exactly `chunks` for `doc_id`:
+      - unchanged chunks (same key and content hash) are left alone, not re-embedded
+      - new or changed chunks are embedded (unless they carry "embedding") and
+        upserted via a binary COPY into a staging table
+      - stored chunks that are no longer present are deleted
+    Runs in the connection's current transaction; the caller commits.
+    """
+    wanted: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+    for c in chunks:
+        text = c.get("text")
+        if not text:
+            continue
+        digest = content_hash(text)
+        source = c.get("source", "Unknown")
+        wanted.setdefault(_chunk_key(source, c.get("node_id"), c.get("pin"), digest), {
+            "doc_id": doc_id,
+            "pin": c.get("pin"),
+            "source": source,
+            "page_number": c.get("page_number"),
+            "node_id": c.get("node_id"),
+            "text": text,
+            "content_hash": digest,
+            "embedding": c.get("embedding"),
+        })
+
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT id, source, node_id, pin, content_hash FROM rag_chunks WHERE doc_id = %s",
+            (doc_id,),
+        )
+        existing = {_chunk_key(r[1], r[2], r[3], r[4]): r[0] for r in cur.fetchall()}
+
+    stale: List[int] = [row_id for key, row_id in existing.items() if key not in wanted]
+    fresh = [row for key, row in wanted.items() if reembed or key not in existing]
+
+    for row in fresh:
+        if row["embedding"] is None or reembed:
+            row["embedding"] = embed(row["text"])
+
+    stats: Dict[str, Any] = {
+        "unchanged": len(wanted) - len(fresh),
+        "upserted": len(fresh),
+        "deleted": len(stale),
+    }
+    with conn.cursor() as cur:
+        if stale:
+            cur.execute("DELETE FROM rag_chunks WHERE id = ANY(%s)", (stale,))
+        if fresh:
+            cur.execute(
+                f"""
+                CREATE TEMP TABLE rag_chunks_stage (
+                    doc_id TEXT, pin TEXT, source TEXT, page_number INT,
+                    node_id TEXT, text TEXT, embedding vector({dim}), content_hash TEXT
+                ) ON COMMIT DROP;
+                """
+            )
+            stats["copy"] = copy_chunks(conn, fresh, table="rag_chunks_stage", columns=HASHED_COLUMNS, dim=dim)
+            cur.execute(
+                f"""
+                INSERT INTO rag_chunks ({", ".join(HASHED_COLUMNS)})
+                SELECT {", ".join(HASHED_COLUMNS)} FROM rag_chunks_stage
+                ON CONFLICT (doc_id, source, (coalesce(node_id, '')), (coalesce(pin, '')), content_hash)
+                DO UPDATE SET page_number = EXCLUDED.page_number,
+                              embedding = EXCLUDED.embedding;
+                """
+            )
+            cur.execute("DROP TABLE rag_chunks_stage;")
+    print(f"[INFO] rag_chunks sync {doc_id}: {stats['unchanged']} unchanged, "
+          f"{stats['upserted']} upserted, {stats['deleted']} deleted")
+    return stats
+
+
+def _jsonl_rows(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _no_embedding(text: str) -> Any:
+    raise ValueError(f"chunk without an embedding in --jsonl input: {text[:60]!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jsonl", required=True, help="One chunk per line, embedding included")
+    args = parser.parse_args()
+
+    totals = {"documents": 0, "unchanged": 0, "upserted": 0, "deleted": 0}
+    done = set()
+    with pg_connection() as conn:
+        ensure_pg_schema(conn)
+        for doc_id, rows in itertools.groupby(_jsonl_rows(args.jsonl), key=lambda r: r["doc_id"]):
+            if doc_id in done:
+                # a second sync would delete the chunks loaded by the first
+                raise ValueError(f"{args.jsonl}: lines for {doc_id!r} are not contiguous; sort by doc_id")
+            done.add(doc_id)
+            stats = sync_doc_chunks(conn, doc_id, rows, _no_embedding)
+            conn.commit()
+            totals["documents"] += 1
+            for k in ("unchanged", "upserted", "deleted"):
+                totals[k] += stats[k]
+    build_vector_index()
+    print(f"[OK] Synced {totals['documents']} documents: {totals['upserted']} upserted, "
+          f"{totals['unchanged']} unchanged, {totals['deleted']} deleted")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,11 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from llm.embeddings import embed_text
+from pipeline.pgvector_bulk import sync_doc_chunks
+from models.pg_client import get_pg_conn, put_pg_conn
+from models.pg_schema import ensure_pg_schema, build_vector_index
+from models.vector_quality import apply_quality
+from models.vector_search import search_rows
 
 def get_embedding(text: str) -> List[float]:
     """
@@ -41,50 +46,33 @@ class PgVectorStore:
         """
         if dsn is None:
             dsn = f"host={host} port={port} dbname={dbname} user={user} password={password}"
-        self.conn = psycopg2.connect(dsn)
+        # borrowed from the per-DSN pool; close() hands it back
+        self.dsn = dsn
+        self.conn = get_pg_conn(dsn)
         self.conn.autocommit = True
 
     def close(self) -> None:
-        self.conn.close()
+        if self.conn is not None:
+            put_pg_conn(self.conn, self.dsn)
+            self.conn = None
 
     def create_schema(self) -> None:
         """
-        Create the rag_chunks table and index if they don't exist.
+        Apply the rag_chunks migrations (once per process). The ANN index is
+        built by build_vector_index() after data has been loaded.
         """
-        with self.conn.cursor() as cur:
-            cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS rag_chunks (
-                    id          BIGSERIAL PRIMARY KEY,
-                    doc_id      TEXT NOT NULL,
-                    pin         TEXT,
-                    source      TEXT NOT NULL,
-                    page_number INT,
-                    node_id     TEXT,
-                    text        TEXT NOT NULL,
-                    embedding   vector(1024) NOT NULL
-                );
-                """
-            )
-            cur.execute(
-                """
-                CREATE INDEX IF NOT EXISTS rag_chunks_embedding_cosine_idx
-                ON rag_chunks
-                USING ivfflat (embedding vector_cosine_ops)
-                WITH (lists = 100);
-                """
-            )
-            cur.execute("ANALYZE rag_chunks;")
+        ensure_pg_schema(self.conn)
 
     def upsert_chunks(
         self,
         doc_id: str,
         chunks: List[Dict[str, Any]],
         recompute_embeddings: bool = False,
-    ) -> None:
+    ) -> Dict[str, Any]:
         """
-        Insert chunks into rag_chunks.
+        Sync chunks for doc_id into rag_chunks (see pgvector_bulk.sync_doc_chunks).
+        Chunks already stored with the same content hash are not re-embedded,
+        and stored chunks missing from `chunks` are deleted.
 
         Each chunk dict should contain:
           - "pin"        (optional)
@@ -92,40 +80,22 @@ class PgVectorStore:
           - "page_number" (optional)
           - "node_id"    (optional: Neo4j node ID or composite key)
           - "text"       (the text to embed)
+          - "embedding"  (optional: precomputed vector, list or NumPy array)
         """
-        with self.conn.cursor() as cur:
-            for c in chunks:
-                text = c["text"]
-                if not text:
-                    continue
-
-                # You might have a more sophisticated "idempotency" strategy
-                # (e.g., a hash of doc_id + node_id + text) to avoid duplicates.
-                # For simplicity, we always insert here.
-
-                # Get vector embedding
-                emb = c.get("embedding")
-                if emb is None or recompute_embeddings:
-                    emb = get_embedding(text)
-
-                # Convert Python list[float] to pgvector literal: '[1,2,3,...]'
-                emb_literal = "[" + ",".join(str(x) for x in emb) + "]"
-
-                cur.execute(
-                    """
-                    INSERT INTO rag_chunks (doc_id, pin, source, page_number, node_id, text, embedding)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s::vector)
-                    """,
-                    (
-                        doc_id,
-                        c.get("pin"),
-                        c.get("source", "Unknown"),
-                        c.get("page_number"),
-                        c.get("node_id"),
-                        text,
-                        emb_literal,
-                    ),
-                )
+        # one transaction, so readers never see a half-synced document
+        self.conn.autocommit = False
+        try:
+            stats = sync_doc_chunks(
+                self.conn, doc_id, chunks, embed_text, dim=1024, reembed=recompute_embeddings,
+            )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self.conn.autocommit = True
+        stats["index"] = build_vector_index(self.conn)
+        return stats
 
     def search(
         self,
@@ -133,61 +103,43 @@ class PgVectorStore:
         doc_id: Optional[str] = None,
         pin: Optional[str] = None,
         top_k: int = 10,
+        quality: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """
         Search for top_k most similar chunks to the query using cosine distance.
-        Optionally filter by doc_id and/or pin.
+        Optionally filter by doc_id and/or pin. `quality` (fast | balanced |
+        accurate | exact) sets ivfflat.probes / hnsw.ef_search for this query.
         """
         q_emb = get_embedding(query)
         q_emb_literal = "[" + ",".join(str(x) for x in q_emb) + "]"
 
-        where_clauses = []
-        params: List[Any] = [q_emb_literal]
-
-        if doc_id is not None:
-            where_clauses.append("doc_id = %s")
-            params.append(doc_id)
-        if pin is not None:
-            where_clauses.append("pin = %s")
-            params.append(pin)
-
-        where_sql = ""
-        if where_clauses:
-            where_sql = "WHERE " + " AND ".join(where_clauses)
-
-        sql = f"""
-            SELECT
-                id,
-                doc_id,
-                pin,
-                source,
-                page_number,
-                node_id,
-                text,
-                embedding <=> %s::vector AS distance
-            FROM rag_chunks
-            {where_sql}
-            ORDER BY embedding <=> %s::vector
-            LIMIT {top_k};
-        """
-
-        # Notice we pass q_emb_literal twice: once for SELECT and once for ORDER BY
-        params.append(q_emb_literal)
-
         rows: List[Dict[str, Any]] = []
-        with self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-            cur.execute(sql, params)
-            for r in cur.fetchall():
-                rows.append(
-                    {
-                        "id": r["id"],
-                        "doc_id": r["doc_id"],
-                        "pin": r["pin"],
-                        "source": r["source"],
-                        "page_number": r["page_number"],
-                        "node_id": r["node_id"],
-                        "text": r["text"],
-                        "distance": float(r["distance"]),
-                    }
+        # SET LOCAL needs a transaction around the query
+        self.conn.autocommit = False
+        try:
+            with self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                apply_quality(cur, quality)
+                # doc_id/pin filters: exact over the filtered rows when few, ANN otherwise
+                found, _ = search_rows(
+                    cur, q_emb_literal, top_k, doc_ids=[doc_id] if doc_id is not None else None, pin=pin,
                 )
+                for r in found:
+                    rows.append(
+                        {
+                            "id": r["id"],
+                            "doc_id": r["doc_id"],
+                            "pin": r["pin"],
+                            "source": r["source"],
+                            "page_number": r["page_number"],
+                            "node_id": r["node_id"],
+                            "text": r["text"],
+                            "distance": float(r["distance"]),
+                        }
+                    )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self.conn.autocommit = True
         return rows
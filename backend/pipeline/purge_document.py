@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+purge_document.py
+
+Remove one document from the knowledge base without touching the rest:
+  - Neo4j: every node that belongs to the doc_id (QA triples, SpecItems,
+    Constraints, Pins, ICs, TextBlocks, Figures, Tables, Pages, Document),
+    deleted in bounded batches with CALL { ... } IN TRANSACTIONS
+  - Postgres: the document's rag_chunks rows, deleted in batches
+  - Disk: the extracted image/table assets under static/ and uploads/
+    (the uploaded PDF itself is kept so the document can be re-ingested)
+
+Usage:
+    python purge_document.py --doc_id 7m
+    python purge_document.py --doc_id 7m --keep_assets --batch_size 500
+"""
+
+import argparse
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import psycopg2
+
+# Add parent directory to sys.path to allow importing 'models'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import STATIC_DIR, UPLOAD_DIR, NEO4J_PURGE_BATCH_SIZE
+from models.neo4j_client import get_driver
+from models.pg_client import pg_connection, rag_chunks_ready
+
+# progress(stage, deleted_so_far)
+ProgressFn = Callable[[str, int], None]
+
+# (stage, MATCH that binds `n`). Children first, so every stage is reachable
+# from an indexed doc_id lookup and nothing is left dangling if a run stops midway.
+_NEO4J_STAGES: List[Tuple[str, str]] = [
+    ("qa_triples",
+     "MATCH (:Page {doc_id: $doc_id})-[:HAS_FIGURE|HAS_TABLE]->(parent)-[:HAS_QA]->(n:QA_Triple) "
+     "WHERE NOT EXISTS { MATCH (other:Page)-->(parent) WHERE other.doc_id <> $doc_id }"),
+    ("spec_items", "MATCH (n:SpecItem {doc_id: $doc_id})"),
+    ("constraints", "MATCH (n:Constraint {doc_id: $doc_id})"),
+    ("pins", "MATCH (n:Pin {doc_id: $doc_id})"),
+    ("ics", "MATCH (n:IC {doc_id: $doc_id})"),
+    # content nodes without a doc_id can be shared with another document's pages
+    # (ids ingested before they were doc-scoped); those stay until their last page goes
+    ("page_content",
+     "MATCH (:Page {doc_id: $doc_id})-[:HAS_TEXT_BLOCK|HAS_FIGURE|HAS_TABLE]->(n) "
+     "WHERE NOT EXISTS { MATCH (other:Page)-->(n) WHERE other.doc_id <> $doc_id }"),
+    ("figures", "MATCH (n:Figure {doc_id: $doc_id})"),
+    ("tables", "MATCH (n:Table {doc_id: $doc_id})"),
+    ("pages", "MATCH (n:Page {doc_id: $doc_id})"),
+    ("document", "MATCH (n:Document {doc_id: $doc_id})"),
+]
+
+_BATCHED_DELETE = """
+{match}
+WITH DISTINCT n
+CALL {{
+    WITH n
+    DETACH DELETE n
+}} IN TRANSACTIONS OF $batch_size ROWS
+RETURN count(*) AS deleted
+"""
+
+
+def _report(progress: Optional[ProgressFn], stage: str, deleted: int):
+    print(f"[INFO] purge {stage}: {deleted} deleted")
+    if progress:
+        progress(stage, deleted)
+
+
+def _asset_dirs(doc_id: str, assets_dir: Optional[str]) -> List[Path]:
+    candidates = [STATIC_DIR / doc_id, UPLOAD_DIR / doc_id]
+    if assets_dir:
+        candidates.append(Path(assets_dir))
+
+    dirs = []
+    for path in candidates:
+        path = path.resolve()
+        # only ever remove directories inside our own storage roots
+        inside = any(root.resolve() in path.parents for root in (STATIC_DIR, UPLOAD_DIR))
+        if inside and path.is_dir() and path not in dirs:
+            dirs.append(path)
+    return dirs
+
+
+def purge_graph(doc_id: str, batch_size: int = NEO4J_PURGE_BATCH_SIZE,
+                progress: Optional[ProgressFn] = None) -> Dict[str, int]:
+    """Delete the document's Neo4j nodes stage by stage in bounded transactions."""
+    counts = {}
+    # CALL { ... } IN TRANSACTIONS needs an implicit (auto-commit) transaction
+    with get_driver().session() as session:
+        for stage, match in _NEO4J_STAGES:
+            record = session.run(
+                _BATCHED_DELETE.format(match=match),
+                doc_id=doc_id,
+                batch_size=batch_size,
+            ).single()
+            counts[stage] = record["deleted"] if record else 0
+            _report(progress, stage, counts[stage])
+    return counts
+
+
+def purge_chunks(doc_id: str, batch_size: int = NEO4J_PURGE_BATCH_SIZE,
+                 progress: Optional[ProgressFn] = None) -> int:
+    """Delete the document's rag_chunks rows, committing every `batch_size` rows."""
+    deleted = 0
+    with pg_connection() as conn:
+        with conn.cursor() as cur:
+            if not rag_chunks_ready(cur):
+                return 0
+            while True:
+                cur.execute(
+                    """
+                    DELETE FROM rag_chunks
+                    WHERE ctid IN (
+                        SELECT ctid FROM rag_chunks WHERE doc_id = %s LIMIT %s
+                    )
+                    """,
+                    (doc_id, batch_size),
+                )
+                conn.commit()
+                if cur.rowcount <= 0:
+                    break
+                deleted += cur.rowcount
+                _report(progress, "rag_chunks", deleted)
+    return deleted
+
+
+def purge_document(doc_id: str, batch_size: int = NEO4J_PURGE_BATCH_SIZE,
+                   remove_assets: bool = True,
+                   progress: Optional[ProgressFn] = None) -> Dict[str, int]:
+    """
+    Remove one document from Neo4j, pgvector and disk. Returns per-stage
+    deletion counts; `progress` is called as each stage advances.
+    """
+    with get_driver().session() as session:
+        record = session.run(
+            "MATCH (d:Document {doc_id: $doc_id}) RETURN d.assets_dir AS assets_dir",
+            doc_id=doc_id,
+        ).single()
+    assets_dir = record["assets_dir"] if record else None
+
+    counts = purge_graph(doc_id, batch_size=batch_size, progress=progress)
+
+    try:
+        counts["rag_chunks"] = purge_chunks(doc_id, batch_size=batch_size, progress=progress)
+    except psycopg2.Error as e:
+        print(f"[WARN] Could not purge rag_chunks for {doc_id}: {e}")
+        counts["rag_chunks"] = 0
+
+    counts["asset_dirs"] = 0
+    if remove_assets:
+        for path in _asset_dirs(doc_id, assets_dir):
+            shutil.rmtree(path, ignore_errors=True)
+            counts["asset_dirs"] += 1
+        _report(progress, "asset_dirs", counts["asset_dirs"])
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--doc_id", required=True)
+    parser.add_argument("--batch_size", type=int, default=NEO4J_PURGE_BATCH_SIZE)
+    parser.add_argument("--keep_assets", action="store_true", help="Leave extracted images/tables on disk")
+    args = parser.parse_args()
+
+    counts = purge_document(args.doc_id, batch_size=args.batch_size, remove_assets=not args.keep_assets)
+    print(f"[OK] Purged {args.doc_id}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
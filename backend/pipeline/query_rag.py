@@ -1,12 +1,43 @@
 
-from typing import Dict, Any, List
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import DictCursor
 from pathlib import Path
-from config import PG_HOST, PG_PORT, PG_DB, PG_USER, PG_PASS, STATIC_DIR, UPLOAD_DIR
-from models.neo4j_client import search_context_for_question
+from config import (
+    STATIC_DIR, UPLOAD_DIR, GRAPH_CONTEXT_PAGE_LIMIT,
+    RAG_EMBED_TIMEOUT, RAG_GRAPH_TIMEOUT, RAG_VECTOR_TIMEOUT, VECTOR_SEARCH_QUALITY,
+    RAG_VECTOR_DOC_FILTER,
+)
+from models.neo4j_client import (
+    search_context_for_question,
+    fulltext_candidate_pages,
+    search_context_for_question_async,
+    fulltext_candidate_pages_async,
+    expand_graph_neighbourhood,
+    expand_graph_neighbourhood_async,
+)
+from models.pg_client import (
+    get_pg_pool,
+    dict_row,
+    pg_connection,
+    rag_chunks_ready,
+    rag_chunks_ready_async,
+    mark_rag_chunks_ready,
+)
+from models import graph_snapshot
+from models.vector_quality import apply_quality, apply_quality_async
+from models.vector_search import search_rows, search_rows_async
 from llm.prompt_generator import build_prompt
-from llm.answer_llm import answer_llm
+from llm.answer_llm import answer_llm, answer_llm_async
+from llm.embeddings import embed_text_async
+from llm.context_packer import pack_context_chunks
+
+# Retrieval branches of the blocking rag_answer (embedding, graph, vector)
+_RETRIEVAL_POOL = ThreadPoolExecutor(max_workers=12, thread_name_prefix="rag-retrieval")
 
 def _resolve_image_path(doc_id: str, image_path: str) -> str:
     """
@@ -64,120 +95,133 @@ def _resolve_image_path(doc_id: str, image_path: str) -> str:
     # This will at least show what was expected
     return image_path.replace("backend\\uploads\\", "").replace("backend/uploads/", "").replace("\\", "/")
 
-def _pg_conn():
-    return psycopg2.connect(
-        host=PG_HOST,
-        port=PG_PORT,
-        dbname=PG_DB,
-        user=PG_USER,
-        password=PG_PASS,
+def _vector_row_to_chunk(r) -> Dict[str, Any]:
+    return dict(
+        doc_id=r["doc_id"],
+        pin=r["pin"],
+        source=r["source"],
+        page=r["page_number"],
+        node_id=r["node_id"],
+        text=r["text"],
+        distance=float(r["distance"]),
+        image_path=None,
     )
 
-def _search_pgvector(question: str, top_k: int = 10) -> List[Dict[str, Any]]:
+def _search_pgvector(
+    question: str,
+    top_k: int = 10,
+    embedding: Optional[Callable[[], Any]] = None,
+    quality: Optional[str] = None,
+    doc_ids: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
     """
     Fallback: if pgvector not yet populated, returns empty list.
+    `embedding`, if given, returns the question embedding (e.g. from a call
+    already in flight). The pooled connection is borrowed only once the
+    embedding is ready, so a slow model call doesn't hold it.
+    `quality` (see models.vector_quality) sets probes / ef_search for this query;
+    `doc_ids` restricts the search to those documents (models.vector_search).
     """
-    conn = _pg_conn()
-    cur = conn.cursor(cursor_factory=DictCursor)
     try:
-        cur.execute(
-            """
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables
-                WHERE table_name = 'rag_chunks'
-            );
-            """
-        )
-        exists = cur.fetchone()[0]
-        if not exists:
-            conn.close()
+        if embedding is not None:
+            q_emb = embedding()
+        else:
+            from llm.embeddings import embed_text
+            q_emb = embed_text(question)
+        if q_emb is None:
             return []
-
-        from llm.embeddings import embed_text
-        q_emb = embed_text(question)
         emb_literal = "[" + ",".join(str(x) for x in q_emb) + "]"
 
-        cur.execute(
-            """
-            SELECT
-                doc_id, pin, source, page_number, node_id, text, embedding <=> %s::vector AS distance
-            FROM rag_chunks
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s;
-            """,
-            (emb_literal, emb_literal, top_k),
-        )
-        rows = cur.fetchall()
-        conn.close()
-        return [
-            dict(
-                doc_id=r["doc_id"],
-                pin=r["pin"],
-                source=r["source"],
-                page=r["page_number"],
-                node_id=r["node_id"],
-                text=r["text"],
-                distance=float(r["distance"]),
-                image_path=None,
-            )
-            for r in rows
-        ]
+        with pg_connection() as conn:
+            with conn.cursor(cursor_factory=DictCursor) as cur:
+                if not rag_chunks_ready(cur):
+                    return []
+                apply_quality(cur, quality)
+                rows, plan = search_rows(cur, emb_literal, top_k, doc_ids=doc_ids)
+            conn.rollback()
+        print(f"DEBUG: pgvector {plan} search, doc filter {doc_ids}: {len(rows)} rows")
+        return [_vector_row_to_chunk(r) for r in rows]
+    except psycopg2.errors.UndefinedTable:
+        # dropped since the readiness check was cached (drop_table.py)
+        mark_rag_chunks_ready(False)
+        return []
     except Exception:
-        conn.close()
         return []
 
-def rag_answer(question: str) -> Dict[str, Any]:
+async def _search_pgvector_async(
+    question: str,
+    top_k: int = 10,
+    embedding: Optional["asyncio.Future"] = None,
+    quality: Optional[str] = None,
+    doc_ids: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
     """
-    End-to-end:
-      1) Get base context from Neo4j
-      2) Optionally refine/rerank with pgvector (if available)
-      3) Build prompt with meta-prompt
-      4) Call answer LLM
-      5) Return text + figures + tables
+    Async _search_pgvector on the pooled psycopg 3 connection; the connection
+    goes back to the pool while the question is being embedded. `embedding`
+    is an already-running embedding task to wait on instead of embedding here.
     """
-    # Smart Context Filtering
-    # Simple Entity Extraction for Proof-of-Concept
-    doc_filter = None
-    q_lower = question.lower()
-    
-    # Map keywords to doc_ids (in production this would be a lookup or LLM call)
-    if "7m" in q_lower:
-        doc_filter = ["7m"]
-    elif "isl81401" in q_lower:
-        doc_filter = ["7m"] # Assuming ISL81401 is covered by 7m doc
-        
-    print(f"DEBUG: Smart Context Filter: {doc_filter}")
-
-    base_context = search_context_for_question(question, doc_ids=doc_filter)
-    
-    # Note: _search_pgvector doesn't support metadata filtering yet in this impl, 
-    # but base_context (Graph) is usually the source of structured tables/figures.
-    vector_context = _search_pgvector(question, top_k=15)
-    
+    pool = await get_pg_pool()
+    if pool is None:
+        return []
+    try:
+        async with pool.connection() as conn:
+            exists = await rag_chunks_ready_async(conn)
+        if not exists:
+            return []
+
+        if embedding is not None:
+            # shield: timing out this branch must not cancel the shared embedding task
+            q_emb = await asyncio.shield(embedding)
+        else:
+            q_emb = await embed_text_async(question)
+        if q_emb is None:
+            return []
+        emb_literal = "[" + ",".join(str(x) for x in q_emb) + "]"
+
+        async with pool.connection() as conn:
+            await apply_quality_async(conn, quality)
+            async with conn.cursor(row_factory=dict_row) as cur:
+                rows, plan = await search_rows_async(cur, emb_literal, top_k, doc_ids=doc_ids)
+        print(f"DEBUG: pgvector {plan} search, doc filter {doc_ids}: {len(rows)} rows")
+        return [_vector_row_to_chunk(r) for r in rows]
+    except Exception as e:
+        if getattr(e, "sqlstate", None) == "42P01":  # undefined_table
+            mark_rag_chunks_ready(False)
+        print(f"[WARN] pgvector search failed: {e}")
+        return []
+
+def _merge_context(
+    question: str,
+    base_context: List[Dict[str, Any]],
+    vector_context: List[Dict[str, Any]],
+    expanded_context: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
     # merge (simple: union, prioritising vector hits if present)
     context_map = {}
-    for c in base_context + vector_context:
+    for c in base_context + vector_context + (expanded_context or []):
         key = (c["doc_id"], c["source"], c["node_id"])
         if key not in context_map:
             context_map[key] = c
     context_chunks = list(context_map.values())
 
+    # rank, dedupe (FullPage vs its TextBlock, repeated vector hits) and fit the token budget
+    return pack_context_chunks(question, context_chunks)
+
+def _answer_prompt(question: str, context_chunks: List[Dict[str, Any]]) -> str:
     # no explicit constraints yet; you can later populate from ontology layer
     constraints: List[Dict[str, Any]] = []
     ontology_hints: Dict[str, Any] = {"intent": "generic_rag"}
 
-    top_k = 15 # Updated
-    
     # 3. Build Prompt
     print(f"DEBUG: Using Deterministic CoT Prompting. Context chunks: {len(context_chunks)}")
-    qs = build_prompt(
+    return build_prompt(
         user_question=question,
         context_chunks=context_chunks,
         constraints=constraints,
         ontology_hints=ontology_hints
     )
-    answer_text = answer_llm(qs) # Changed from answer_prompt to qs
 
+def _answer_response(answer_text: str, context_chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
     figures = []
     for c in context_chunks:
         if c.get("image_path") and c.get("source") == "Figure":
@@ -213,3 +257,224 @@ def rag_answer(question: str) -> Dict[str, Any]:
         "documents": docs,
         "contexts": [c.get("text", "") for c in context_chunks] # Added for Ragas evaluation
     }
+
+def _doc_filter(candidate_pages: Optional[List[Dict[str, Any]]]) -> Optional[List[str]]:
+    return sorted({p["doc_id"] for p in candidate_pages or []}) or None
+
+def _graph_context(
+    question: str,
+    candidate_pages: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    # Smart Context Filtering
+    # BM25 full-text hits pick a bounded set of candidate pages (and hence documents)
+    base_context = []
+    if candidate_pages:
+        base_context = search_context_for_question(question, pages=candidate_pages)
+    return candidate_pages, base_context
+
+async def _graph_context_async(
+    question: str,
+    candidate_pages: "asyncio.Future",
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    # shield: timing out this branch must not cancel the shared full-text task
+    pages = await asyncio.shield(candidate_pages) or []
+    base_context = []
+    if pages:
+        base_context = await search_context_for_question_async(question, pages=pages)
+    return pages, base_context
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+def _finish(
+    question: str,
+    graph: Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]],
+    vector_context: Optional[List[Dict[str, Any]]],
+    expanded_context: Optional[List[Dict[str, Any]]],
+    timings: Dict[str, float],
+    errors: Dict[str, str],
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    candidate_pages, base_context = graph or ([], [])
+    doc_filter = _doc_filter(candidate_pages)
+    print(f"DEBUG: Smart Context Filter: {doc_filter} ({len(candidate_pages)} candidate pages)")
+
+    started = time.perf_counter()
+    context_chunks = _merge_context(question, base_context, vector_context or [], expanded_context)
+    timings["pack"] = _ms(started)
+
+    debug = {
+        "timings_ms": timings,
+        "errors": errors,
+        "candidate_pages": len(candidate_pages),
+        "graph_chunks": len(base_context),
+        "vector_chunks": len(vector_context or []),
+        "expanded_chunks": len(expanded_context or []),
+        "context_chunks": len(context_chunks),
+    }
+    return context_chunks, debug
+
+def rag_answer(
+    question: str,
+    quality: Optional[str] = VECTOR_SEARCH_QUALITY,
+    doc_ids: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    End-to-end:
+      1) Get base context from Neo4j
+      2) Optionally refine/rerank with pgvector (if available)
+      2b) Expand the best vector hits through their graph neighbourhood
+      3) Build prompt with meta-prompt
+      4) Call answer LLM
+      5) Return text + figures + tables (+ debug stage timings)
+
+    The question embedding, graph retrieval and vector search run
+    concurrently, each bounded by its own RAG_*_TIMEOUT; the neighbourhood
+    expansion follows the vector search under RAG_GRAPH_TIMEOUT.
+    `quality` trades vector recall for latency (fast | balanced | accurate | exact).
+    The vector search is limited to `doc_ids`, or else (RAG_VECTOR_DOC_FILTER)
+    to the documents of the full-text candidate pages.
+    """
+    total = time.perf_counter()
+    timings: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+
+    def _timed(name: str, fn: Callable[[], Any]) -> Callable[[], Any]:
+        def run():
+            started = time.perf_counter()
+            try:
+                return fn()
+            finally:
+                timings[name] = _ms(started)
+        return run
+
+    def _result(name: str, future, timeout: float) -> Any:
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            errors[name] = f"timeout after {timeout:.1f}s"
+        except Exception as e:
+            errors[name] = str(e)
+        return None
+
+    from llm.embeddings import embed_text
+    embed_future = _RETRIEVAL_POOL.submit(_timed("embedding", lambda: embed_text(question)))
+    pages_future = _RETRIEVAL_POOL.submit(_timed("fulltext", lambda: fulltext_candidate_pages(
+        question, limit=GRAPH_CONTEXT_PAGE_LIMIT,
+    )))
+
+    def candidate_pages() -> List[Dict[str, Any]]:
+        return _result("fulltext", pages_future, RAG_GRAPH_TIMEOUT) or []
+
+    def vector_doc_filter() -> Optional[List[str]]:
+        if doc_ids:
+            return doc_ids
+        return _doc_filter(candidate_pages()) if RAG_VECTOR_DOC_FILTER else None
+
+    graph_future = _RETRIEVAL_POOL.submit(_timed("graph", lambda: _graph_context(question, candidate_pages())))
+    # The full-text lookup is fast next to the embedding call, so waiting on it
+    # for the vector branch's doc filter costs (almost) nothing
+    vector_future = _RETRIEVAL_POOL.submit(_timed("vector", lambda: _search_pgvector(
+        question, top_k=15, embedding=lambda: _result("embedding", embed_future, RAG_EMBED_TIMEOUT),
+        quality=quality, doc_ids=vector_doc_filter(),
+    )))
+
+    # The vector branch already waits on the embedding (within its own timeout)
+    started = time.perf_counter()
+    graph = _result("graph", graph_future, RAG_GRAPH_TIMEOUT)
+    vector_context = _result("vector", vector_future, max(0.0, RAG_VECTOR_TIMEOUT - (time.perf_counter() - started)))
+    timings["retrieval"] = _ms(started)
+
+    # the in-process snapshot answers without a Neo4j round trip when it holds the documents
+    started = time.perf_counter()
+    expanded_context = graph_snapshot.expand_graph_neighbourhood(vector_context or [])
+    timings["expand"] = _ms(started)
+    graph_snapshot.maybe_refresh_snapshot()
+    if expanded_context is None:
+        expand_future = _RETRIEVAL_POOL.submit(_timed("expand", lambda: expand_graph_neighbourhood(vector_context)))
+        expanded_context = _result("expand", expand_future, RAG_GRAPH_TIMEOUT)
+
+    context_chunks, debug = _finish(question, graph, vector_context, expanded_context, timings, errors)
+    debug["quality"] = quality
+    debug["doc_ids"] = doc_ids
+
+    started = time.perf_counter()
+    answer_text = answer_llm(_answer_prompt(question, context_chunks))
+    timings["answer"] = _ms(started)
+    timings["total"] = _ms(total)
+
+    response = _answer_response(answer_text, context_chunks)
+    response["debug"] = debug
+    return response
+
+async def rag_answer_async(
+    question: str,
+    quality: Optional[str] = VECTOR_SEARCH_QUALITY,
+    doc_ids: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    rag_answer for the FastAPI request path: Neo4j, Postgres and the model
+    endpoints are all awaited, so one slow question does not hold up the
+    other requests on the worker. Embedding, graph retrieval and vector
+    search run as concurrent tasks, each with its own timeout; the vector
+    search waits on the full-text lookup only for its document filter.
+    """
+    total = time.perf_counter()
+    timings: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+
+    async def _timed(name: str, coro: Awaitable[Any], timeout: float) -> Any:
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            errors[name] = f"timeout after {timeout:.1f}s"
+        except Exception as e:
+            errors[name] = str(e)
+        finally:
+            timings[name] = _ms(started)
+        return None
+
+    started = time.perf_counter()
+    embed_task = asyncio.ensure_future(_timed("embedding", embed_text_async(question), RAG_EMBED_TIMEOUT))
+    pages_task = asyncio.ensure_future(_timed(
+        "fulltext", fulltext_candidate_pages_async(question, limit=GRAPH_CONTEXT_PAGE_LIMIT), RAG_GRAPH_TIMEOUT,
+    ))
+
+    async def vector_search() -> List[Dict[str, Any]]:
+        doc_filter = doc_ids
+        if not doc_filter and RAG_VECTOR_DOC_FILTER:
+            doc_filter = _doc_filter(await asyncio.shield(pages_task))
+        return await _search_pgvector_async(
+            question, top_k=15, embedding=embed_task, quality=quality, doc_ids=doc_filter,
+        )
+
+    graph, vector_context, _, _ = await asyncio.gather(
+        _timed("graph", _graph_context_async(question, pages_task), RAG_GRAPH_TIMEOUT),
+        _timed("vector", vector_search(), RAG_VECTOR_TIMEOUT),
+        embed_task,
+        pages_task,
+    )
+    timings["retrieval"] = _ms(started)
+
+    # the in-process snapshot answers without a Neo4j round trip when it holds the documents
+    started = time.perf_counter()
+    expanded_context = graph_snapshot.expand_graph_neighbourhood(vector_context or [])
+    timings["expand"] = _ms(started)
+    graph_snapshot.maybe_refresh_snapshot()
+    if expanded_context is None:
+        expanded_context = await _timed(
+            "expand", expand_graph_neighbourhood_async(vector_context), RAG_GRAPH_TIMEOUT
+        )
+
+    context_chunks, debug = _finish(question, graph, vector_context, expanded_context, timings, errors)
+    debug["quality"] = quality
+    debug["doc_ids"] = doc_ids
+
+    started = time.perf_counter()
+    answer_text = await answer_llm_async(_answer_prompt(question, context_chunks))
+    timings["answer"] = _ms(started)
+    timings["total"] = _ms(total)
+
+    response = _answer_response(answer_text, context_chunks)
+    response["debug"] = debug
+    return response
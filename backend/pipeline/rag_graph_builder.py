@@ -1,7 +1,54 @@
+from typing import Dict, Any, List
+from models.neo4j_client import get_driver, mark_document_ingested
+from models.neo4j_schema import ensure_schema
 
-from typing import Dict, Any
-from neo4j import GraphDatabase
-from config import NEO4J_URI, NEO4J_USER, NEO4J_PASS
+_WRITE_DOCUMENT = """
+MERGE (d:Document {doc_id:$doc_id})
+SET d.source_file=$source_file, d.num_pages=$num_pages
+"""
+
+_WRITE_PAGES = """
+UNWIND $rows AS row
+MATCH (d:Document {doc_id:$doc_id})
+MERGE (p:Page {doc_id:$doc_id, page_number:row.page_number})
+SET p.raw_text=row.raw_text
+MERGE (d)-[:HAS_PAGE]->(p)
+"""
+
+_WRITE_TEXT_BLOCKS = """
+UNWIND $rows AS row
+MATCH (p:Page {doc_id:$doc_id, page_number:row.page_number})
+MERGE (t:TextBlock {id:row.tb_id})
+SET t.summary=row.summary
+MERGE (p)-[:HAS_TEXT_BLOCK]->(t)
+"""
+
+_WRITE_FIGURES = """
+UNWIND $rows AS row
+MATCH (p:Page {doc_id:$doc_id, page_number:row.page_number})
+MERGE (f:Figure {figure_id:row.figure_id})
+SET f.title=row.title,
+    f.path=row.path,
+    f.page_number=row.page_number,
+    f.doc_id=$doc_id
+MERGE (p)-[:HAS_FIGURE]->(f)
+"""
+
+def _write_graph(tx, doc_id: str, raw_json: Dict[str, Any], pages: List[Dict[str, Any]],
+                 text_blocks: List[Dict[str, Any]], figures: List[Dict[str, Any]]) -> None:
+    tx.run(
+        _WRITE_DOCUMENT,
+        doc_id=doc_id,
+        source_file=raw_json.get("source_file"),
+        num_pages=raw_json.get("num_pages"),
+    ).consume()
+    if pages:
+        tx.run(_WRITE_PAGES, doc_id=doc_id, rows=pages).consume()
+    if text_blocks:
+        tx.run(_WRITE_TEXT_BLOCKS, doc_id=doc_id, rows=text_blocks).consume()
+    if figures:
+        tx.run(_WRITE_FIGURES, doc_id=doc_id, rows=figures).consume()
+    mark_document_ingested(doc_id, tx)
 
 def ingest_raw_into_graph(raw_json: Dict[str, Any]) -> None:
     """
@@ -10,69 +57,41 @@ def ingest_raw_into_graph(raw_json: Dict[str, Any]) -> None:
       - Pages
       - TextBlocks (one per page)
       - Figures (images)
+
+    The whole document is written in one managed write transaction with one
+    UNWIND statement per node type. Page nodes keep the full page text: the
+    kb_content_text full-text index reads raw_text to pick candidate pages,
+    while the TextBlock only holds the first 500 characters.
     """
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+    driver = get_driver()
+    ensure_schema(driver)
     doc_id = raw_json["doc_id"]
 
-    with driver.session() as session:
-        session.run(
-            "MERGE (d:Document {doc_id:$doc_id}) "
-            "SET d.source_file=$source_file, d.num_pages=$num_pages",
-            doc_id=doc_id,
-            source_file=raw_json.get("source_file"),
-            num_pages=raw_json.get("num_pages"),
-        )
+    pages, text_blocks, figures = [], [], []
+    for page in raw_json["pages"]:
+        page_number = page["page_number"]
+        raw_text = page.get("raw_text", "")
 
-        for page in raw_json["pages"]:
-            page_number = page["page_number"]
-            raw_text = page.get("raw_text", "")
+        pages.append({
+            "page_number": page_number,
+            "raw_text": raw_text,
+        })
 
-            session.run(
-                """
-                MATCH (d:Document {doc_id:$doc_id})
-                MERGE (p:Page {doc_id:$doc_id, page_number:$page_number})
-                SET p.raw_text=$raw_text
-                MERGE (d)-[:HAS_PAGE]->(p)
-                """,
-                doc_id=doc_id,
-                page_number=page_number,
-                raw_text=raw_text,
-            )
+        # text block (one per page)
+        text_blocks.append({
+            "page_number": page_number,
+            "tb_id": f"{doc_id}_p{page_number}_tb1",
+            "summary": raw_text[:500],
+        })
 
-            # text block (one per page)
-            tb_id = f"{doc_id}_p{page_number}_tb1"
-            session.run(
-                """
-                MATCH (p:Page {doc_id:$doc_id, page_number:$page_number})
-                MERGE (t:TextBlock {id:$tb_id})
-                SET t.summary=$summary
-                MERGE (p)-[:HAS_TEXT_BLOCK]->(t)
-                """,
-                doc_id=doc_id,
-                page_number=page_number,
-                tb_id=tb_id,
-                summary=raw_text[:500],
-            )
+        # figures
+        for img in page.get("images", []):
+            figures.append({
+                "page_number": page_number,
+                "figure_id": img["image_id"],
+                "title": img.get("title") or "Figure",
+                "path": img.get("path"),
+            })
 
-            # figures
-            for img in page.get("images", []):
-                fig_id = img["image_id"]
-                title = img.get("title") or "Figure"
-                path = img.get("path")
-                session.run(
-                    """
-                    MATCH (p:Page {doc_id:$doc_id, page_number:$page_number})
-                    MERGE (f:Figure {figure_id:$figure_id})
-                    SET f.title=$title,
-                        f.path=$path,
-                        f.page_number=$page_number,
-                        f.doc_id=$doc_id
-                    MERGE (p)-[:HAS_FIGURE]->(f)
-                    """,
-                    doc_id=doc_id,
-                    page_number=page_number,
-                    figure_id=fig_id,
-                    title=title,
-                    path=path,
-                )
-    driver.close()
+    with driver.session() as session:
+        session.execute_write(_write_graph, doc_id, raw_json, pages, text_blocks, figures)
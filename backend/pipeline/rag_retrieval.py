@@ -1,7 +1,14 @@
 # rag_retrieval.py
 
+import os
+import sys
 from typing import List, Dict, Any
-from neo4j import GraphDatabase
+
+# Add parent directory to sys.path to allow importing 'models'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.neo4j_client import get_driver
+from models.graph_snapshot import get_doc_graph
 
 # Plug in your own embedding client here
 def embed_text_batch(texts: List[str]) -> List[List[float]]:
@@ -14,11 +21,12 @@ def embed_text_batch(texts: List[str]) -> List[List[float]]:
 
 class Neo4jRAGRetriever:
     def __init__(self, uri: str, user: str, password: str, doc_id: str):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = get_driver(uri, user, password)
         self.doc_id = doc_id
 
     def close(self):
-        self.driver.close()
+        # The shared driver is closed at process exit.
+        pass
 
     def get_context_for_pin(self, pin_name: str) -> Dict[str, List[str]]:
         """
@@ -29,6 +37,11 @@ class Neo4jRAGRetriever:
           - Tables
           - Constraints descriptions
         """
+        # Answered in-process when the API has the document in its graph snapshot
+        graph = get_doc_graph(self.doc_id)
+        if graph is not None:
+            return graph.pin_context(pin_name)
+
         with self.driver.session() as session:
             # TextBlocks, Figures, Tables
             records = session.run(
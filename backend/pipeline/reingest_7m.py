@@ -7,6 +7,7 @@ from pathlib import Path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from backend.pipeline.build_rag_graph import Neo4jRAGIngestor
+from backend.pipeline.purge_document import purge_graph
 import backend.config as config
 
 def reingest_7m():
@@ -22,20 +23,13 @@ def reingest_7m():
 
     # Ingest
     print(f"Connecting to {config.NEO4J_URI}...")
-    ingestor = Neo4jRAGIngestor(config.NEO4J_URI, config.NEO4J_USER, config.NEO4J_PASS)
+    ingestor = Neo4jRAGIngestor()
     try:
-        # Optional: Delete old 7m nodes directly if needed (Cypher), 
-        # but ingest_enriched might just MERGE/update.
-        # Let's trust MERGE for now or we can run a specific delete query.
+        # Document-scoped, batched purge of the graph only; pgvector rows and
+        # extracted assets stay, since this script re-ingests the same node ids
         print("Clearing old 7m nodes...")
-        with ingestor.driver.session() as session:
-            session.run("MATCH (d:Document {doc_id: '7m'}) DETACH DELETE d")
-            # Pages are linked to Document, so if we delete Document we might orphan pages if not detached
-            # Better:
-            session.run("MATCH (d:Document {doc_id: '7m'})-[*]->(n) DETACH DELETE d, n")
-            # Also delete pages directly attached to 7m just in case
-            session.run("MATCH (p:Page {doc_id: '7m'}) DETACH DELETE p")
-            
+        purge_graph("7m")
+
         print("Ingesting fresh data...")
         ingestor.ingest_enriched_json(enriched)
         print("Done.")
@@ -0,0 +1,179 @@
+"""
+text_match.py
+
+Local text matching used by the ontology layer, so linking runs against a
+document's content fetched once instead of CONTAINS scans inside Neo4j:
+
+  - AhoCorasick: finds every pin name in a text in a single pass.
+    Matches are word-boundary aware: a hit only counts when the characters
+    on either side of it are not letters, digits or underscores, so pin
+    "EN" does not match inside "ENABLE" and "VIN" does not match inside "VIN2".
+  - InvertedIndex: lowercased term -> node ids, used to resolve a
+    constraint's keyword set (all keywords must appear) without scanning
+    every node. Matching keeps substring (CONTAINS) semantics: a phrase's
+    edge terms may be part of a longer word, so "dimension" finds
+    "Dimensions" and "frequency stab" finds "Frequency Stability".
+"""
+
+import bisect
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+_TERM_RE = re.compile(r"\w+")
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class AhoCorasick:
+    def __init__(self, patterns: Iterable[str], case_sensitive: bool = True):
+        self.case_sensitive = case_sensitive
+        # trie: goto[state] maps char -> state; out[state] lists patterns ending there
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        key = pattern if self.case_sensitive else pattern.lower()
+        state = 0
+        for ch in key:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        if pattern not in self._out[state]:
+            self._out[state].append(pattern)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield (start, end, pattern) for every occurrence, overlapping included."""
+        haystack = text if self.case_sensitive else text.lower()
+        state = 0
+        for i, ch in enumerate(haystack):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for pattern in self._out[state]:
+                yield i - len(pattern) + 1, i + 1, pattern
+
+    def find_words(self, text: str) -> Set[str]:
+        """
+        Return the set of patterns that occur in `text` as whole words. A hit
+        that lies inside a longer hit ("EN" within "EN/UVLO") is dropped.
+        """
+        if not text:
+            return set()
+        n = len(text)
+        hits = []
+        for start, end, pattern in self.iter(text):
+            if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(pattern[0]):
+                continue
+            if end < n and _is_word_char(text[end]) and _is_word_char(pattern[-1]):
+                continue
+            hits.append((start, end, pattern))
+
+        # longest first, so a covering hit is seen before the ones it contains
+        hits.sort(key=lambda h: (h[0], -h[1]))
+        found = set()
+        cover_end = -1
+        for start, end, pattern in hits:
+            if end <= cover_end:
+                continue
+            found.add(pattern)
+            cover_end = end
+        return found
+
+
+class InvertedIndex:
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._texts: Dict[str, str] = {}
+        self._vocab: List[str] = []  # sorted terms, for prefix lookups; rebuilt lazily
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, key: str, text: str):
+        if not text:
+            return
+        lowered = text.lower()
+        self._texts[key] = lowered
+        for term in set(_TERM_RE.findall(lowered)):
+            self._postings.setdefault(term, set()).add(key)
+        self._vocab = []
+
+    def _words(self, term: str, open_left: bool, open_right: bool) -> List[str]:
+        """
+        Indexed words a phrase term can occur in. A term at the phrase's start
+        may be the tail of a longer word, one at its end the head of one.
+        """
+        if not open_left and not open_right:
+            return [term] if term in self._postings else []
+        if open_left and open_right:
+            return [w for w in self._postings if term in w]
+        if open_left:
+            return [w for w in self._postings if w.endswith(term)]
+        if not self._vocab:
+            self._vocab = sorted(self._postings)
+        words = []
+        for i in range(bisect.bisect_left(self._vocab, term), len(self._vocab)):
+            if not self._vocab[i].startswith(term):
+                break
+            words.append(self._vocab[i])
+        return words
+
+    def match_all(self, phrases: Iterable[str]) -> Set[str]:
+        """
+        Keys whose text contains every phrase (case-insensitive). Posting
+        lists of the phrases' terms (widened to the words an edge term can be
+        part of) are intersected smallest first; the few surviving candidates
+        are then checked for the exact phrases.
+        """
+        phrases = [p.lower() for p in phrases if p]
+        if not phrases:
+            return set()
+
+        postings = []
+        for phrase in phrases:
+            for m in _TERM_RE.finditer(phrase):
+                keys: Set[str] = set()
+                for word in self._words(m.group(), m.start() == 0, m.end() == len(phrase)):
+                    keys |= self._postings[word]
+                if not keys:
+                    return set()
+                postings.append(keys)
+
+        if postings:
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for keys in postings[1:]:
+                candidates &= keys
+                if not candidates:
+                    return set()
+        else:
+            # phrases made only of symbols; nothing to narrow on
+            candidates = set(self._texts)
+
+        return {k for k in candidates if all(p in self._texts[k] for p in phrases)}
@@ -0,0 +1,55 @@
+import pytest
+
+from llm import context_packer
+from llm.context_packer import pack_context_chunks
+
+
+@pytest.fixture(autouse=True)
+def _approximate_tokens(monkeypatch):
+    # tiktoken downloads its encoding on first use; keep the budget math offline
+    monkeypatch.setattr(context_packer, "_encoding", lambda: None)
+
+
+PAGE = " ".join(f"word{i}" for i in range(150))
+
+
+def _chunk(source, node_id, text, **extra):
+    return dict({"doc_id": "d", "page": 1, "source": source, "node_id": node_id, "text": text}, **extra)
+
+
+def test_full_page_wins_over_its_text_block_prefix():
+    block = _chunk("TextBlock", "tb1", PAGE[:500])
+    page = _chunk("FullPage", "p1", PAGE)
+    packed = pack_context_chunks("word1 word2", [block, page], token_budget=10000,
+                                 max_chunk_chars=5000)
+    assert [c["node_id"] for c in packed] == ["p1"]
+
+
+def test_shorter_copy_used_when_longer_does_not_fit():
+    block = _chunk("TextBlock", "tb1", PAGE[:200])
+    page = _chunk("FullPage", "p1", PAGE)
+    packed = pack_context_chunks("word1 word2", [block, page], token_budget=80,
+                                 max_chunk_chars=5000)
+    assert [c["node_id"] for c in packed] == ["tb1"]
+
+
+def test_exact_duplicates_collapse():
+    a = _chunk("TextBlock", "tb1", "Supply voltage range is 1.8 V to 3.6 V")
+    b = _chunk("TextBlock", "tb2", "supply  voltage range is 1.8 V to 3.6 V")
+    packed = pack_context_chunks("supply voltage", [a, b], token_budget=1000)
+    assert len(packed) == 1
+
+
+def test_media_chunks_are_never_collapsed():
+    f1 = _chunk("Figure", "f1", "Figure 3", image_path="/static/d/f1.png")
+    f2 = _chunk("Figure", "f2", "Figure 3", image_path="/static/d/f2.png")
+    packed = pack_context_chunks("figure", [f1, f2], token_budget=1000)
+    assert {c["node_id"] for c in packed} == {"f1", "f2"}
+
+
+def test_unrelated_chunks_kept_within_budget():
+    chunks = [_chunk("TextBlock", f"tb{i}", f"topic{i} " + " ".join(f"w{i}x{j}" for j in range(40)))
+              for i in range(10)]
+    packed = pack_context_chunks("topic1", chunks, token_budget=200)
+    assert 0 < len(packed) < 10
+    assert packed[0]["node_id"] == "tb1"
@@ -0,0 +1,47 @@
+from models.neo4j_client import expansion_seeds, expansion_to_chunks, GRAPH_EXPAND_DECAY
+
+
+def _hit(doc_id, node_id, distance, source="TextBlock"):
+    return {"doc_id": doc_id, "source": source, "node_id": node_id, "distance": distance, "page": 1}
+
+
+def _record(doc_id, seed_id, siblings):
+    return {"seed_id": seed_id, "seed_source": "TextBlock", "seed_doc_id": doc_id, "page": 1,
+            "siblings": siblings, "sources": [], "qa": [], "constraints": [], "spec_items": []}
+
+
+def _node(node_id, text, label="Figure"):
+    return {"label": label, "id": node_id, "text": text, "path": f"/static/{node_id}.png"}
+
+
+def test_seeds_are_best_distinct_hits():
+    hits = [_hit("a", "tb1", 0.4), _hit("a", "tb1", 0.2), _hit("b", "tb1", 0.3),
+            _hit("a", "x", 0.1, source="FullPage"), _hit("a", None, 0.0)]
+    seeds = expansion_seeds(hits, max_seeds=5)
+    assert [(s["doc_id"], s["node_id"]) for s in seeds] == [("a", "tb1"), ("b", "tb1")]
+    assert len(expansion_seeds(hits, max_seeds=1)) == 1
+
+
+def test_expansions_from_different_documents_are_kept_apart():
+    # both documents have a p1_text_block_1 with a same-id sibling figure
+    hits = [_hit("a", "p1_text_block_1", 0.2), _hit("b", "p1_text_block_1", 0.6)]
+    records = [
+        _record("a", "p1_text_block_1", [_node("p1_img1", "figure in a")]),
+        _record("b", "p1_text_block_1", [_node("p1_img1", "figure in b")]),
+    ]
+    chunks = expansion_to_chunks(records, hits)
+    assert [(c["doc_id"], c["text"]) for c in chunks] == [("a", "figure in a"), ("b", "figure in b")]
+    assert chunks[0]["distance"] == 1.0 - (1.0 - 0.2) * GRAPH_EXPAND_DECAY
+    assert chunks[1]["distance"] == 1.0 - (1.0 - 0.6) * GRAPH_EXPAND_DECAY
+    assert all(c["expanded_from"] == "p1_text_block_1" for c in chunks)
+
+
+def test_duplicate_neighbours_within_a_document_are_dropped():
+    hits = [_hit("a", "tb1", 0.2), _hit("a", "tb2", 0.3)]
+    records = [
+        _record("a", "tb1", [_node("fig", "shared figure")]),
+        _record("a", "tb2", [_node("fig", "shared figure"), _node("empty", None)]),
+    ]
+    chunks = expansion_to_chunks(records, hits)
+    assert [c["node_id"] for c in chunks] == ["fig"]
+    assert chunks[0]["image_path"] == "/static/fig.png"
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from models import graph_export
+
+
+class _Result:
+    def __init__(self, records):
+        self.records = records
+
+    async def single(self):
+        return self.records[0] if self.records else None
+
+    def __aiter__(self):
+        async def gen():
+            for r in self.records:
+                yield r
+        return gen()
+
+
+class _Record(dict):
+    def data(self):
+        return dict(self)
+
+
+class _Session:
+    def __init__(self, calls, doc):
+        self.calls = calls
+        self.doc = doc
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, **params):
+        self.calls.append((query, params))
+        if query == graph_export._VERSION_QUERY:
+            return _Result([_Record(self.doc)])
+        return _Result([])
+
+
+class _Driver:
+    def __init__(self):
+        self.calls = []
+        self.doc = {"doc_eid": "4:db:1", "version": 3, "ingested_at": "2026-10-01T10:00:00Z"}
+
+    def session(self):
+        return _Session(self.calls, self.doc)
+
+
+@pytest.fixture
+def driver(monkeypatch):
+    driver = _Driver()
+    monkeypatch.setattr(graph_export, "get_async_driver", lambda: driver)
+    graph_export._CACHE.clear()
+    yield driver
+    graph_export._CACHE.clear()
+
+
+def test_parse_page_cursor():
+    assert graph_export.parse_page_cursor(None) is None
+    assert graph_export.parse_page_cursor("") is None
+    assert graph_export.parse_page_cursor("12") == 12
+    with pytest.raises(ValueError):
+        graph_export.parse_page_cursor("4:abc")
+
+
+def test_bad_cursor_is_rejected_before_querying(driver):
+    with pytest.raises(ValueError):
+        asyncio.run(graph_export.get_graph_view("7m", cursor="abc"))
+    assert driver.calls == []
+
+
+def test_expand_is_scoped_to_the_document(driver):
+    view = asyncio.run(graph_export.expand_node("7m", "4:xyz:12"))
+    query, params = driver.calls[-1]
+    assert query == graph_export._EXPAND_QUERY
+    assert params["doc_id"] == "7m" and params["node_id"] == "4:xyz:12"
+    assert "$doc_id" in query
+    assert view["nodes"] == [] and view["next_cursor"] is None
+
+
+def test_views_are_cached_per_version(driver):
+    asyncio.run(graph_export.get_graph_view("7m"))
+    asyncio.run(graph_export.get_graph_view("7m"))
+    # second call: version lookup only
+    assert [q for q, _ in driver.calls].count(graph_export._SUMMARY_QUERY) == 1
+
+
+def test_reingest_after_purge_is_not_served_from_cache(driver):
+    asyncio.run(graph_export.get_graph_view("7m"))
+    # DELETE /documents/7m removes the Document node, so the re-ingest can land on the same version
+    driver.doc.update(doc_eid="4:db:2", ingested_at="2026-10-02T09:00:00Z")
+    asyncio.run(graph_export.get_graph_view("7m"))
+    assert [q for q, _ in driver.calls].count(graph_export._SUMMARY_QUERY) == 2
@@ -0,0 +1,132 @@
+import numpy as np
+
+from models import graph_snapshot
+from models.graph_snapshot import DocGraph, _csr
+
+FANOUT = {"sibling": 3, "source": 3, "qa": 3, "constraint": 5, "spec_item": 5}
+
+
+def _n(eid, label, key, page_number=None, **props):
+    node = {"eid": eid, "label": label, "key": key, "page_number": page_number}
+    for p in ("name", "text", "title", "path", "data", "question", "answer"):
+        node[p] = props.get(p)
+    return node
+
+
+NODES = [
+    _n("d", "Document", "doc"),
+    _n("p1", "Page", "1", page_number=1),
+    _n("p2", "Page", "2", page_number=2),
+    _n("tb1", "TextBlock", "doc::p1_tb1", text="EN enables the regulator"),
+    _n("tb2", "TextBlock", "doc::p1_tb2", text="VIN range"),
+    _n("fig", "Figure", "p1_img1", text="Block diagram", path="/static/doc/p1_img1.png"),
+    _n("tb3", "TextBlock", "doc::p2_tb1", text="Timing"),
+    _n("qa", "QA_Triple", "qa1", question="What does EN do?", answer="Enables"),
+    _n("pin", "Pin", "EN", name="EN"),
+    _n("c", "Constraint", "c1", text="EN must not exceed VIN"),
+]
+
+EDGES = [
+    ("d", "HAS_PAGE", "p1"), ("d", "HAS_PAGE", "p2"),
+    ("p1", "HAS_TEXT_BLOCK", "tb1"), ("p1", "HAS_TEXT_BLOCK", "tb2"), ("p1", "HAS_FIGURE", "fig"),
+    ("p2", "HAS_TEXT_BLOCK", "tb3"),
+    ("tb1", "HAS_QA", "qa"),
+    ("pin", "MENTIONED_IN", "tb1"), ("pin", "HAS_CONSTRAINT", "c"),
+    ("c", "DERIVED_FROM", "tb3"),
+    ("tb1", "HAS_QA", "missing"),   # dangling edge into another document is ignored
+]
+
+
+def test_csr_groups_targets_by_source():
+    indptr, indices = _csr(4, np.array([2, 0, 2, 1]), np.array([10, 11, 12, 13]))
+    assert indptr.tolist() == [0, 1, 2, 4, 4]
+    assert indices[indptr[2]:indptr[3]].tolist() == [10, 12]
+    assert indices[indptr[3]:indptr[4]].tolist() == []
+
+
+def test_neighbours_outgoing_and_incoming():
+    g = DocGraph("doc", 1, NODES, EDGES)
+    p1, tb1 = g.node("Page", "1"), g.node("TextBlock", "doc::p1_tb1")
+    children = {g.prop(int(i), "key") for i in g.neighbours(p1, ("HAS_TEXT_BLOCK", "HAS_FIGURE"))}
+    assert children == {"doc::p1_tb1", "doc::p1_tb2", "p1_img1"}
+    assert g.neighbours(tb1, ("HAS_TEXT_BLOCK",), incoming=True).tolist() == [p1]
+    assert g.neighbours(tb1, ("NO_SUCH_REL",)).size == 0
+
+
+def test_string_table_interns_repeated_values():
+    g = DocGraph("doc", 1, NODES, EDGES)
+    pin, c = g.node("Pin", "EN"), g.node("Constraint", "c1")
+    assert g.props["key"][pin] == g.props["name"][pin]
+    assert g.prop(pin, "name") == "EN"
+    assert g.prop(c, "path") is None
+    assert g.label_of(c) == "Constraint"
+
+
+def test_expansion_record_matches_cypher_shape():
+    g = DocGraph("doc", 1, NODES, EDGES)
+    rec = g.expansion_record({"doc_id": "doc", "source": "TextBlock", "node_id": "doc::p1_tb1"}, FANOUT)
+    assert rec["seed_doc_id"] == "doc" and rec["page"] == 1
+    assert {s["id"] for s in rec["siblings"]} == {"doc::p1_tb2", "p1_img1"}
+    assert rec["qa"] == [{"id": "qa1", "question": "What does EN do?", "answer": "Enables"}]
+    assert [(c["id"], c["pin"]) for c in rec["constraints"]] == [("c1", "EN")]
+
+
+def test_expansion_record_follows_derived_from_to_source_page():
+    g = DocGraph("doc", 1, NODES, EDGES)
+    rec = g.expansion_record({"doc_id": "doc", "source": "Constraint", "node_id": "c1"}, FANOUT)
+    assert [(s["id"], s["page"]) for s in rec["sources"]] == [("doc::p2_tb1", 2)]
+    assert g.expansion_record({"doc_id": "doc", "source": "TextBlock", "node_id": "nope"}, FANOUT) is None
+
+
+def test_pin_context():
+    g = DocGraph("doc", 1, NODES, EDGES)
+    ctx = g.pin_context("EN")
+    assert ctx["text_blocks"] == ["EN enables the regulator"]
+    assert ctx["constraints"] == ["EN must not exceed VIN"]
+    assert g.pin_context("VOUT")["text_blocks"] == []
+
+
+class _Record(dict):
+    def data(self):
+        return dict(self)
+
+
+class _Session:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        if query == graph_snapshot._VERSIONS_QUERY:
+            return [_Record(self.db["doc"])]
+        if query == graph_snapshot._NODES_QUERY:
+            self.db["loads"] += 1
+            return [_Record(n) for n in NODES]
+        return [_Record(source=a, type=t, target=b) for a, t, b in EDGES]
+
+
+class _Driver:
+    def __init__(self, db):
+        self.db = db
+
+    def session(self):
+        return _Session(self.db)
+
+
+def test_refresh_reloads_document_recreated_at_the_same_version(monkeypatch):
+    db = {"loads": 0, "doc": {"doc_id": "7m", "doc_eid": "4:db:1", "version": 1,
+                              "ingested_at": "2026-10-01T10:00:00Z"}}
+    monkeypatch.setattr(graph_snapshot, "get_driver", lambda: _Driver(db))
+    monkeypatch.setattr(graph_snapshot, "_SNAPSHOT", {})
+
+    assert graph_snapshot.refresh_snapshot()["loaded"] == ["7m"]
+    assert graph_snapshot.refresh_snapshot()["loaded"] == []
+    # reingest_7m: purge_graph deletes the Document, the re-ingest bumps a fresh node to version 1
+    db["doc"] = dict(db["doc"], doc_eid="4:db:9", ingested_at="2026-10-02T09:00:00Z")
+    assert graph_snapshot.refresh_snapshot()["loaded"] == ["7m"]
+    assert db["loads"] == 2
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions as pg_ext
+from psycopg2.pool import PoolError
+
+from models import pg_client
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise pg_client.psycopg2.OperationalError("server closed the connection")
+        self.conn.statements.append(sql)
+
+
+class _Conn:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.autocommit = False
+        self.statements = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def get_transaction_status(self):
+        return pg_ext.TRANSACTION_STATUS_IDLE
+
+
+class _Pool:
+    """Same exhaustion behaviour as psycopg2's ThreadedConnectionPool: getconn raises."""
+
+    def __init__(self, minconn, maxconn, dsn):
+        self.maxconn = maxconn
+        self.free, self.used = [], set()
+        self.lock = threading.Lock()
+
+    def getconn(self):
+        with self.lock:
+            if len(self.used) >= self.maxconn:
+                raise PoolError("connection pool exhausted")
+            conn = self.free.pop() if self.free else _Conn()
+            self.used.add(conn)
+            return conn
+
+    def putconn(self, conn, close=False):
+        with self.lock:
+            self.used.discard(conn)
+            if not close:
+                self.free.append(conn)
+
+    def closeall(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(pg_client, "ThreadedConnectionPool", _Pool)
+    monkeypatch.setattr(pg_client, "PG_SYNC_POOL_MAX_SIZE", 1)
+    pg_client.close_sync_pg_pools()
+    yield
+    pg_client.close_sync_pg_pools()
+
+
+def test_exhausted_pool_waits_for_a_connection(pool):
+    first = pg_client.get_pg_conn()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pg_client.get_pg_conn(timeout=5)))
+    waiter.start()
+    time.sleep(0.1)
+    assert not got  # queued, not failed
+    pg_client.put_pg_conn(first)
+    waiter.join(5)
+    assert got == [first]
+    pg_client.put_pg_conn(got[0])
+
+
+def test_exhausted_pool_times_out(pool):
+    conn = pg_client.get_pg_conn()
+    with pytest.raises(PoolError):
+        pg_client.get_pg_conn(timeout=0.05)
+    pg_client.put_pg_conn(conn)
+    pg_client.put_pg_conn(pg_client.get_pg_conn(timeout=0.05))
+
+
+def test_broken_idle_connection_is_replaced(pool):
+    with pg_client.pg_connection() as conn:
+        first = conn
+    first.broken = True
+    pg_client._LAST_USED[id(first)] = 0.0  # idle long enough to be checked
+    with pg_client.pg_connection() as conn:
+        assert conn is not first
+
+
+def test_connection_is_reset_on_return(pool):
+    with pg_client.pg_connection() as conn:
+        conn.autocommit = True
+    assert conn.autocommit is False
+
+
+def test_rag_chunks_readiness_is_cached(pool):
+    pg_client.mark_rag_chunks_ready(False)
+
+    class _Ready:
+        calls = 0
+
+        def execute(self, sql):
+            _Ready.calls += 1
+
+        def fetchone(self):
+            return (True,)
+
+    cur = _Ready()
+    assert pg_client.rag_chunks_ready(cur)
+    assert pg_client.rag_chunks_ready(cur)
+    assert _Ready.calls == 1
+    pg_client.mark_rag_chunks_ready(False)
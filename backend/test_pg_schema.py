@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from models import pg_schema
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(sql)
+        if self.conn.fail_on and self.conn.fail_on in sql:
+            raise RuntimeError("build failed")
+
+
+class _Conn:
+    closed = 0
+
+    def __init__(self, fail_on=None):
+        self.autocommit = False
+        self.statements = []
+        self.fail_on = fail_on
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        pass
+
+    def get_dsn_parameters(self):
+        return {"host": pg_schema.PG_HOST, "port": str(pg_schema.PG_PORT),
+                "dbname": pg_schema.PG_DB, "user": pg_schema.PG_USER, "sslmode": "prefer"}
+
+
+def test_ivfflat_lists():
+    assert pg_schema.ivfflat_lists(0) == 1
+    assert pg_schema.ivfflat_lists(50_000) == 50
+    assert pg_schema.ivfflat_lists(1_000_000) == 1000
+    assert pg_schema.ivfflat_lists(4_000_000) == 2000
+
+
+def test_needs_build():
+    empty = {"rows": 0, "kind": None}
+    assert pg_schema._needs_build(empty, "ivfflat") is None
+    assert pg_schema._needs_build({"rows": 10, "kind": None}, "ivfflat") == "missing"
+    assert pg_schema._needs_build({"rows": 10, "kind": "ivfflat", "lists": 1}, "hnsw") == "switch ivfflat -> hnsw"
+    assert pg_schema._needs_build({"rows": 100_000, "kind": "ivfflat", "lists": 100}, "ivfflat") is None
+    assert pg_schema._needs_build({"rows": 500_000, "kind": "ivfflat", "lists": 100}, "ivfflat") == "lists 100 -> 500"
+
+
+def test_index_statement():
+    stmt, params = pg_schema._index_statement("idx", "ivfflat", 200_000)
+    assert params == {"lists": 200}
+    assert "USING ivfflat (embedding vector_cosine_ops) WITH (lists = 200)" in stmt
+    stmt, _ = pg_schema._index_statement("idx", "hnsw", 10)
+    assert "USING hnsw" in stmt and "ef_construction" in stmt
+
+
+def test_schema_key_ignores_password():
+    # psycopg2 masks the password in conn.dsn; the key must still match the default
+    assert pg_schema._schema_key(_Conn()) == pg_schema._schema_key(None)
+
+
+def test_failed_build_resets_session_settings(monkeypatch):
+    monkeypatch.setattr(pg_schema, "vector_index_status", lambda conn: {"rows": 5000, "kind": None})
+    conn = _Conn(fail_on="USING ivfflat")
+    with pytest.raises(RuntimeError):
+        pg_schema.build_vector_index(conn, kind="ivfflat")
+    assert conn.statements[-2:] == ["RESET maintenance_work_mem", "RESET max_parallel_maintenance_workers"]
+    assert conn.autocommit is False
+
+
+def test_scheduled_build_runs_in_background(monkeypatch):
+    calls = []
+    done = threading.Event()
+
+    def build():
+        calls.append(threading.current_thread().name)
+        done.set()
+
+    monkeypatch.setattr(pg_schema, "build_vector_index", build)
+    pg_schema.schedule_vector_index_build()
+    assert done.wait(2)
+    assert calls == ["vector-index-build"]
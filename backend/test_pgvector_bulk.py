@@ -0,0 +1,135 @@
+import json
+import struct
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+from pipeline import pgvector_bulk
+from pipeline.pgvector_bulk import (
+    CHUNK_COLUMNS, _CopyStream, _chunk_key, content_hash, encode_rows,
+)
+
+
+def _parse(stream: bytes, columns, dim):
+    """Decode a binary COPY stream back into dicts (the server's side of encode_rows)."""
+    assert stream.startswith(b"PGCOPY\n\xff\r\n\x00")
+    pos = 19
+    rows = []
+    while True:
+        (fields,) = struct.unpack_from(">h", stream, pos)
+        pos += 2
+        if fields == -1:
+            assert pos == len(stream)
+            return rows
+        assert fields == len(columns)
+        row = {}
+        for col in columns:
+            (size,) = struct.unpack_from(">i", stream, pos)
+            pos += 4
+            if size == -1:
+                row[col] = None
+                continue
+            data = stream[pos:pos + size]
+            pos += size
+            if col == "page_number":
+                row[col] = struct.unpack(">i", data)[0]
+            elif col == "embedding":
+                n, unused = struct.unpack_from(">hh", data)
+                assert (n, unused) == (dim, 0)
+                row[col] = np.frombuffer(data[4:], dtype=">f4").tolist()
+            else:
+                row[col] = data.decode("utf-8")
+        rows.append(row)
+
+
+def test_encode_rows_round_trip():
+    rows = [
+        {"doc_id": "7m", "pin": None, "source": "TextBlock", "page_number": 3, "node_id": 42,
+         "text": "Fréquence 16 MHz", "embedding": [0.5, -1.25, 2.0]},
+        {"doc_id": "7m", "pin": "EN", "source": "Table", "page_number": None, "node_id": None,
+         "text": "x", "embedding": np.array([1, 2, 3], dtype=np.float64)},
+    ]
+    decoded = _parse(b"".join(encode_rows(rows, CHUNK_COLUMNS, dim=3)), CHUNK_COLUMNS, dim=3)
+    assert decoded[0] == {**rows[0], "node_id": "42"}
+    assert decoded[1]["embedding"] == [1.0, 2.0, 3.0]
+    assert decoded[1]["page_number"] is None and decoded[1]["node_id"] is None
+
+
+def test_encode_rows_rejects_wrong_dimension():
+    rows = [{"doc_id": "d", "source": "s", "text": "t", "embedding": [1.0, 2.0]}]
+    with pytest.raises(ValueError):
+        b"".join(encode_rows(rows, CHUNK_COLUMNS, dim=3))
+
+
+def test_copy_stream_reads_in_chunks():
+    parts = [b"abc", b"", b"defgh", b"i"]
+    seen = []
+    stream = _CopyStream(iter(parts), on_part=lambda: seen.append(1))
+    out = []
+    while True:
+        data = stream.read(4)
+        if not data:
+            break
+        out.append(data)
+    assert out == [b"abcd", b"efgh", b"i"]
+    assert len(seen) == len(parts)
+
+
+def test_content_hash_matches_postgres_md5():
+    # md5('hello') in Postgres
+    assert content_hash("hello") == "5d41402abc4b2a76b9719d911017c592"
+
+
+def test_chunk_key_normalises_stored_and_new_rows():
+    # node_id comes back from Postgres as text and pin as NULL
+    assert _chunk_key("TextBlock", 7, None, "h") == _chunk_key("TextBlock", "7", "", "h")
+
+
+def _jsonl(tmp_path, doc_ids):
+    path = tmp_path / "chunks.jsonl"
+    path.write_text("\n".join(
+        json.dumps({"doc_id": d, "source": "TextBlock", "node_id": str(i), "text": f"t{i}", "embedding": [0.0]})
+        for i, d in enumerate(doc_ids)
+    ) + "\n\n")
+    return str(path)
+
+
+@pytest.fixture
+def cli(monkeypatch):
+    calls = {"schema": 0, "commits": 0, "synced": [], "index": 0}
+
+    class Conn:
+        def commit(self):
+            calls["commits"] += 1
+
+    @contextmanager
+    def pg_connection():
+        yield Conn()
+
+    def sync(conn, doc_id, rows, embed):
+        calls["synced"].append((doc_id, [r["node_id"] for r in rows]))
+        return {"unchanged": 0, "upserted": 1, "deleted": 0}
+
+    monkeypatch.setattr(pgvector_bulk, "pg_connection", pg_connection)
+    monkeypatch.setattr(pgvector_bulk, "ensure_pg_schema", lambda conn: calls.__setitem__("schema", 1))
+    monkeypatch.setattr(pgvector_bulk, "sync_doc_chunks", sync)
+    monkeypatch.setattr(pgvector_bulk, "build_vector_index", lambda: calls.__setitem__("index", 1))
+    return calls
+
+
+def test_jsonl_cli_syncs_each_document_through_the_pool(cli, tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["pgvector_bulk.py", "--jsonl", _jsonl(tmp_path, ["a", "a", "b"])])
+    pgvector_bulk.main()
+    assert cli["schema"] == 1 and cli["index"] == 1
+    assert cli["synced"] == [("a", ["0", "1"]), ("b", ["2"])]
+    assert cli["commits"] == 2
+
+
+def test_jsonl_cli_rejects_interleaved_documents(cli, tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["pgvector_bulk.py", "--jsonl", _jsonl(tmp_path, ["a", "b", "a"])])
+    with pytest.raises(ValueError):
+        pgvector_bulk.main()
+    assert [d for d, _ in cli["synced"]] == ["a", "b"]
+
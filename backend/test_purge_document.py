@@ -0,0 +1,68 @@
+"""
+Purge against a scratch Neo4j database; skipped unless NEO4J_TEST_URI
+(and NEO4J_TEST_USER / NEO4J_TEST_PASS) point at one.
+"""
+
+import os
+import uuid
+
+import pytest
+
+from models.neo4j_client import get_driver
+from pipeline import purge_document
+
+TEST_URI = os.getenv("NEO4J_TEST_URI")
+
+pytestmark = pytest.mark.skipif(not TEST_URI, reason="NEO4J_TEST_URI not set")
+
+_SETUP = """
+UNWIND [$a, $b] AS doc_id
+CREATE (d:Document {doc_id: doc_id})-[:HAS_PAGE]->(p:Page {doc_id: doc_id, page_number: 1})
+CREATE (p)-[:HAS_TEXT_BLOCK]->(:TextBlock {id: doc_id + '_p1_text_block_1'})
+CREATE (p)-[:HAS_TABLE]->(:Table {table_id: doc_id + '_t1'})-[:HAS_QA]->(:QA_Triple {id: doc_id + '_t1_qa1'})
+WITH collect(p) AS pages
+// a block ingested before ids were doc-scoped, shared by both documents' pages
+CREATE (shared:TextBlock {id: $shared})
+FOREACH (p IN pages | CREATE (p)-[:HAS_TEXT_BLOCK]->(shared))
+"""
+
+_COUNT = """
+MATCH (n) WHERE n.doc_id = $doc_id OR n.id STARTS WITH $doc_id OR n.table_id STARTS WITH $doc_id
+RETURN count(n) AS n
+"""
+
+
+@pytest.fixture
+def driver(monkeypatch):
+    driver = get_driver(TEST_URI, os.getenv("NEO4J_TEST_USER", "neo4j"), os.getenv("NEO4J_TEST_PASS"))
+    monkeypatch.setattr(purge_document, "get_driver", lambda: driver)
+    return driver
+
+
+def test_purge_keeps_other_documents(driver):
+    a, b = f"purge_a_{uuid.uuid4().hex[:8]}", f"purge_b_{uuid.uuid4().hex[:8]}"
+    shared = f"{a}_shared_p1_text_block_1"
+    with driver.session() as session:
+        session.run(_SETUP, a=a, b=b, shared=shared).consume()
+    try:
+        purge_document.purge_graph(a)
+        with driver.session() as session:
+            assert session.run(_COUNT, doc_id=a).single()["n"] == 1  # only the shared block
+            assert session.run(_COUNT, doc_id=b).single()["n"] == 5
+            linked = session.run(
+                "MATCH (:Page {doc_id: $b})-[:HAS_TEXT_BLOCK]->(t:TextBlock {id: $shared}) RETURN count(t) AS n",
+                b=b, shared=shared,
+            ).single()["n"]
+            assert linked == 1
+
+        purge_document.purge_graph(b)
+        with driver.session() as session:
+            assert session.run(_COUNT, doc_id=a).single()["n"] == 0
+            assert session.run(_COUNT, doc_id=b).single()["n"] == 0
+    finally:
+        with driver.session() as session:
+            session.run(
+                "MATCH (n) WHERE n.doc_id IN [$a, $b] OR n.id STARTS WITH $a OR n.id STARTS WITH $b "
+                "OR n.table_id STARTS WITH $a OR n.table_id STARTS WITH $b DETACH DELETE n",
+                a=a, b=b,
+            ).consume()
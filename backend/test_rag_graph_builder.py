@@ -0,0 +1,52 @@
+from pipeline import rag_graph_builder
+
+
+class FakeTx:
+    def __init__(self):
+        self.runs = []
+
+    def run(self, query, **params):
+        self.runs.append((query, params))
+        return self
+
+    def consume(self):
+        return None
+
+
+class FakeSession:
+    def __init__(self, tx):
+        self.tx = tx
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, fn, *args):
+        return fn(self.tx, *args)
+
+
+class FakeDriver:
+    def __init__(self):
+        self.tx = FakeTx()
+
+    def session(self):
+        return FakeSession(self.tx)
+
+
+def test_pages_keep_full_text_for_fulltext_search(monkeypatch):
+    driver = FakeDriver()
+    monkeypatch.setattr(rag_graph_builder, "get_driver", lambda: driver)
+    monkeypatch.setattr(rag_graph_builder, "ensure_schema", lambda d: None)
+    monkeypatch.setattr(rag_graph_builder, "mark_document_ingested", lambda doc_id, tx: None)
+
+    text = "intro " * 200 + "frequency stability"
+    rag_graph_builder.ingest_raw_into_graph({
+        "doc_id": "d", "source_file": "d.pdf", "num_pages": 1,
+        "pages": [{"page_number": 1, "raw_text": text, "images": []}],
+    })
+
+    params = {q: p for q, p in driver.tx.runs}
+    assert params[rag_graph_builder._WRITE_PAGES]["rows"] == [{"page_number": 1, "raw_text": text}]
+    assert params[rag_graph_builder._WRITE_TEXT_BLOCKS]["rows"][0]["summary"] == text[:500]
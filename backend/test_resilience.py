@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from llm.resilience import CircuitOpenError, DeadlineExceeded, ResilientCaller
+
+
+def _caller(reset: float = 0.05) -> ResilientCaller:
+    caller = ResilientCaller("answer", deadline=5.0, max_retries=0, hedge=False)
+    caller.breaker.failure_threshold = 1
+    caller.breaker.reset_timeout = reset
+    return caller
+
+
+def _open(caller: ResilientCaller) -> None:
+    def down(timeout):
+        raise requests.ConnectionError("down")
+
+    with pytest.raises(DeadlineExceeded):
+        caller.call(down)
+    assert caller.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        caller.call(lambda timeout: "ok")
+
+
+def test_breaker_opens_and_closes_after_trial():
+    caller = _caller()
+    _open(caller)
+    time.sleep(0.06)
+    assert caller.breaker.state == "half_open"
+    assert caller.call(lambda timeout: "ok") == "ok"
+    assert caller.breaker.state == "closed"
+
+
+def test_non_retryable_error_does_not_open_breaker():
+    caller = _caller()
+    caller.breaker.failure_threshold = 2
+
+    def down(timeout):
+        raise requests.ConnectionError("down")
+
+    def bad(timeout):
+        raise ValueError("bad request")
+
+    with pytest.raises(DeadlineExceeded):
+        caller.call(down)
+    with pytest.raises(ValueError):
+        caller.call(bad)
+    assert caller.breaker.state == "closed"
+    # the bad request neither counted nor reset the earlier failure
+    with pytest.raises(DeadlineExceeded):
+        caller.call(down)
+    assert caller.breaker.state == "open"
+
+
+def test_non_retryable_error_does_not_close_half_open_breaker():
+    caller = _caller()
+    _open(caller)
+    time.sleep(0.06)
+
+    def bad(timeout):
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        caller.call(bad)
+    assert caller.breaker.state == "half_open"
+
+
+def test_caller_cancellations_do_not_open_breaker():
+    caller = _caller()
+
+    async def slow(timeout):
+        await asyncio.sleep(10)
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(caller.call_async(slow), 0.01)
+
+    asyncio.run(scenario())
+    assert caller.breaker.state == "closed"
+
+
+def test_cancelled_half_open_trial_releases_breaker():
+    caller = _caller()
+    _open(caller)
+    time.sleep(0.06)
+
+    async def hang(timeout):
+        await asyncio.sleep(10)
+
+    async def ok(timeout):
+        return "ok"
+
+    async def scenario():
+        # the trial call is cancelled by an outer timeout, as rag_answer_async's branches are
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(caller.call_async(hang), 0.01)
+        # cancellation frees the trial slot without counting against the backend
+        assert caller.breaker.state == "half_open"
+        return await caller.call_async(ok)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert caller.breaker.state == "closed"
+
+
+def test_expired_deadline_releases_half_open_trial():
+    caller = _caller()
+    _open(caller)
+    time.sleep(0.06)
+    with pytest.raises(DeadlineExceeded):
+        caller.call(lambda timeout: "ok", deadline=0)
+    assert caller.call(lambda timeout: "ok") == "ok"
+
+
+def test_cancelled_hedged_call_cancels_every_attempt():
+    caller = _caller()
+    caller.hedge = True
+    for _ in range(50):
+        caller.latency.add(0.001)
+    started, cancelled = [], []
+
+    async def hang(timeout):
+        started.append(timeout)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(timeout)
+            raise
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(caller.call_async(hang), 0.05)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert len(started) == 2  # original attempt + hedge
+    assert len(cancelled) == 2
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from llm import router as router_mod
+from llm.router import EndpointRouter
+
+
+def test_least_outstanding_spreads_concurrent_requests():
+    r = EndpointRouter("answer", ["http://a/x", "http://b/x"], strategy="least_outstanding")
+    first, second = r.pick(), r.pick()
+    assert {first.url, second.url} == {"http://a/x", "http://b/x"}
+    r.release(first, 0.1, ok=True)
+    assert r.pick() is first
+
+
+def test_least_outstanding_breaks_ties_on_latency():
+    r = EndpointRouter("answer", ["http://a/x", "http://b/x"], strategy="least_outstanding")
+    a, b = r.endpoints
+    a.ewma_latency, b.ewma_latency = 2.0, 0.5
+    assert r.pick() is b
+
+
+def test_ewma_prefers_faster_endpoint_until_it_is_loaded():
+    r = EndpointRouter("answer", ["http://a/x", "http://b/x"], strategy="ewma")
+    a, b = r.endpoints
+    a.ewma_latency, b.ewma_latency = 1.0, 3.0
+    assert r.pick() is a        # 1.0 * 1 < 3.0 * 1
+    assert r.pick() is a        # 1.0 * 2 < 3.0 * 1
+    assert r.pick() is b        # 1.0 * 3 == 3.0 * 1 -> fewer outstanding
+
+
+def test_release_updates_ewma_and_outstanding():
+    r = EndpointRouter("answer", ["http://a/x"])
+    ep = r.pick()
+    r.release(ep, 1.0, ok=True)
+    ep2 = r.pick()
+    r.release(ep2, 2.0, ok=True)
+    assert ep.outstanding == 0
+    assert ep.ewma_latency == pytest.approx(router_mod.EWMA_ALPHA * 2.0 + (1 - router_mod.EWMA_ALPHA) * 1.0)
+
+
+def test_consecutive_failures_eject_then_health_check_readmits(monkeypatch):
+    monkeypatch.setattr(router_mod, "LLM_EJECT_FAILURES", 2)
+    monkeypatch.setattr(router_mod, "LLM_EJECT_SECONDS", 60.0)
+    r = EndpointRouter("answer", ["http://a/x", "http://b/x"])
+    a, b = r.endpoints
+
+    for _ in range(2):
+        r.release(a, None, ok=False)
+    assert not a.healthy
+    assert all(r.pick() is b for _ in range(3))
+
+    class Resp:
+        status_code = 200
+
+    monkeypatch.setattr(router_mod.requests, "get", lambda url, timeout: Resp())
+    r.check_health()
+    assert a.healthy and a.consecutive_failures == 0
+
+
+def test_success_resets_failure_streak(monkeypatch):
+    monkeypatch.setattr(router_mod, "LLM_EJECT_FAILURES", 2)
+    r = EndpointRouter("answer", ["http://a/x"])
+    ep = r.endpoints[0]
+    r.release(ep, None, ok=False)
+    r.release(ep, 0.1, ok=True)
+    r.release(ep, None, ok=False)
+    assert ep.healthy
+
+
+def test_all_ejected_picks_the_one_due_back_first():
+    r = EndpointRouter("answer", ["http://a/x", "http://b/x"])
+    a, b = r.endpoints
+    now = time.monotonic()
+    a.ejected_until, b.ejected_until = now + 100, now + 10
+    assert r.pick() is b
+
+
+def test_no_endpoints_is_an_error():
+    with pytest.raises(ValueError):
+        EndpointRouter("answer", [])
@@ -0,0 +1,87 @@
+from pipeline.text_match import AhoCorasick, InvertedIndex
+
+
+def _contains_all(texts, phrases):
+    """The Neo4j CONTAINS semantics InvertedIndex.match_all must reproduce."""
+    return {k for k, t in texts.items() if all(p.lower() in t.lower() for p in phrases)}
+
+
+# ---------- AhoCorasick ----------
+
+def test_aho_corasick_finds_overlapping_patterns():
+    ac = AhoCorasick(["he", "she", "his", "hers"])
+    assert sorted(p for _, _, p in ac.iter("ushers")) == ["he", "hers", "she"]
+
+
+def test_find_words_respects_word_boundaries():
+    ac = AhoCorasick(["EN", "VIN", "GND"])
+    assert ac.find_words("ENABLE pin, VIN2 rail") == set()
+    assert ac.find_words("Pull EN high; VIN to GND.") == {"EN", "VIN", "GND"}
+
+
+def test_find_words_drops_hits_inside_longer_hits():
+    ac = AhoCorasick(["EN", "EN/UVLO"])
+    assert ac.find_words("Connect EN/UVLO to VIN") == {"EN/UVLO"}
+
+
+def test_find_words_case_insensitive():
+    ac = AhoCorasick(["Vout"], case_sensitive=False)
+    assert ac.find_words("VOUT ripple") == {"Vout"}
+
+
+# ---------- InvertedIndex ----------
+
+TEXTS = {
+    "t1": "Package Dimensions (mm): length 3.2, width 2.5",
+    "t2": "Frequency Stability over temperature: +/-50 ppm",
+    "t3": "Load capacitance CL = 8pF; ESR max 80 ohm",
+    "t4": "Nominal frequency 16 MHz",
+}
+
+
+def _index():
+    index = InvertedIndex()
+    for key, text in TEXTS.items():
+        index.add(key, text)
+    return index
+
+
+def test_match_all_exact_terms():
+    assert _index().match_all(["frequency", "ppm"]) == {"t2"}
+
+
+def test_match_all_single_term_prefix():
+    assert _index().match_all(["dimension"]) == {"t1"}
+
+
+def test_match_all_phrase_with_partial_last_term():
+    assert _index().match_all(["frequency stab"]) == {"t2"}
+
+
+def test_match_all_partial_first_and_inner_terms():
+    assert _index().match_all(["ominal freq"]) == {"t4"}
+    assert _index().match_all(["ension"]) == {"t1"}
+
+
+def test_match_all_requires_every_phrase():
+    assert _index().match_all(["frequency", "dimension"]) == set()
+    assert _index().match_all(["stability frequency"]) == set()
+
+
+def test_match_all_symbol_phrases_and_empty():
+    assert _index().match_all(["+/-"]) == {"t2"}
+    assert _index().match_all([]) == set()
+    assert _index().match_all(["", None]) == set()
+
+
+def test_match_all_agrees_with_contains():
+    index = _index()
+    for phrases in (["mm"], ["8pf"], ["cl ="], ["esr max 8"], ["ty"], ["z"], ["load cap", "ohm"], ["3.2"]):
+        assert index.match_all(phrases) == _contains_all(TEXTS, phrases), phrases
+
+
+def test_prefix_lookup_sees_later_additions():
+    index = _index()
+    assert index.match_all(["aging"]) == set()
+    index.add("t5", "Aging per year: 3 ppm")
+    assert index.match_all(["agin"]) == {"t5"}
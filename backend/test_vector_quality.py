@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from models import vector_quality
+
+
+@pytest.fixture
+def uncalibrated(monkeypatch):
+    monkeypatch.setattr(vector_quality, "_STATE", {})
+    monkeypatch.setattr(vector_quality, "_last_reload", 0.0)
+    monkeypatch.setattr(vector_quality, "PG_VECTOR_INDEX", "ivfflat")
+    loads = []
+    done = threading.Event()
+
+    def load(conn=None):
+        loads.append(threading.current_thread().name)
+        done.set()
+        raise RuntimeError("postgres down")
+
+    monkeypatch.setattr(vector_quality, "load_calibration", load)
+    return loads, done
+
+
+def test_uncalibrated_uses_defaults_and_loads_in_background(uncalibrated):
+    loads, done = uncalibrated
+    assert vector_quality.quality_statements("balanced") == ["SET LOCAL ivfflat.probes = 10"]
+    assert done.wait(2)
+    assert loads == ["vector-quality-load"]
+    # a failed load is not retried on every question
+    vector_quality.quality_statements("fast")
+    assert len(loads) == 1
+
+
+def test_calibrated_levels_are_used(monkeypatch):
+    monkeypatch.setattr(vector_quality, "_STATE", {
+        "kind": "hnsw", "lists": None, "levels": {"fast": 30, "balanced": 64, "accurate": 256}, "calibrated": {},
+    })
+    assert vector_quality.quality_statements("accurate") == ["SET LOCAL hnsw.ef_search = 256"]
+    assert vector_quality.quality_statements("exact") == ["SET LOCAL enable_indexscan = off"]
+    assert vector_quality.quality_statements(None) == []
+    with pytest.raises(ValueError):
+        vector_quality.quality_statements("best")
+
+
+def test_no_index_means_no_setting(monkeypatch):
+    monkeypatch.setattr(vector_quality, "_STATE", {"kind": None, "lists": None, "levels": {}, "calibrated": {}})
+    assert vector_quality.quality_statements("fast") == []
+
+
+def test_ivfflat_candidates_cover_lists():
+    assert vector_quality._candidates("ivfflat", 100, 10) == [1, 2, 4, 8, 16, 32, 64, 100]
+    assert vector_quality._candidates("hnsw", None, 50)[0] == 50
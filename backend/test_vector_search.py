@@ -0,0 +1,84 @@
+import asyncio
+
+from models.vector_search import where_clause, search_rows, search_rows_async
+
+
+class FakeCursor:
+    """Answers the count query with `count`, ANN scans with `ann_rows`, exact scans with `exact_rows`."""
+
+    def __init__(self, count=0, ann_rows=(), exact_rows=()):
+        self.count, self.ann_rows, self.exact_rows = count, list(ann_rows), list(exact_rows)
+        self.queries = []
+        self._result = None
+
+    def execute(self, sql, params=None):
+        if "count(*)" in sql:
+            self.queries.append("count")
+            self._result = [{"n": self.count}]
+        elif "MATERIALIZED" in sql:
+            self.queries.append("exact")
+            self._result = self.exact_rows
+        else:
+            self.queries.append("ann")
+            self._result = self.ann_rows
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+
+class AsyncFakeCursor(FakeCursor):
+    async def execute(self, sql, params=None):
+        FakeCursor.execute(self, sql, params)
+
+    async def fetchone(self):
+        return FakeCursor.fetchone(self)
+
+    async def fetchall(self):
+        return FakeCursor.fetchall(self)
+
+
+def test_where_clause():
+    assert where_clause() == ("", {})
+    sql, params = where_clause(["a", "b"], "EN")
+    assert sql == "WHERE doc_id = ANY(%(doc_ids)s) AND pin = %(pin)s"
+    assert params == {"doc_ids": ["a", "b"], "pin": "EN"}
+
+
+def test_unfiltered_search_uses_ann_without_counting():
+    cur = FakeCursor(ann_rows=[1])
+    rows, plan = search_rows(cur, "[0]", top_k=5)
+    assert (rows, plan) == ([1], "ann")
+    assert cur.queries == ["ann"]
+
+
+def test_selective_filter_ranks_exactly():
+    cur = FakeCursor(count=10, exact_rows=[1, 2])
+    rows, plan = search_rows(cur, "[0]", top_k=5, doc_ids=["a"], exact_max_rows=100)
+    assert (rows, plan) == ([1, 2], "exact")
+    assert cur.queries == ["count", "exact"]
+
+
+def test_broad_filter_uses_ann():
+    cur = FakeCursor(count=1000, ann_rows=[1, 2, 3])
+    rows, plan = search_rows(cur, "[0]", top_k=3, pin="EN", exact_max_rows=100)
+    assert (rows, plan) == ([1, 2, 3], "ann")
+    assert cur.queries == ["count", "ann"]
+
+
+def test_short_ann_result_falls_back_to_exact():
+    cur = FakeCursor(count=1000, ann_rows=[1], exact_rows=[1, 2, 3])
+    rows, plan = search_rows(cur, "[0]", top_k=3, doc_ids=["a"], exact_max_rows=100)
+    assert (rows, plan) == ([1, 2, 3], "ann+exact")
+    assert cur.queries == ["count", "ann", "exact"]
+
+
+def test_async_search_matches_sync_plans():
+    cur = AsyncFakeCursor(count=1000, ann_rows=[1], exact_rows=[1, 2, 3])
+    rows, plan = asyncio.run(search_rows_async(cur, "[0]", top_k=3, doc_ids=["a"], exact_max_rows=100))
+    assert (rows, plan) == ([1, 2, 3], "ann+exact")
+
+    cur = AsyncFakeCursor(count=10, exact_rows=[1])
+    assert asyncio.run(search_rows_async(cur, "[0]", top_k=3, doc_ids=["a"], exact_max_rows=100))[1] == "exact"
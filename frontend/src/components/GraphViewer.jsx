@@ -1,12 +1,33 @@
-
 import React, { useEffect, useState } from "react";
 import { API } from "../api";
 import ForceGraph2D from "react-force-graph-2d";
 
+// Add nodes/links from a /graph response, skipping ones already shown
+function mergeGraph(graph, data) {
+  const seen = new Set(graph.nodes.map((n) => n.id));
+  const nodes = graph.nodes.concat(data.nodes.filter((n) => !seen.has(n.id)));
+  const linkKey = (l) =>
+    `${l.source.id ?? l.source}|${l.target.id ?? l.target}|${l.type}`;
+  const seenLinks = new Set(graph.links.map(linkKey));
+  const links = graph.links.concat(data.links.filter((l) => !seenLinks.has(linkKey(l))));
+  return { nodes, links };
+}
+
+function nodeLabel(node) {
+  if (!node.counts) return node.label;
+  const counts = Object.entries(node.counts)
+    .map(([group, n]) => `${group}: ${n}`)
+    .join(", ");
+  return counts ? `${node.label} (${counts})` : node.label;
+}
+
 export default function GraphViewer() {
   const [docs, setDocs] = useState([]);
   const [docId, setDocId] = useState("");
+  const [level, setLevel] = useState("summary");
   const [graph, setGraph] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [expanded, setExpanded] = useState(new Set());
 
   useEffect(() => {
     API.get("/documents")
@@ -14,11 +35,24 @@ export default function GraphViewer() {
       .catch((e) => console.error(e));
   }, []);
 
-  const loadGraph = async () => {
+  const loadGraph = async (cursor = null) => {
     if (!docId) return;
     try {
-      const res = await API.get(`/graph/${docId}`);
-      setGraph(res.data);
+      const res = await API.get(`/graph/${docId}`, { params: { level, cursor } });
+      setGraph((g) => (cursor && g ? mergeGraph(g, res.data) : { nodes: res.data.nodes, links: res.data.links }));
+      setNextCursor(res.data.next_cursor);
+      if (!cursor) setExpanded(new Set());
+    } catch (e) {
+      console.error(e);
+    }
+  };
+
+  const expandNode = async (node) => {
+    if (!node.expandable || expanded.has(node.id)) return;
+    try {
+      const res = await API.get(`/graph/${docId}/expand`, { params: { node_id: node.id } });
+      setGraph((g) => mergeGraph(g, res.data));
+      setExpanded((s) => new Set(s).add(node.id));
     } catch (e) {
       console.error(e);
     }
@@ -35,17 +69,25 @@ export default function GraphViewer() {
             </option>
           ))}
         </select>
-        <button onClick={loadGraph} disabled={!docId}>
+        <select value={level} onChange={(e) => setLevel(e.target.value)}>
+          <option value="summary">Summary</option>
+          <option value="full">Full</option>
+        </select>
+        <button onClick={() => loadGraph()} disabled={!docId}>
           Load graph
         </button>
+        {nextCursor && (
+          <button onClick={() => loadGraph(nextCursor)}>Load more pages</button>
+        )}
       </div>
 
       <div style={{ height: "400px", border: "1px solid #ddd", marginTop: "1rem" }}>
         {graph ? (
           <ForceGraph2D
             graphData={graph}
-            nodeLabel="label"
+            nodeLabel={nodeLabel}
             nodeAutoColorBy="group"
+            onNodeClick={expandNode}
           />
         ) : (
           <p style={{ padding: "1rem" }}>No graph loaded.</p>